@@ -1,34 +1,180 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, render_template, jsonify, request, g
 import os
+import time
 import json
+import functools
 import numpy as np
 import pandas as pd
-import tensorflow as tf
-from app.models.workload_forecasting import WorkloadForecastingModel
-from app.models.resource_allocation import ResourceAllocationModel
+from app.models.workload_forecasting import WorkloadForecastingModel, horizon_label, point_forecast
+from app.models.resource_allocation import ResourceAllocationModel, next_hour_columns
 from app.models.cooling_optimization import CoolingOptimizationModel
+from app.models.dummy_models import DummyWorkloadModel, DummyResourceModel, DummyCoolingModel
+from app.registry import ModelRegistry
+from app.cache import cache_from_env
+from app.telemetry import TelemetryBuffer, build_features, parse_payload
+from app.control import fleet_status, forecast_columns, forecast_points, horizon_arrays, to_json, ENERGY_SUMMARY, ROOM_CONDITIONS
+from app.ledger import ledger_from_env
+from app.anomaly import ANOMALY_KINDS, detector_from_env
+from app.inference import Overloaded, batcher_from_env
+from app.history import HistoryStore
+from app.downsample import history_series
+from app.models.online import OnlineUpdater
+from app.streaming import StreamHub
+from app.sharding import ShardError, control_loop_from_env
+from app.scenarios import fleet_baseline, scenario_grid, scenario_runner_from_env
+from app.models.cooling_zones import CoolingTopology
+from app.metrics import METRICS
+from app.profiling import profiler_from_env
+from app.encoding import COLUMNS_MIME, JSON_MIME, MSGPACK_MIMES, compress, decode_body, encode_body
 
 app = Flask(__name__, 
             static_folder='app/static',
             template_folder='app/templates')
 
-# Initialize models
-try:
+# Create models directory if it doesn't exist
+os.makedirs(os.path.join('app', 'models', 'saved'), exist_ok=True)
+
+# Models are loaded on first use; dummy models are used if loading fails
+registry = ModelRegistry()
+registry.register('workload', WorkloadForecastingModel, DummyWorkloadModel)
+registry.register('resource', ResourceAllocationModel, DummyResourceModel)
+registry.register('cooling', CoolingOptimizationModel, DummyCoolingModel)
+
+# Load everything up front, e.g. in the gunicorn master with preload_app
+if os.environ.get('PRELOAD_MODELS') == '1':
     print("Initializing AI models...")
-    # Create models directory if it doesn't exist
-    os.makedirs(os.path.join('app', 'models', 'saved'), exist_ok=True)
-    
-    workload_model = WorkloadForecastingModel()
-    resource_model = ResourceAllocationModel()
-    cooling_model = CoolingOptimizationModel()
+    registry.warmup()
     print("All models initialized successfully")
-except Exception as e:
-    print(f"Error initializing models: {e}")
-    # Provide fallback functionality
-    from app.models.dummy_models import DummyWorkloadModel, DummyResourceModel, DummyCoolingModel
-    workload_model = DummyWorkloadModel()
-    resource_model = DummyResourceModel()
-    cooling_model = DummyCoolingModel()
+
+# Ring buffers with the latest lookback window per server, fed by /api/telemetry
+telemetry = TelemetryBuffer(capacity=int(os.environ.get('TELEMETRY_CAPACITY', 10000)))
+
+# Ingested telemetry is also appended to the on-disk history store when configured, and
+# flushed to disk every HISTORY_FLUSH_INTERVAL seconds and at exit
+history = HistoryStore(os.environ['HISTORY_PATH']) if os.environ.get('HISTORY_PATH') else None
+HISTORY_FLUSH_INTERVAL = float(os.environ.get('HISTORY_FLUSH_INTERVAL', 30))
+
+# Optional online learning: telemetry becomes training examples for periodic small updates
+online_updater = OnlineUpdater(registry) if os.environ.get('ONLINE_UPDATES') == '1' else None
+ONLINE_UPDATE_INTERVAL = float(os.environ.get('ONLINE_UPDATE_INTERVAL', 300))
+
+# Rack -> aisle -> room layout for zoned cooling; without a layout file servers fill a regular grid
+cooling_topology = CoolingTopology.load(os.environ['COOLING_TOPOLOGY']) if os.environ.get('COOLING_TOPOLOGY') else None
+RACK_SERVERS = int(os.environ.get('RACK_SERVERS', 20))
+
+@functools.lru_cache(maxsize=8)
+def grid_topology(server_ids):
+    return CoolingTopology.grid_for(np.frombuffer(server_ids, dtype=np.int64), servers_per_rack=RACK_SERVERS)
+
+def zone_topology(server_ids):
+    """Configured topology, or the grid racks holding the given servers"""
+    if cooling_topology is not None:
+        return cooling_topology
+    return grid_topology(np.unique(np.asarray(server_ids, dtype=np.int64)).tobytes())
+
+# Measured and estimated power with minute/hour/day rollups per server, zone and fleet
+energy_ledger = ledger_from_env(telemetry.capacity)
+
+# Streaming per-server statistics flagging spikes, thermal runaways and stuck sensors on ingest
+anomaly_detector = detector_from_env(telemetry.capacity)
+
+# Forecast -> allocation -> cooling pipeline for /api/control/cycle; CONTROL_SHARDS=N runs
+# forecast + allocation in N worker processes (see app/sharding.py)
+control_loop = control_loop_from_env(registry, telemetry, energy_ledger, anomaly_detector)
+
+# What-if grids for /api/scenarios; SCENARIO_WORKERS=N spreads large grids over N processes
+scenario_runner = scenario_runner_from_env(registry)
+
+# One producer computes each tick and pushes deltas to every /api/stream client
+stream_hub = StreamHub(control_loop, interval=float(os.environ.get('STREAM_INTERVAL', 5)))
+
+# Concurrent forecast requests share one forward pass; a full queue answers 503
+forecast_batcher = batcher_from_env(lambda windows: registry.get('workload').predict_steps(windows), name='forecast')
+
+# Identical requests from many open dashboards reuse results (see app/cache.py)
+result_cache = cache_from_env()
+
+# Prometheus metrics (see app/metrics.py); components with their own counters are read at scrape time
+REQUEST_SECONDS = METRICS.histogram(
+    'http_request_duration_seconds', 'Request latency per route', ('route', 'method', 'status')
+)
+METRICS.callback(
+    'result_cache_requests_total', 'Result cache lookups per namespace and result',
+    lambda: {
+        (namespace, result): counters[key]
+        for namespace, counters in result_cache.stats()['counters'].items()
+        for result, key in (('hit', 'hits'), ('miss', 'misses'))
+    },
+    ('namespace', 'result'), kind='counter'
+)
+METRICS.callback('inference_queue_depth', 'Requests waiting for a forecast micro-batch',
+                 lambda: {('forecast',): forecast_batcher.queue_depth()}, ('queue',))
+METRICS.callback(
+    'inference_requests_total', 'Micro-batcher requests by outcome',
+    lambda: {('forecast', outcome): forecast_batcher.stats()[outcome] for outcome in ('requests', 'coalesced', 'rejected')},
+    ('queue', 'outcome'), kind='counter'
+)
+METRICS.callback(
+    'model_load_seconds', 'Time taken to load each model',
+    lambda: {(name, str(stats['fallback']).lower()): stats['load_seconds']
+             for name, stats in registry.stats()['models'].items()},
+    ('model', 'fallback')
+)
+METRICS.callback('stream_subscribers', 'Connected /api/stream clients', lambda: stream_hub.subscribers)
+METRICS.callback('telemetry_servers', 'Servers with buffered telemetry', lambda: telemetry.n_servers)
+METRICS.callback('energy_power_kw', 'Latest fleet power and savings recorded in the energy ledger',
+                 lambda: {(field,): value for field, value in energy_ledger.latest().items()}, ('field',))
+METRICS.callback('anomaly_servers_flagged', 'Servers flagged by their latest telemetry batch',
+                 lambda: anomaly_detector.stats()['flagged'])
+METRICS.callback(
+    'anomaly_samples_total', 'Telemetry samples flagged per anomaly kind',
+    lambda: {(kind,): count for kind, count in anomaly_detector.stats()['flagged_samples'].items()},
+    ('kind',), kind='counter'
+)
+
+# Responses of at least COMPRESS_MIN_BYTES are gzip/deflate compressed for clients that accept it
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 1))
+
+# Opt-in profiles of slow requests, e.g. PROFILE_SLOW_MS=200 (see app/profiling.py)
+request_profiler = profiler_from_env()
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+    if request_profiler is not None:
+        g.profile_token = request_profiler.start()
+
+@app.after_request
+def record_latency(response):
+    start = g.get('request_start')
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        REQUEST_SECONDS.labels(route, request.method, str(response.status_code)).observe(time.perf_counter() - start)
+    return response
+
+@app.after_request
+def compress_response(response):
+    if COMPRESS_LEVEL == 0 or response.direct_passthrough or response.is_streamed or 'Content-Encoding' in response.headers:
+        return response
+    encoding = request.accept_encodings.best_match(['gzip', 'deflate'])
+    if encoding is None or (response.content_length or 0) < COMPRESS_MIN_BYTES:
+        return response
+    response.set_data(compress(response.get_data(), encoding, COMPRESS_LEVEL))
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+@app.teardown_request
+def finish_profile(error=None):
+    token = g.pop('profile_token', None)
+    if token is not None:
+        request_profiler.finish(token, f'{request.method} {request.path}', time.perf_counter() - g.request_start)
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus scrape endpoint"""
+    return Response(METRICS.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/')
 @app.route('/<path:path>')
@@ -36,49 +182,412 @@ def index(path=None):
     """Render main dashboard page for any path to support client-side routing"""
     return render_template('index.html')
 
+@app.errorhandler(Overloaded)
+def handle_overloaded(error):
+    """Shed load when the inference queue is full instead of queueing without bound"""
+    response = jsonify({'error': str(error)})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+def batched_steps():
+    """All forecast hours for buffered telemetry, through the shared micro-batcher"""
+    # Requests for the same telemetry generation share one computation; the windows are a
+    # copy read together with the generation, as the batcher thread uses them later
+    generation, server_ids, windows = telemetry.snapshot()
+    return server_ids, forecast_batcher(windows, key=generation)
+
+def batched_forecast(model):
+    """Next-hour forecast of buffered telemetry as long-format columns"""
+    if not telemetry.ready_count():
+        return forecast_columns(model.predict())
+    server_ids, steps = batched_steps()
+    nearest = np.round(point_forecast(steps[:, 0], model.quantiles).astype(np.float64), 1)
+    return {
+        'server_id': server_ids,
+        'time_offset': np.ones(len(server_ids), dtype=np.int64),
+        'cpu_forecast': nearest[:, 0],
+        'memory_forecast': nearest[:, 1],
+        'io_forecast': nearest[:, 2]
+    }
+
+def cached_forecast(model):
+    """Next-hour forecast columns, shared through the result cache per telemetry version"""
+    return result_cache.get_or_compute(
+        'forecast', {'telemetry': telemetry.version()}, registry.version('workload'),
+        lambda: batched_forecast(model)
+    )
+
+def horizon_forecast(model, hours, include_quantiles):
+    """Compact multi-horizon forecast of buffered telemetry"""
+    if telemetry.ready_count():
+        server_ids, steps = batched_steps()
+    else:
+        n_quantiles = len(model.quantiles) if model.quantiles else 1
+        server_ids, steps = np.zeros(0, dtype=np.int64), np.zeros((0, model.forecast_horizon, 3, n_quantiles))
+    return dict(horizon_arrays(server_ids, steps, hours, model.quantiles, include_quantiles),
+                timestamp=pd.Timestamp.now().isoformat())
+
+def response_form():
+    """
+    Response encoding from ?format= or the Accept header
+
+    Returns:
+        'json' (per-row dicts), 'columns' (one JSON array per field) or 'msgpack'
+    """
+    form = request.args.get('format')
+    if form is not None:
+        if form not in ('json', 'columns', 'msgpack'):
+            raise ValueError("format must be json, columns or msgpack")
+        return form
+    best = request.accept_mimetypes.best_match([JSON_MIME, COLUMNS_MIME, *MSGPACK_MIMES], default=JSON_MIME)
+    return 'msgpack' if best in MSGPACK_MIMES else 'columns' if best == COLUMNS_MIME else 'json'
+
+def negotiated_response(value, form):
+    """Encode a result in the negotiated form"""
+    body, mimetype = encode_body(value, form)
+    response = Response(body, mimetype=mimetype)
+    response.vary.add('Accept')
+    return response
+
+def request_payload():
+    """JSON or MessagePack request body, optionally sent with Content-Encoding gzip or deflate"""
+    return decode_body(request.get_data(), request.mimetype, request.headers.get('Content-Encoding'))
+
+def requested_hours(args, max_horizon):
+    """
+    Hours ahead asked for by ?horizon=N (hours 1..N) or ?hours=1,6,24
+
+    Returns:
+        List of hours, or None for the default next-hour per-point response
+    """
+    if 'hours' in args:
+        hours = sorted({int(hour) for hour in args['hours'].split(',') if hour.strip()})
+    elif 'horizon' in args:
+        hours = list(range(1, int(args['horizon']) + 1))
+    else:
+        return None
+    if not hours or hours[0] < 1 or hours[-1] > max_horizon:
+        raise ValueError(f"Hours must be between 1 and the model horizon of {max_horizon}")
+    return hours
+
 @app.route('/api/workload/forecast', methods=['GET'])
 def get_workload_forecast():
-    """Get workload forecasts for the next time window"""
-    forecast_data = workload_model.predict()
-    return jsonify(forecast_data)
+    """Get workload forecasts for the next hour, or compact arrays for ?horizon=N / ?hours=1,6,24"""
+    model = registry.get('workload')
+    try:
+        hours = requested_hours(request.args, model.forecast_horizon)
+        if request.args.get('quantiles', '0') not in ('0', '1'):
+            raise ValueError("Give ?quantiles=1 to include the quantile forecasts")
+        form = response_form()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if hours is None:
+        columns = cached_forecast(model)
+        if form == 'json':
+            return jsonify(forecast_points(columns))
+        return negotiated_response(dict(
+            columns, timestamp=pd.Timestamp.now().isoformat(),
+            forecast_horizon=horizon_label(int(np.max(columns['time_offset'], initial=1)))
+        ), form)
+    
+    include_quantiles = request.args.get('quantiles') == '1'
+    forecast_data = result_cache.get_or_compute(
+        'forecast_horizon',
+        {'telemetry': telemetry.version(), 'hours': hours, 'quantiles': include_quantiles},
+        registry.version('workload'),
+        lambda: horizon_forecast(model, hours, include_quantiles)
+    )
+    return negotiated_response(forecast_data, form)
+
+def record_allocation(workload_data, decisions):
+    """
+    Record computed allocation decisions (columns or per-server dicts) per server in the energy ledger
+
+    Called on cache misses only, so a repeated request is not counted again.
+    Requests cover any subset of servers, so the fleet totals are left to the
+    control loop.
+    """
+    if isinstance(decisions, list):
+        decisions = {key: [d[key] for d in decisions] for key in ('server_id', 'action', 'expected_energy_savings')}
+    energy_ledger.record_allocation(decisions['server_id'], next_hour_columns(workload_data)[1],
+                                    decisions['action'], decisions['expected_energy_savings'], fleet=False)
+    return decisions
 
 @app.route('/api/resource/allocate', methods=['POST'])
 def allocate_resources():
-    """Allocate resources based on forecasted workload"""
-    workload_data = request.json
-    allocation_decisions = resource_model.decide(workload_data)
-    return jsonify(allocation_decisions)
+    """Allocate resources based on forecasted workload, posted per point or as columns"""
+    try:
+        workload_data = request_payload()
+        form = response_form()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    model = registry.get('resource')
+    if form == 'json':
+        def decide():
+            result = model.decide(workload_data)
+            record_allocation(workload_data, result['decisions'])
+            return result
+        return jsonify(result_cache.get_or_compute('allocate', workload_data, registry.version('resource'), decide))
+    
+    decisions = result_cache.get_or_compute(
+        'allocate_columns', workload_data, registry.version('resource'),
+        lambda: record_allocation(workload_data, model.decide_batch(*next_hour_columns(workload_data)))
+    )
+    return negotiated_response({
+        'decisions': decisions,
+        'timestamp': pd.Timestamp.now().isoformat(),
+        'optimization_goal': 'energy_efficiency'
+    }, form)
 
 @app.route('/api/cooling/optimize', methods=['POST'])
 def optimize_cooling():
-    """Optimize cooling based on server conditions"""
-    server_data = request.json
-    cooling_settings = cooling_model.optimize(server_data)
-    return jsonify(cooling_settings)
+    """Optimize cooling based on server conditions, posted per server or as columns"""
+    try:
+        server_data = request_payload()
+        form = response_form()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    model = registry.get('cooling')
+    cooling_settings = result_cache.get_or_compute(
+        'cooling', server_data, registry.version('cooling'),
+        lambda: model.optimize(server_data)
+    )
+    if form == 'json':
+        return jsonify(cooling_settings)
+    return negotiated_response(cooling_settings, form)
+
+def zoned_cooling(status, humidity):
+    """Zone settings from per-server status columns"""
+    model = registry.get('cooling')
+    topology = zone_topology(status['id'])
+    rack_temperature, rack_heat = topology.rack_inputs(status['id'], status['temperature'], status['cpu'], status['memory'])
+    return to_json(model.optimize_zones(topology, rack_temperature, rack_heat, humidity))
+
+def recorded_zones(result):
+    """Record aisle and room cooling decisions of the whole fleet in the energy ledger and return the result"""
+    energy_ledger.record_cooling(result['aisles']['name'] + result['rooms']['name'],
+                                 result['aisles']['cooling_numeric'] + result['rooms']['cooling_numeric'])
+    return result
+
+@app.route('/api/cooling/zones', methods=['GET', 'POST'])
+def optimize_cooling_zones():
+    """Per-rack, aisle and room cooling for current telemetry (GET) or posted servers"""
+    if request.method == 'GET':
+        try:
+            humidity = float(request.args.get('humidity', ROOM_CONDITIONS['humidity']))
+        except ValueError:
+            return jsonify({'error': "humidity must be a number"}), 400
+        return jsonify(result_cache.get_or_compute(
+            'cooling_zones', {'telemetry': telemetry.version(), 'humidity': humidity}, registry.version('cooling'),
+            lambda: recorded_zones(zoned_cooling(fleet_status(telemetry), humidity))
+        ))
+    
+    try:
+        server_data = request_payload()
+        servers = server_data.get('servers', [])
+        status = {
+            'id': np.array([server.get('id', i + 1) for i, server in enumerate(servers)], dtype=np.int64),
+            'temperature': np.array([server.get('temperature', 25) for server in servers], dtype=np.float64),
+            'cpu': np.array([server.get('cpu', 50) for server in servers], dtype=np.float64),
+            'memory': np.array([server.get('memory', 50) for server in servers], dtype=np.float64)
+        }
+        humidity = float(server_data.get('cooling', {}).get('humidity', ROOM_CONDITIONS['humidity']))
+    except (ValueError, TypeError, AttributeError, OverflowError) as e:
+        return jsonify({'error': f"Invalid zones request: {e}"}), 400
+    # Posted servers are any subset of the fleet, so their zones are not recorded
+    return jsonify(result_cache.get_or_compute(
+        'cooling_zones', server_data, registry.version('cooling'),
+        lambda: zoned_cooling(status, humidity)
+    ))
+
+@app.route('/api/models/status', methods=['GET'])
+def get_models_status():
+    """Report which models are loaded, their load time and memory cost"""
+    return jsonify(registry.stats())
+
+@app.route('/api/models/warmup', methods=['POST'])
+def warmup_models():
+    """Load all models now instead of on first use"""
+    registry.warmup()
+    return jsonify(registry.stats())
+
+@app.route('/api/models/update', methods=['POST'])
+def update_models():
+    """Run an online update of the forecaster now (requires ONLINE_UPDATES=1)"""
+    if online_updater is None:
+        return jsonify({'error': 'Online updates are disabled, set ONLINE_UPDATES=1'}), 400
+    return jsonify({'update': online_updater.update(), 'stats': online_updater.stats()})
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Result cache hit/miss counters"""
+    return jsonify(result_cache.stats())
+
+@app.route('/api/inference/stats', methods=['GET'])
+def get_inference_stats():
+    """Inference queue depth, rejections and micro-batch sizes"""
+    return jsonify(forecast_batcher.stats())
+
+@app.route('/api/telemetry', methods=['POST'])
+def ingest_telemetry():
+    """Ingest a batch of telemetry samples in the sample_workload.csv schema"""
+    content_type = request.content_type or 'application/json'
+    payload = request.get_data() if content_type.startswith('text/csv') else request.get_json()
+    
+    try:
+        columns = parse_payload(payload, content_type)
+        features = build_features(columns)
+        if online_updater is not None:
+            # Pairs each server's current window with its next sample, so it runs before ingest
+            online_updater.collect(telemetry, columns['server_id'], features)
+            online_updater.start(ONLINE_UPDATE_INTERVAL)
+        accepted = telemetry.ingest(columns['server_id'], features)
+        flagged = anomaly_detector.update(columns['server_id'], features)
+        status = fleet_status(telemetry)
+        energy_ledger.record_measured(status['id'], status['cpu'], status['status'] == 'active')
+        if history is not None and 'timestamp' in columns:
+            history.write(columns)
+            history.start_flusher(HISTORY_FLUSH_INTERVAL)
+    except (KeyError, ValueError, TypeError, OverflowError) as e:
+        return jsonify({'error': f"Invalid telemetry batch: {e}"}), 400
+    
+    return jsonify({
+        'accepted': accepted,
+        'servers': telemetry.n_servers,
+        'ready_servers': telemetry.ready_count(),
+        'anomalous_servers': flagged
+    })
+
+def current_servers():
+    """Latest per-server readings from telemetry, or mock data before any arrives"""
+    status = to_json(fleet_status(telemetry))
+    return [dict(zip(status, values)) for values in zip(*status.values())]
 
 @app.route('/api/system/status', methods=['GET'])
 def get_system_status():
     """Get current system status for dashboard"""
-    # In a real system, this would fetch actual data
-    # For demo, we'll return mock data
     return jsonify({
-        'servers': [
-            {'id': 1, 'status': 'active', 'cpu': 78, 'memory': 65, 'io': 45, 'temperature': 42},
-            {'id': 2, 'status': 'active', 'cpu': 45, 'memory': 80, 'io': 30, 'temperature': 38},
-            {'id': 3, 'status': 'hibernating', 'cpu': 5, 'memory': 10, 'io': 2, 'temperature': 25},
-            {'id': 4, 'status': 'active', 'cpu': 90, 'memory': 75, 'io': 60, 'temperature': 48},
-        ],
-        'energy': {
-            'current': 4.2,  # kW
-            'saved': 1.8,    # kW
-            'renewable': 65  # percentage
-        },
-        'cooling': {
-            'level': 'medium',
-            'temperature': 22,  # °C
-            'humidity': 45      # percentage
-        }
+        'servers': current_servers(),
+        'energy': energy_ledger.summary() or ENERGY_SUMMARY,
+        'cooling': ROOM_CONDITIONS
+    })
+
+@app.route('/api/energy', methods=['GET'])
+def get_energy():
+    """Energy rollups of the fleet, ?server=ID or ?zone=NAME, at ?resolution=minute|hour|day"""
+    try:
+        rollup = energy_ledger.rollup(
+            request.args.get('resolution', 'hour'),
+            server=int(request.args['server']) if 'server' in request.args else None,
+            zone=request.args.get('zone'),
+            n_buckets=int(request.args['buckets']) if 'buckets' in request.args else None
+        )
+    except KeyError as e:
+        return jsonify({'error': e.args[0]}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(to_json(rollup))
+
+@app.route('/api/energy/stats', methods=['GET'])
+def get_energy_stats():
+    """Servers and zones in the energy ledger and the memory its rollups hold"""
+    return jsonify(energy_ledger.stats())
+
+def requested_time(args, name, default):
+    """Time from ?name= as epoch seconds or ISO text, or default"""
+    value = args.get(name)
+    if value is None:
+        return default
+    try:
+        return np.datetime64(int(value), 's')
+    except OverflowError:
+        raise ValueError(f"?{name}={value} is out of range")
+    except ValueError:
+        return np.datetime64(value, 's')
+
+@app.route('/api/history', methods=['GET'])
+def get_history():
+    """Downsampled history of ?server=ID from ?start= to ?end= (default: the last stored day)"""
+    if history is None:
+        return jsonify({'error': "No history store is configured; set HISTORY_PATH"}), 404
+    if history.end_time() is None:
+        return jsonify({'error': "History store is empty"}), 404
+    try:
+        if 'server' not in request.args:
+            raise ValueError("Give the server as ?server=ID")
+        form = response_form()
+        end = requested_time(request.args, 'end', history.end_time())
+        start = requested_time(request.args, 'start', end - np.timedelta64(1, 'D'))
+        result = history_series(
+            history, int(request.args['server']), start, end,
+            points=int(request.args.get('points', 500)),
+            resolution=int(request.args['resolution']) if 'resolution' in request.args else None,
+            method=request.args.get('method', 'minmax'),
+            metrics=request.args['metrics'].split(',') if 'metrics' in request.args else None
+        )
+    except (ValueError, OverflowError) as e:
+        return jsonify({'error': str(e)}), 400
+    if form == 'json':
+        result = to_json(result)
+        result['series'] = {metric: [dict(zip(columns, values)) for values in zip(*columns.values())]
+                            for metric, columns in result['series'].items()}
+        return jsonify(result)
+    return negotiated_response(result, form)
+
+@app.route('/api/anomalies', methods=['GET'])
+def get_anomalies():
+    """Servers flagged by the anomaly detector, with their anomaly kinds and deviation scores"""
+    flagged = to_json(anomaly_detector.flagged())
+    return jsonify({
+        'anomalies': [dict(zip(flagged, values)) for values in zip(*flagged.values())],
+        'kinds': ANOMALY_KINDS,
+        'stats': anomaly_detector.stats()
     })
 
+@app.route('/api/control/cycle', methods=['GET'])
+def run_control_cycle():
+    """Run forecast, allocation and cooling server-side and return one compact response"""
+    try:
+        return jsonify(to_json(control_loop.run_cycle()))
+    except ShardError as e:
+        return jsonify({'error': f"Control cycle failed: {e}"}), 503
+
+@app.route('/api/scenarios', methods=['POST'])
+def run_scenarios():
+    """Evaluate a grid of what-if perturbations of the current fleet in one vectorized pass"""
+    try:
+        grid = request_payload()
+        form = response_form()
+        baseline = fleet_baseline(cached_forecast(registry.get('workload')), fleet_status(telemetry))
+        scenarios = scenario_grid(grid, baseline['server_id'], ROOM_CONDITIONS['humidity'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    version = '|'.join(registry.version(name) for name in ('workload', 'resource', 'cooling'))
+    outcome = result_cache.get_or_compute(
+        'scenarios', {'grid': grid, 'telemetry': telemetry.version()}, version,
+        lambda: scenario_runner.run(baseline, scenarios)
+    )
+    if form == 'json':
+        columns = to_json(outcome)
+        return jsonify({'scenarios': [dict(zip(columns, values)) for values in zip(*columns.values())]})
+    return negotiated_response({'scenarios': outcome}, form)
+
+@app.route('/api/stream', methods=['GET'])
+def stream_updates():
+    """Server-Sent Events stream: a snapshot on connect, then per-tick deltas"""
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    last_seq = int(last_event_id) if last_event_id.isdigit() else None
+    return Response(
+        stream_hub.subscribe(last_seq),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/stream/stats', methods=['GET'])
+def get_stream_stats():
+    """Connected stream clients and producer tick time"""
+    return jsonify(stream_hub.stats())
+
 if __name__ == '__main__':
     app.run(debug=True) 
\ No newline at end of file
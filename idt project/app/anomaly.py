@@ -0,0 +1,256 @@
+import os
+import threading
+import numpy as np
+from app.telemetry import ServerIndex
+
+# Channels with mean-variance statistics, the first columns of FEATURE_COLUMNS
+CHANNELS = ['cpu_percent', 'memory_percent', 'io_percent', 'temperature']
+
+# Channels compared with the control loop's forecast
+FORECAST_CHANNELS = ['cpu_percent', 'memory_percent', 'io_percent']
+
+# Anomaly kinds, one bit each (1 << index) in a server's flags
+ANOMALY_KINDS = ['cpu_spike', 'memory_spike', 'io_spike', 'temperature_spike',
+                 'forecast_residual', 'thermal_runaway', 'stuck_sensor']
+
+RESIDUAL = 1 << ANOMALY_KINDS.index('forecast_residual')
+RUNAWAY = 1 << ANOMALY_KINDS.index('thermal_runaway')
+STUCK = 1 << ANOMALY_KINDS.index('stuck_sensor')
+
+def anomaly_kinds(flags):
+    """Names of the anomaly kinds set in one server's flags"""
+    return [kind for i, kind in enumerate(ANOMALY_KINDS) if int(flags) >> i & 1]
+
+def _ewm_update(mean, var, x, rate):
+    """
+    Exponentially weighted Welford step, in place
+
+    With rate = 1 / n this is Welford's running mean and population variance,
+    so statistics are exact over the first 1 / alpha samples and exponentially
+    weighted after.
+    """
+    diff = x - mean
+    increment = rate * diff
+    mean += increment
+    var *= 1 - rate
+    var += (1 - rate) * diff * increment
+
+class AnomalyDetector:
+    """
+    Streaming per-server anomaly detection with O(1) work per sample
+
+    Per server slot and channel the detector keeps an exponentially weighted
+    mean and variance of the readings and of the residuals against the latest
+    control-loop forecast, the smoothed temperature slope and a count of
+    repeated temperature readings, all in preallocated arrays. A telemetry
+    batch is applied in rounds: round r updates every server's r-th sample of
+    the batch at once, so a fleet batch with one sample per server is a
+    handful of vectorized operations.
+
+    A sample is flagged when, after warmup samples, a reading (or residual) is
+    more than threshold standard deviations from its mean; as a thermal
+    runaway when the smoothed temperature slope exceeds both runaway_slope °C
+    per sample and threshold times its standard error; and as a stuck
+    sensor when an active server repeats the same temperature stuck_samples
+    times. A server's flags are those of its samples in the latest batch.
+
+    Missing or non-finite readings (sensor dropouts) are skipped per channel:
+    they leave that channel's statistics, sample count and temperature history
+    unchanged, and are counted in stats()['dropouts'].
+    """
+
+    def __init__(self, capacity=10000, alpha=0.05, threshold=4.0, warmup=20,
+                 min_std=1.0, runaway_slope=0.5, stuck_samples=30):
+        self.capacity = capacity
+        self.alpha = alpha
+        self.threshold = threshold
+        self.warmup = warmup
+        self.min_std = min_std
+        self.runaway_slope = runaway_slope
+        self.stuck_samples = stuck_samples
+        self.generation = 0  # Incremented on every update
+        self.lock = threading.Lock()
+
+        n_channels, n_forecast = len(CHANNELS), len(FORECAST_CHANNELS)
+        self._count = np.zeros((capacity, n_channels), dtype=np.int64)
+        self._mean = np.zeros((capacity, n_channels))
+        self._var = np.zeros((capacity, n_channels))
+        self._last = np.full(capacity, np.nan)          # Latest temperature
+        self._slope = np.zeros(capacity)                # Smoothed temperature change per sample
+        self._change_var = np.zeros(capacity)           # Variance of the temperature changes
+        self._repeats = np.zeros(capacity, dtype=np.int64)
+        self._forecast = np.full((capacity, n_forecast), np.nan)
+        self._residual_count = np.zeros(capacity, dtype=np.int64)
+        self._residual_mean = np.zeros((capacity, n_forecast))
+        self._residual_var = np.zeros((capacity, n_forecast))
+        self._flags = np.zeros(capacity, dtype=np.uint8)
+        self._score = np.zeros(capacity)                # Largest |z| of the latest batch
+        self._totals = np.zeros(len(ANOMALY_KINDS), dtype=np.int64)
+        self._dropouts = np.zeros(n_channels, dtype=np.int64)
+
+        self._index = ServerIndex(capacity)
+
+    def _zscores(self, diff, var, count):
+        """Deviations in standard deviations (floored at min_std), zero during warmup"""
+        z = diff / np.maximum(np.sqrt(var), self.min_std)
+        return np.where(count > self.warmup, z, 0.0)
+
+    def _step(self, slots, values, active):
+        """Apply one sample of each of distinct server slots; returns their flags and scores"""
+        # Dropouts keep the channel's mean: a zero-rate update leaves its statistics as they are
+        finite = np.isfinite(values)
+        self._dropouts += np.count_nonzero(~finite, axis=0)
+        count = self._count[slots] + finite
+        rate = np.where(finite, np.maximum(self.alpha, 1.0 / np.maximum(count, 1)), 0.0)
+        mean, var = self._mean[slots], self._var[slots]
+        z = np.where(finite, self._zscores(values - mean, var, count - 1), 0.0)
+        _ewm_update(mean, var, np.where(finite, values, mean), rate)
+        self._mean[slots], self._var[slots] = mean, var
+        self._count[slots] = count
+
+        flags = np.zeros(len(slots), dtype=np.uint8)
+        for channel in range(len(CHANNELS)):
+            flags |= (np.abs(z[:, channel]) > self.threshold).astype(np.uint8) << channel
+
+        channel = CHANNELS.index('temperature')
+        temperature, seen, temperature_count = values[:, channel], finite[:, channel], count[:, channel]
+        change = temperature - self._last[slots]
+        known = np.isfinite(change)
+        changed = slots[known]
+        slope, change_var = self._slope[changed], self._change_var[changed]
+        _ewm_update(slope, change_var, change[known], np.maximum(self.alpha, 1.0 / (temperature_count[known] - 1)))
+        self._slope[changed], self._change_var[changed] = slope, change_var
+        slope, change_var = self._slope[slots], self._change_var[slots]
+        self._last[slots] = np.where(seen, temperature, self._last[slots])
+        # A ramp holds a steady z-score against its lagging mean but not against the
+        # noise of changes: white noise of std s gives the slope a std of alpha * s * sqrt(2 / (2 - alpha))
+        noise = self.alpha * np.sqrt(2 / (2 - self.alpha)) * np.maximum(np.sqrt(change_var / 2), self.min_std)
+        runaway = (temperature_count > self.warmup) & (slope > np.maximum(self.runaway_slope, self.threshold * noise))
+        flags |= runaway.astype(np.uint8) * RUNAWAY
+
+        repeats = np.where(known & (change == 0) & active, self._repeats[slots] + 1, 0)
+        repeats = np.where(seen, repeats, self._repeats[slots])
+        self._repeats[slots] = repeats
+        flags |= (repeats >= self.stuck_samples).astype(np.uint8) * STUCK
+
+        # Residuals against the latest forecast, for servers that have one and all its readings
+        residual = values[:, :len(FORECAST_CHANNELS)] - self._forecast[slots]
+        forecast = np.isfinite(residual).all(axis=1)
+        score = np.abs(z).max(axis=1)
+        if forecast.any():
+            forecast_slots = slots[forecast]
+            residual = residual[forecast]
+            residual_count = self._residual_count[forecast_slots] + 1
+            residual_mean, residual_var = self._residual_mean[forecast_slots], self._residual_var[forecast_slots]
+            residual_z = np.abs(self._zscores(residual - residual_mean, residual_var,
+                                              (residual_count - 1)[:, None])).max(axis=1)
+            _ewm_update(residual_mean, residual_var, residual,
+                        np.maximum(self.alpha, 1.0 / residual_count)[:, None])
+            self._residual_mean[forecast_slots], self._residual_var[forecast_slots] = residual_mean, residual_var
+            self._residual_count[forecast_slots] = residual_count
+            flags[forecast] |= (residual_z > self.threshold).astype(np.uint8) * RESIDUAL
+            score[forecast] = np.maximum(score[forecast], residual_z)
+        return flags, score
+
+    def update(self, server_ids, features):
+        """
+        Update the statistics with a telemetry batch and flag its anomalies
+
+        Args:
+            server_ids: Array of server ids, one per sample
+            features: (n_samples, n_features) array in FEATURE_COLUMNS order,
+                      samples in time order
+
+        Returns:
+            Number of servers of the batch with at least one anomaly
+        """
+        server_ids = np.asarray(server_ids, dtype=np.int64)
+        features = np.asarray(features)
+        with self.lock:
+            slots = self._index.register(server_ids)
+            tracked = slots >= 0
+            slots, features = slots[tracked], features[tracked]
+            if not len(slots):
+                return 0
+            values = features[:, :len(CHANNELS)].astype(np.float64)
+            active = features[:, len(CHANNELS)] > 0
+
+            # Rank of each sample among the batch samples of the same server
+            unique_slots, inverse = np.unique(slots, return_inverse=True)
+            order = np.argsort(inverse, kind='stable')
+            counts = np.bincount(inverse)
+            rank = np.empty(len(slots), dtype=np.int64)
+            rank[order] = np.arange(len(slots)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+            self._flags[unique_slots] = 0
+            self._score[unique_slots] = 0
+            boundaries = np.cumsum(np.bincount(rank))[:-1]
+            for rows in np.split(np.argsort(rank, kind='stable'), boundaries):
+                round_slots = slots[rows]
+                flags, score = self._step(round_slots, values[rows], active[rows])
+                self._flags[round_slots] |= flags
+                self._score[round_slots] = np.maximum(self._score[round_slots], score)
+                bits = np.unpackbits(flags[:, None], axis=1, bitorder='little')
+                self._totals += bits.sum(axis=0, dtype=np.int64)[:len(ANOMALY_KINDS)]
+            self.generation += 1
+            return int(np.count_nonzero(self._flags[unique_slots]))
+
+    def record_forecast(self, server_ids, cpu, memory, io):
+        """Latest forecast of each server, which later readings are compared with"""
+        with self.lock:
+            slots = self._index.register(server_ids)
+            tracked = slots >= 0
+            self._forecast[slots[tracked]] = np.stack([cpu, memory, io], axis=1)[tracked]
+
+    def flags_for(self, server_ids):
+        """Current flags of each server id (0 for servers not tracked)"""
+        with self.lock:
+            slots = self._index.lookup(server_ids)
+            return np.where(slots >= 0, self._flags[slots], 0).astype(np.uint8)
+
+    def flagged(self):
+        """
+        Servers flagged by their latest batch
+
+        Returns:
+            Dictionary of columns 'server_id', 'flags', 'kinds' (list of names
+            per server) and 'score' (largest deviation, in standard deviations)
+        """
+        with self.lock:
+            flagged = self._flags[self._index.sorted_slots] > 0
+            server_ids = self._index.sorted_ids[flagged]
+            slots = self._index.sorted_slots[flagged]
+            flags = self._flags[slots]
+            score = np.round(self._score[slots], 2)
+        return {
+            'server_id': server_ids,
+            'flags': flags.astype(np.int64),
+            'kinds': [anomaly_kinds(value) for value in flags],
+            'score': score
+        }
+
+    def stats(self):
+        """Tracked and flagged servers, flagged samples per kind, dropped readings per channel and the memory held"""
+        with self.lock:
+            arrays = [value for value in vars(self).values() if isinstance(value, np.ndarray)]
+            return {
+                'servers': len(self._index),
+                'flagged': int(np.count_nonzero(self._flags)),
+                'flagged_samples': dict(zip(ANOMALY_KINDS, self._totals.tolist())),
+                'dropouts': dict(zip(CHANNELS, self._dropouts.tolist())),
+                'memory_bytes': int(sum(array.nbytes for array in arrays) + self._index.nbytes)
+            }
+
+def detector_from_env(capacity):
+    """
+    AnomalyDetector configured from the environment
+
+    ANOMALY_ALPHA: Weight of each new sample in the moving statistics (default 0.05)
+    ANOMALY_THRESHOLD: Deviation, in standard deviations, that is flagged (default 4)
+    ANOMALY_WARMUP: Samples per server before flagging starts (default 20)
+    ANOMALY_STUCK_SAMPLES: Repeated temperature readings flagged as a stuck sensor (default 30)
+    """
+    return AnomalyDetector(
+        capacity, float(os.environ.get('ANOMALY_ALPHA', 0.05)), float(os.environ.get('ANOMALY_THRESHOLD', 4.0)),
+        int(os.environ.get('ANOMALY_WARMUP', 20)), stuck_samples=int(os.environ.get('ANOMALY_STUCK_SAMPLES', 30))
+    )
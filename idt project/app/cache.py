@@ -0,0 +1,218 @@
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+def _json_default(value):
+    """Serialize NumPy values so payloads hash the same as their JSON form"""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def canonical_key(namespace, payload, version):
+    """
+    Hash a request payload into a cache key
+
+    Keys are insensitive to dict ordering and whitespace, and change whenever
+    the model version changes.
+
+    Args:
+        namespace: Which computation the result belongs to, e.g. 'forecast'
+        payload: JSON-compatible input (NumPy arrays allowed)
+        version: Model version string, see ModelRegistry.version
+
+    Returns:
+        Hex digest string
+    """
+    body = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=_json_default)
+    digest = hashlib.sha256(f"{namespace}|{version}|".encode('utf-8'))
+    digest.update(body.encode('utf-8'))
+    return digest.hexdigest()
+
+class MemoryCache:
+    """In-process LRU cache with per-entry expiry"""
+
+    def __init__(self, max_entries=256, ttl=30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (found, value) for key, dropping it if expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key, value):
+        """Store value under key, evicting the least recently used entries"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+class SqliteCache:
+    """Cache shared between processes (e.g. gunicorn workers) through a SQLite file
+
+    Values are pickled. Entries expire after ttl seconds and the least recently
+    read entries are evicted beyond max_entries.
+    """
+
+    def __init__(self, path, max_entries=1024, ttl=30.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = self._connection()
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL, accessed REAL NOT NULL)'
+        )
+        connection.execute('CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)')
+        connection.commit()
+
+    def _connection(self):
+        """One connection per thread; WAL lets readers and a writer work concurrently"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        """Return (found, value) for key, dropping it if expired"""
+        connection = self._connection()
+        now = time.time()
+        row = connection.execute('SELECT value, expires FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return False, None
+        if row[1] < now:
+            connection.execute('DELETE FROM results WHERE key = ?', (key,))
+            connection.commit()
+            return False, None
+        connection.execute('UPDATE results SET accessed = ? WHERE key = ?', (now, key))
+        connection.commit()
+        return True, pickle.loads(row[0])
+
+    def set(self, key, value):
+        """Store value under key, evicting expired and least recently read entries"""
+        connection = self._connection()
+        now = time.time()
+        connection.execute(
+            'INSERT OR REPLACE INTO results (key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+            (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), now + self.ttl, now)
+        )
+        connection.execute('DELETE FROM results WHERE expires < ?', (now,))
+        connection.execute(
+            'DELETE FROM results WHERE key IN ('
+            'SELECT key FROM results ORDER BY accessed DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+        connection.commit()
+
+    def clear(self):
+        """Drop every entry"""
+        connection = self._connection()
+        connection.execute('DELETE FROM results')
+        connection.commit()
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+class ResultCache:
+    """Caches model results keyed on a canonical hash of the input and model version"""
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def _count(self, namespace, field):
+        with self._lock:
+            counters = self._counters.setdefault(namespace, {'hits': 0, 'misses': 0})
+            counters[field] += 1
+
+    def get_or_compute(self, namespace, payload, version, compute):
+        """
+        Return the cached result for payload, or compute and store it
+
+        Args:
+            namespace: Which computation this is, e.g. 'forecast', 'allocate', 'cooling'
+            payload: JSON-compatible input the result depends on
+            version: Model version string
+            compute: Zero-argument callable producing the result on a miss
+        """
+        if self.backend is None:
+            return compute()
+
+        key = canonical_key(namespace, payload, version)
+        found, value = self.backend.get(key)
+        if found:
+            self._count(namespace, 'hits')
+            return value
+
+        self._count(namespace, 'misses')
+        value = compute()
+        self.backend.set(key, value)
+        return value
+
+    def stats(self):
+        """Hit/miss counters per namespace (for this process) and backend details"""
+        with self._lock:
+            counters = {namespace: dict(values) for namespace, values in self._counters.items()}
+        return {
+            'backend': type(self.backend).__name__ if self.backend is not None else None,
+            'entries': len(self.backend) if self.backend is not None else 0,
+            'counters': counters
+        }
+
+def cache_from_env():
+    """
+    Build the result cache from environment variables
+
+    RESULT_CACHE: 'memory' (default), 'sqlite' or 'off'
+    RESULT_CACHE_TTL: Entry lifetime in seconds (default 30)
+    RESULT_CACHE_SIZE: Maximum number of entries (default 256)
+    RESULT_CACHE_PATH: SQLite file for the shared backend
+    """
+    kind = os.environ.get('RESULT_CACHE', 'memory')
+    ttl = float(os.environ.get('RESULT_CACHE_TTL', 30))
+    max_entries = int(os.environ.get('RESULT_CACHE_SIZE', 256))
+
+    if kind == 'off':
+        return ResultCache(None)
+    if kind == 'sqlite':
+        path = os.environ.get('RESULT_CACHE_PATH', os.path.join('app', 'data', 'result_cache.sqlite'))
+        return ResultCache(SqliteCache(path, max_entries=max_entries, ttl=ttl))
+    if kind == 'memory':
+        return ResultCache(MemoryCache(max_entries=max_entries, ttl=ttl))
+    raise ValueError(f"Unknown RESULT_CACHE backend: {kind}")
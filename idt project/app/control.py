@@ -0,0 +1,256 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from app.telemetry import FEATURE_COLUMNS
+from app.anomaly import RUNAWAY, STUCK
+from app.models.workload_forecasting import horizon_label, point_forecast
+
+# Demo fleet reported until telemetry is ingested
+MOCK_SERVERS = {
+    'id': np.array([1, 2, 3, 4]),
+    'status': np.array(['active', 'active', 'hibernating', 'active']),
+    'cpu': np.array([78.0, 45.0, 5.0, 90.0]),
+    'memory': np.array([65.0, 80.0, 10.0, 75.0]),
+    'io': np.array([45.0, 30.0, 2.0, 60.0]),
+    'temperature': np.array([42.0, 38.0, 25.0, 48.0])
+}
+
+# Room conditions (would come from building sensors in a real system)
+ROOM_CONDITIONS = {
+    'level': 'medium',
+    'temperature': 22,  # °C
+    'humidity': 45      # percentage
+}
+
+# Demo energy figures reported until the energy ledger has records
+ENERGY_SUMMARY = {
+    'current': 4.2,  # kW
+    'saved': 1.8,    # kW
+    'renewable': 65  # percentage
+}
+
+def fleet_status(telemetry):
+    """
+    Latest per-server readings as columns
+
+    Args:
+        telemetry: TelemetryBuffer; mock servers are used while it is empty
+
+    Returns:
+        Dictionary of NumPy arrays keyed by 'id', 'status', 'cpu', 'memory', 'io'
+        and 'temperature'
+    """
+    if telemetry.n_servers == 0:
+        return MOCK_SERVERS
+
+    server_ids, latest = telemetry.latest()
+    latest = np.round(latest.astype(np.float64), 1)
+    column = {name: latest[:, i] for i, name in enumerate(FEATURE_COLUMNS)}
+    return {
+        'id': server_ids,
+        'status': np.where(column['is_active'] > 0, 'active', 'hibernating'),
+        'cpu': column['cpu_percent'],
+        'memory': column['memory_percent'],
+        'io': column['io_percent'],
+        'temperature': column['temperature']
+    }
+
+def forecast_columns(forecast_data):
+    """Convert a per-point predict() result into long-format forecast columns"""
+    forecasts = forecast_data['forecasts']
+    return {
+        'server_id': np.array([f['server_id'] for f in forecasts]),
+        'time_offset': np.array([f['time_offset'] for f in forecasts]),
+        'cpu_forecast': np.array([f['cpu_forecast'] for f in forecasts], dtype=np.float64),
+        'memory_forecast': np.array([f['memory_forecast'] for f in forecasts], dtype=np.float64),
+        'io_forecast': np.array([f['io_forecast'] for f in forecasts], dtype=np.float64)
+    }
+
+def forecast_points(batch):
+    """Convert long-format forecast columns into the per-point predict() format"""
+    columns = to_json(batch)
+    return {
+        'forecasts': [dict(zip(columns, values)) for values in zip(*columns.values())],
+        'timestamp': pd.Timestamp.now().isoformat(),
+        'forecast_horizon': horizon_label(max(columns['time_offset'], default=1))
+    }
+
+def horizon_arrays(server_ids, steps, hours, quantiles=None, include_quantiles=False):
+    """
+    Compact multi-horizon forecast: one nested array instead of one dict per point
+
+    Args:
+        server_ids: Server id of each row of steps
+        steps: (n_servers, forecast_horizon, 3, n_quantiles) predict_steps output
+        hours: Hours ahead to report (1 is the next hour)
+        quantiles: Quantile levels of the last axis (the model's), which select the median
+        include_quantiles: Also return every quantile forecast, for quantile models
+
+    Returns:
+        Dictionary with 'server_id', 'hours', 'metrics', 'forecast' of shape
+        (n_servers, len(hours), 3) and, with quantiles, 'quantiles' and
+        'quantile_forecast' of shape (n_servers, len(hours), 3, n_quantiles)
+    """
+    selected = steps[:, np.asarray(hours, dtype=np.int64) - 1].astype(np.float64)
+    result = {
+        'server_id': np.asarray(server_ids),
+        'hours': np.asarray(hours),
+        'metrics': ['cpu', 'memory', 'io'],
+        'forecast': np.round(point_forecast(selected, quantiles), 1)
+    }
+    if quantiles and include_quantiles:
+        result['quantiles'] = list(quantiles)
+        result['quantile_forecast'] = np.round(selected, 1)
+    return result
+
+def forecast_batch(model, server_ids, windows):
+    """Next-hour forecast columns of a batch of windows, rounded as served"""
+    batch = model.predict_batch(windows, server_ids)
+    for key in ('cpu_forecast', 'memory_forecast', 'io_forecast'):
+        batch[key] = np.round(batch[key].astype(np.float64), 1)
+    batch['time_offset'] = np.ones(len(batch['server_id']), dtype=np.int64)
+    return batch
+
+def to_json(value):
+    """Recursively convert NumPy arrays and scalars in a result to JSON types"""
+    if isinstance(value, dict):
+        return {key: to_json(item) for key, item in value.items()}
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+class ControlLoop:
+    """Runs forecast -> allocation and cooling in-process on shared arrays
+
+    Cooling depends only on current readings, so it runs on a worker thread
+    while the forecast and allocation stages run on the calling thread. NumPy
+    and TensorFlow release the GIL in their kernels, so the stages overlap.
+
+    With an anomaly detector, servers in thermal runaway shed load, servers
+    with any anomaly are neither hibernated nor used as migration targets,
+    and cooling ignores stuck temperature sensors. Each cycle's forecast
+    becomes the baseline of the detector's forecast residuals.
+    """
+
+    def __init__(self, registry, telemetry, ledger=None, detector=None):
+        self.registry = registry
+        self.telemetry = telemetry
+        self.ledger = ledger
+        self.detector = detector
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cooling')
+
+    @staticmethod
+    def _timed(timings, stage, function, *args):
+        """Call function(*args) and record its wall time in milliseconds"""
+        start = time.perf_counter()
+        result = function(*args)
+        timings[stage] = round((time.perf_counter() - start) * 1000, 3)
+        return result
+
+    def _forecast(self):
+        """Columnar forecast from buffered telemetry, or the model's demo forecast"""
+        model = self.registry.get('workload')
+        if self.telemetry.ready_count():
+            server_ids, windows = self.telemetry.windows()
+            return forecast_batch(model, server_ids, windows)
+        return forecast_columns(model.predict())
+
+    @staticmethod
+    def _nearest(forecast):
+        """Rows of the nearest forecast step of every server"""
+        return forecast['time_offset'] == forecast['time_offset'].min() if len(forecast['time_offset']) else []
+
+    def _anomaly_flags(self, server_ids):
+        """Anomaly detector flags of servers (all zero without a detector)"""
+        if self.detector is None:
+            return np.zeros(len(server_ids), dtype=np.uint8)
+        return self.detector.flags_for(server_ids)
+
+    def _allocate(self, forecast):
+        """Allocation decisions for the nearest forecast step of every server"""
+        nearest = self._nearest(forecast)
+        flags = self._anomaly_flags(forecast['server_id'][nearest])
+        return self.registry.get('resource').decide_batch(
+            forecast['server_id'][nearest],
+            forecast['cpu_forecast'][nearest],
+            forecast['memory_forecast'][nearest],
+            forecast['io_forecast'][nearest],
+            overheating=(flags & RUNAWAY) > 0,
+            suspect=flags > 0
+        )
+
+    def _cool(self, status, humidity):
+        """Cooling settings from current readings"""
+        flags = self._anomaly_flags(status['id'])
+        return self.registry.get('cooling').optimize_arrays(
+            status['temperature'], status['cpu'], status['memory'], humidity,
+            runaway=(flags & RUNAWAY) > 0, stuck=(flags & STUCK) > 0
+        )
+
+    def _plan(self, timings):
+        """Forecast and allocation stages; returns (forecast, allocation) columns"""
+        forecast = self._timed(timings, 'forecast', self._forecast)
+        return forecast, self._timed(timings, 'allocation', self._allocate, forecast)
+
+    def run_cycle(self, humidity=None):
+        """
+        Run one control cycle
+
+        Args:
+            humidity: Ambient humidity override (defaults to ROOM_CONDITIONS)
+
+        The decisions are recorded in the energy ledger, if there is one, and
+        the status reports its current totals.
+
+        Returns:
+            Dictionary with 'status', 'forecast' and 'allocation' columns (NumPy
+            arrays), 'cooling' settings, per-stage 'timings_ms' and, with an
+            anomaly detector, the flagged servers as 'anomalies' columns
+        """
+        timings = {}
+        start = time.perf_counter()
+        humidity = ROOM_CONDITIONS['humidity'] if humidity is None else humidity
+
+        status = self._timed(timings, 'status', fleet_status, self.telemetry)
+        cooling = self._executor.submit(self._timed, timings, 'cooling', self._cool, status, humidity)
+        forecast, allocation = self._plan(timings)
+        cooling = cooling.result()
+
+        anomalies = None
+        if self.detector is not None:
+            if self.telemetry.ready_count():
+                nearest = self._nearest(forecast)
+                self.detector.record_forecast(
+                    forecast['server_id'][nearest], forecast['cpu_forecast'][nearest],
+                    forecast['memory_forecast'][nearest], forecast['io_forecast'][nearest]
+                )
+            anomalies = self.detector.flagged()
+
+        energy = ENERGY_SUMMARY
+        if self.ledger is not None:
+            self.ledger.record_allocation(
+                allocation['server_id'], forecast['cpu_forecast'][self._nearest(forecast)],
+                allocation['action'], allocation['expected_energy_savings']
+            )
+            self.ledger.record_cooling(['fleet'], [cooling['fan_speed_percent']])
+            energy = self.ledger.summary()
+
+        timings['total'] = round((time.perf_counter() - start) * 1000, 3)
+        result = {
+            'timestamp': pd.Timestamp.now().isoformat(),
+            'status': {
+                'servers': status,
+                'energy': energy,
+                'cooling': dict(ROOM_CONDITIONS, humidity=humidity)
+            },
+            'forecast': forecast,
+            'allocation': allocation,
+            'cooling': cooling,
+            'timings_ms': timings
+        }
+        if anomalies is not None:
+            result['anomalies'] = anomalies
+        return result
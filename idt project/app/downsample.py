@@ -0,0 +1,169 @@
+import numpy as np
+from app.history import STORE_COLUMNS, combine_summaries
+
+# Downsampling methods of history_series
+METHODS = ('minmax', 'lttb')
+
+# Most buckets or points one series may be downsampled to
+MAX_POINTS = 10000
+
+# LTTB picks its points from slots at least this many times denser than its output
+LTTB_OVERSAMPLE = 4
+
+def lttb(x, y, n_out):
+    """
+    Indices of the points Largest-Triangle-Three-Buckets keeps of a series
+
+    The first and last points are always kept. The points between them are
+    split into n_out - 2 buckets, and each bucket keeps the point forming the
+    largest triangle with the point kept before it and the mean of the next
+    bucket. Bucket means and a padded (bucket, point) matrix are computed up
+    front, so the sequential part is one argmax per bucket, shared by all
+    series when y holds several.
+
+    Args:
+        x: Increasing x coordinates
+        y: Values of shape (n_points,) or (n_points, n_series), without NaN
+        n_out: Number of points to keep
+
+    Returns:
+        Increasing int64 indices into x, of shape (n_out,) or (n_out, n_series)
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n_points = len(x)
+    if n_out >= n_points or n_out < 3:
+        return np.broadcast_to(np.arange(n_points).reshape((-1,) + (1,) * (y.ndim - 1)), y.shape).copy()
+    x = np.asarray(x, dtype=np.float64)
+    series = y.reshape(n_points, -1)
+
+    edges = (1 + np.arange(n_out - 1) * ((n_points - 2) / (n_out - 2))).astype(np.int64)
+    edges[-1] = n_points - 1
+    starts, lengths = edges[:-1], np.diff(edges)
+    # Mean of every bucket; the last point stands in for the bucket after the last
+    next_x = np.append((np.add.reduceat(x[:-1], starts) / lengths)[1:], x[-1])
+    next_y = np.vstack([(np.add.reduceat(series[:-1], starts) / lengths[:, None])[1:], series[-1:]])
+
+    # Short buckets are padded with their first point, which argmax already prefers on ties
+    index = starts[:, None] + np.arange(lengths.max())
+    index = np.where(index < edges[1:, None], index, starts[:, None])
+    bucket_x, bucket_y = x[index][:, :, None], series[index]
+
+    kept = np.empty((n_out, series.shape[1]), dtype=np.int64)
+    kept[0], kept[-1] = 0, n_points - 1
+    columns = np.arange(series.shape[1])
+    anchor = kept[0]
+    for i in range(len(starts)):
+        anchor_x, anchor_y = x[anchor], series[anchor, columns]
+        area = np.abs((anchor_x - next_x[i]) * (bucket_y[i] - anchor_y) -
+                      (anchor_x - bucket_x[i]) * (next_y[i] - anchor_y))
+        anchor = index[i, np.argmax(area, axis=0)]
+        kept[i + 1] = anchor
+    return kept.reshape((n_out,) + y.shape[1:])
+
+def _source_level(store, width):
+    """Coarsest stored level (the store resolution or a pyramid level) no wider than width seconds"""
+    return max([level for level in store.levels if level <= width], default=store.resolution)
+
+def _iso(times):
+    return np.datetime_as_string(times, timezone='UTC')
+
+def history_series(store, server_id, start, end, points=500, resolution=None, method='minmax', metrics=None):
+    """
+    Downsampled history of one server, for charts
+
+    'minmax' splits the range into buckets of whole slots of the coarsest
+    level that fits and returns min, max, mean and sample count per bucket.
+    Buckets are aligned to multiples of their width, so they stay put as the
+    range moves. 'lttb' runs Largest-Triangle-Three-Buckets over the per-slot
+    means of the coarsest level at least LTTB_OVERSAMPLE times denser than
+    the output. Either way the pyramid bounds the slots read by a multiple of
+    the points asked for, so a year-long range costs about as much as an hour.
+
+    Args:
+        store: HistoryStore
+        server_id: Server id
+        start, end: Time range
+        points: Approximate number of buckets or points (3 to MAX_POINTS)
+        resolution: Seconds per bucket, instead of points
+        method: 'minmax' or 'lttb'
+        metrics: STORE_COLUMNS names to return (default all)
+
+    Returns:
+        Dictionary with the range, 'bucket_s' (bucket width), 'source_s' (slot
+        width read) and 'series': per metric, columns 'timestamp' (UTC ISO)
+        with 'min', 'max', 'avg' and 'count' (minmax) or 'value' (lttb).
+        Buckets without samples are left out.
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {list(METHODS)}")
+    metrics = list(STORE_COLUMNS) if metrics is None else list(metrics)
+    unknown = [metric for metric in metrics if metric not in STORE_COLUMNS]
+    if unknown or not metrics:
+        raise ValueError(f"Unknown metrics {unknown}; expected some of {STORE_COLUMNS}")
+    start = np.datetime64(start, 's')
+    end = np.datetime64(end, 's')
+    span = int((end - start).astype(np.int64))
+    if span <= 0:
+        raise ValueError("end must be after start")
+    if resolution is None:
+        if not 3 <= points <= MAX_POINTS:
+            raise ValueError(f"points must be between 3 and {MAX_POINTS}")
+        width = -(-span // points)
+    else:
+        width = int(resolution)
+        if width <= 0 or -(-span // width) > MAX_POINTS:
+            raise ValueError(f"resolution must be positive and give at most {MAX_POINTS} buckets")
+    width = max(width, store.resolution)
+    channels = [STORE_COLUMNS.index(metric) for metric in metrics]
+
+    series = {}
+    if method == 'minmax':
+        level = _source_level(store, width)
+        width = -(-width // level) * level
+        first = start.astype(np.int64) // width * width
+        stop = -(-end.astype(np.int64) // width) * width
+        times, summary = store.summaries(server_id, np.datetime64(int(first), 's'),
+                                         np.datetime64(int(stop), 's'), level)
+        buckets = combine_summaries(summary, width // level).astype(np.float64)
+        times = times[::width // level]
+        for metric, channel in zip(metrics, channels):
+            stats = buckets[:, channel]
+            present = stats[:, 3] > 0
+            stats = stats[present]
+            series[metric] = {
+                'timestamp': _iso(times[present]),
+                'min': np.round(stats[:, 0], 2),
+                'max': np.round(stats[:, 1], 2),
+                'avg': np.round(stats[:, 2] / stats[:, 3], 2),
+                'count': stats[:, 3].astype(np.int64)
+            }
+    else:
+        level = _source_level(store, width // LTTB_OVERSAMPLE)
+        times, summary = store.summaries(server_id, start, end, level)
+        n_out = -(-span // width)
+        stats = summary[:, channels].astype(np.float64)
+        present = stats[..., 3] > 0
+        # Channels are written together, so they normally share their empty slots and one pass
+        groups = {}
+        for position, metric in enumerate(metrics):
+            groups.setdefault(present[:, position].tobytes(), []).append(position)
+        for positions in groups.values():
+            rows = present[:, positions[0]]
+            means = stats[rows][:, positions, 2] / stats[rows][:, positions, 3]
+            kept = lttb(times[rows].astype(np.int64), means, n_out)
+            for column, position in enumerate(positions):
+                series[metrics[position]] = {
+                    'timestamp': _iso(times[rows][kept[:, column]]),
+                    'value': np.round(means[kept[:, column], column], 2)
+                }
+        series = {metric: series[metric] for metric in metrics}
+
+    return {
+        'server_id': int(server_id),
+        'start': _iso(start),
+        'end': _iso(end),
+        'method': method,
+        'bucket_s': int(width),
+        'source_s': int(level),
+        'series': series
+    }
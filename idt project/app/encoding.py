@@ -0,0 +1,318 @@
+import json
+import struct
+import zlib
+import numpy as np
+from app.control import to_json
+
+# Media types offered by content negotiation
+JSON_MIME = 'application/json'
+COLUMNS_MIME = 'application/vnd.idt.columns+json'   # one array per field instead of one dict per row
+MSGPACK_MIME = 'application/msgpack'
+MSGPACK_MIMES = (MSGPACK_MIME, 'application/x-msgpack')
+
+# Largest request body accepted after decompression
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+# Deepest array/map nesting accepted in MessagePack bodies; deeper input is
+# rejected as malformed instead of exhausting the interpreter's recursion limit
+MAX_DEPTH = 64
+
+# Integer array encodings from smallest to largest: (low, high, marker, dtype);
+# a marker of None means MessagePack fixints, which are the value bytes themselves
+_INT_LAYOUTS = [
+    (-32, 127, None, 'i1'),
+    (0, 0xff, 0xcc, 'u1'),
+    (-0x80, 0x7f, 0xd0, 'i1'),
+    (0, 0xffff, 0xcd, '>u2'),
+    (-0x8000, 0x7fff, 0xd1, '>i2'),
+    (0, 0xffffffff, 0xce, '>u4'),
+    (-0x80000000, 0x7fffffff, 0xd2, '>i4'),
+    (-2 ** 63, 2 ** 63 - 1, 0xd3, '>i8'),
+    (0, 2 ** 64 - 1, 0xcf, '>u8')
+]
+
+# Fixed-width MessagePack number markers and their big-endian payloads
+_NUMBER_FORMATS = {
+    0xca: '>f4', 0xcb: '>f8',
+    0xcc: 'u1', 0xcd: '>u2', 0xce: '>u4', 0xcf: '>u8',
+    0xd0: 'i1', 0xd1: '>i2', 0xd2: '>i4', 0xd3: '>i8'
+}
+
+def _container_header(n, fix, marker16, marker32, fix_limit=16):
+    if n < fix_limit:
+        return bytes([fix | n])
+    if n < 0x10000:
+        return bytes([marker16]) + struct.pack('>H', n)
+    return bytes([marker32]) + struct.pack('>I', n)
+
+def _pack_int(value):
+    if -32 <= value <= 127:
+        return struct.pack('b', value)
+    for low, high, marker, dtype in _INT_LAYOUTS[1:]:
+        if low <= value <= high:
+            return bytes([marker]) + np.array(value, dtype=dtype).tobytes()
+    raise OverflowError(f"Integer {value} does not fit in 64 bits")
+
+def _pack_str(value):
+    data = value.encode('utf-8')
+    n = len(data)
+    if n < 32:
+        return bytes([0xa0 | n]) + data
+    if n < 0x100:
+        return bytes([0xd9, n]) + data
+    return _container_header(n, 0, 0xda, 0xdb, fix_limit=0) + data
+
+def _element_bytes(flat, float32):
+    """
+    MessagePack encoding of every element of a 1-D numeric array as an
+    (n, width) uint8 matrix, or None for arrays that need per-element packing
+    """
+    if flat.dtype == np.bool_:
+        return np.where(flat, 0xc3, 0xc2).astype(np.uint8)[:, None]
+    if flat.dtype.kind in 'iu':
+        low, high = int(flat.min()), int(flat.max())
+        marker, dtype = next((m, d) for lo, hi, m, d in _INT_LAYOUTS if lo <= low and high <= hi)
+        if marker is None:
+            return flat.astype(np.int8).view(np.uint8)[:, None]
+    elif flat.dtype.kind == 'f':
+        marker, dtype = (0xca, '>f4') if float32 or flat.dtype == np.float32 else (0xcb, '>f8')
+    else:
+        return None
+    records = np.empty(len(flat), dtype=[('marker', 'u1'), ('value', dtype)])
+    records['marker'] = marker
+    records['value'] = flat
+    return records.view(np.uint8).reshape(len(flat), -1)
+
+def _pack_ndarray(array, float32, parts):
+    """Pack an N-d array as nested MessagePack arrays, vectorized for numeric dtypes"""
+    elements = _element_bytes(array.ravel(), float32) if array.size else None
+    if elements is None:
+        items = array.tolist()
+        if array.ndim == 1 and set(map(type, items)) <= {str, type(None)}:
+            # Label columns (actions, levels, targets) repeat a few values: encode each once
+            encoded = {item: packb(item) for item in set(items)}
+            parts.append(_container_header(len(items), 0x90, 0xdc, 0xdd))
+            parts.append(b''.join(map(encoded.__getitem__, items)))
+        else:
+            _pack(items, float32, parts)
+        return
+    # Innermost rows first, then prepend each level's (constant) array header
+    block = elements.reshape(-1, array.shape[-1] * elements.shape[1])
+    for depth in range(array.ndim - 1, -1, -1):
+        header = np.frombuffer(_container_header(array.shape[depth], 0x90, 0xdc, 0xdd), dtype=np.uint8)
+        block = np.hstack([np.broadcast_to(header, (len(block), len(header))), block])
+        if depth:
+            block = block.reshape(-1, array.shape[depth - 1] * block.shape[1])
+    parts.append(block.tobytes())
+
+def _pack(value, float32, parts):
+    if value is None:
+        parts.append(b'\xc0')
+    elif isinstance(value, (bool, np.bool_)):
+        parts.append(b'\xc3' if value else b'\xc2')
+    elif isinstance(value, (int, np.integer)):
+        parts.append(_pack_int(int(value)))
+    elif isinstance(value, (float, np.floating)):
+        parts.append(b'\xcb' + struct.pack('>d', value))
+    elif isinstance(value, str):
+        parts.append(_pack_str(value))
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        data = bytes(value)
+        parts.append((bytes([0xc4, len(data)]) if len(data) < 0x100 else
+                      _container_header(len(data), 0, 0xc5, 0xc6, fix_limit=0)) + data)
+    elif isinstance(value, dict):
+        parts.append(_container_header(len(value), 0x80, 0xde, 0xdf))
+        for key, item in value.items():
+            _pack(key, float32, parts)
+            _pack(item, float32, parts)
+    elif isinstance(value, np.ndarray):
+        if value.ndim == 0:
+            _pack(value.item(), float32, parts)
+        else:
+            _pack_ndarray(value, float32, parts)
+    elif isinstance(value, (list, tuple)):
+        parts.append(_container_header(len(value), 0x90, 0xdc, 0xdd))
+        for item in value:
+            _pack(item, float32, parts)
+    else:
+        raise TypeError(f"Object of type {type(value).__name__} cannot be encoded as MessagePack")
+
+def packb(value, float32=False):
+    """
+    Encode a value as MessagePack
+
+    Numeric NumPy arrays are encoded in one vectorized pass as ordinary
+    MessagePack arrays, so any MessagePack library can read the result.
+
+    Args:
+        value: None, bool, int, float, str, bytes, dict, list/tuple or NumPy array
+        float32: Encode floating-point arrays as float32 (5 bytes per value
+                 instead of 9); scalar floats always keep full precision
+
+    Returns:
+        bytes
+    """
+    parts = []
+    _pack(value, float32, parts)
+    return b''.join(parts)
+
+def _unpack_array(data, pos, n, depth):
+    """Decode n array elements; homogeneous numeric runs become one NumPy array"""
+    if n >= 8 and pos < len(data):
+        marker = data[pos]
+        if marker <= 0x7f or marker >= 0xe0:
+            values = np.frombuffer(data, dtype=np.int8, count=n, offset=pos) if pos + n <= len(data) else None
+            if values is not None and (values >= -32).all():
+                return values.astype(np.int64), pos + n
+        elif marker in (0xc2, 0xc3):
+            values = np.frombuffer(data, dtype=np.uint8, count=n, offset=pos) if pos + n <= len(data) else None
+            if values is not None and ((values == 0xc2) | (values == 0xc3)).all():
+                return values == 0xc3, pos + n
+        elif marker in _NUMBER_FORMATS:
+            dtype = np.dtype([('marker', 'u1'), ('value', _NUMBER_FORMATS[marker])])
+            if pos + n * dtype.itemsize <= len(data):
+                records = np.frombuffer(data, dtype=dtype, count=n, offset=pos)
+                if (records['marker'] == marker).all():
+                    values = records['value']
+                    native = np.float64 if values.dtype.kind == 'f' else np.uint64 if marker == 0xcf else np.int64
+                    return values.astype(native), pos + n * dtype.itemsize
+
+    items = []
+    for _ in range(n):
+        item, pos = _unpack(data, pos, depth)
+        items.append(item)
+    return items, pos
+
+def _unpack(data, pos, depth=0):
+    if pos >= len(data):
+        raise ValueError("Truncated MessagePack data")
+    marker = data[pos]
+    pos += 1
+    if marker <= 0x7f:
+        return marker, pos
+    if marker >= 0xe0:
+        return marker - 0x100, pos
+    if marker <= 0x9f and depth >= MAX_DEPTH:
+        raise ValueError(f"MessagePack data nested deeper than {MAX_DEPTH} levels")
+    if marker <= 0x8f:
+        return _unpack_map(data, pos, marker & 0x0f, depth + 1)
+    if marker <= 0x9f:
+        return _unpack_array(data, pos, marker & 0x0f, depth + 1)
+    if marker <= 0xbf:
+        n = marker & 0x1f
+        return data[pos:pos + n].decode('utf-8'), pos + n
+    if marker == 0xc0:
+        return None, pos
+    if marker in (0xc2, 0xc3):
+        return marker == 0xc3, pos
+    if marker in _NUMBER_FORMATS:
+        dtype = np.dtype(_NUMBER_FORMATS[marker])
+        if pos + dtype.itemsize > len(data):
+            raise ValueError("Truncated MessagePack data")
+        return np.frombuffer(data, dtype=dtype, count=1, offset=pos)[0].item(), pos + dtype.itemsize
+    if marker in (0xc4, 0xc5, 0xc6, 0xd9, 0xda, 0xdb, 0xdc, 0xdd, 0xde, 0xdf):
+        size = {0xc4: 1, 0xc5: 2, 0xc6: 4, 0xd9: 1, 0xda: 2, 0xdb: 4, 0xdc: 2, 0xdd: 4, 0xde: 2, 0xdf: 4}[marker]
+        n = int.from_bytes(data[pos:pos + size], 'big')
+        pos += size
+        if marker <= 0xc6:
+            return data[pos:pos + n], pos + n
+        if marker <= 0xdb:
+            return data[pos:pos + n].decode('utf-8'), pos + n
+        if depth >= MAX_DEPTH:
+            raise ValueError(f"MessagePack data nested deeper than {MAX_DEPTH} levels")
+        if marker <= 0xdd:
+            return _unpack_array(data, pos, n, depth + 1)
+        return _unpack_map(data, pos, n, depth + 1)
+    raise ValueError(f"Unsupported MessagePack type 0x{marker:02x}")
+
+def _unpack_map(data, pos, n, depth):
+    result = {}
+    for _ in range(n):
+        key, pos = _unpack(data, pos, depth)
+        value, pos = _unpack(data, pos, depth)
+        try:
+            result[key] = value
+        except TypeError:
+            raise ValueError(f"Unhashable MessagePack map key of type {type(key).__name__}") from None
+    return result, pos
+
+def unpackb(data):
+    """
+    Decode MessagePack bytes
+
+    Arrays of 8 or more numbers sharing one encoding are decoded in one
+    vectorized step into a NumPy array (int64, float64 or bool); other arrays
+    become lists.
+
+    Raises:
+        ValueError: For truncated or malformed data, unhashable map keys, or
+                    nesting deeper than MAX_DEPTH
+    """
+    data = bytes(data)
+    value, pos = _unpack(data, 0)
+    if pos != len(data):
+        raise ValueError(f"{len(data) - pos} trailing bytes after MessagePack value")
+    return value
+
+def compress(body, encoding, level=1):
+    """Compress a response body with the 'gzip' or 'deflate' content coding"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31 if encoding == 'gzip' else 15)
+    return compressor.compress(body) + compressor.flush()
+
+def decompress(body, encoding, max_bytes=MAX_BODY_BYTES):
+    """
+    Decompress a request body sent with Content-Encoding gzip or deflate
+
+    Raises:
+        ValueError: For unknown codings, corrupt data, or bodies that expand beyond max_bytes
+    """
+    if encoding not in ('gzip', 'deflate'):
+        raise ValueError(f"Unsupported Content-Encoding: {encoding}")
+    # 47 accepts gzip and zlib headers; some clients send raw deflate streams
+    for wbits in ((47,) if encoding == 'gzip' else (47, -15)):
+        decompressor = zlib.decompressobj(wbits)
+        try:
+            data = decompressor.decompress(body, max_bytes)
+        except zlib.error:
+            continue
+        if decompressor.unconsumed_tail:
+            raise ValueError(f"Request body expands beyond {max_bytes} bytes")
+        return data
+    raise ValueError(f"Corrupt {encoding} request body")
+
+def decode_body(data, mimetype, content_encoding=None):
+    """
+    Parse a request body sent as JSON (row or columnar form) or MessagePack
+
+    Args:
+        data: Raw request body
+        mimetype: Content-Type without parameters
+        content_encoding: Optional 'gzip' or 'deflate'
+
+    Returns:
+        Decoded value (dict or list)
+
+    Raises:
+        ValueError: For malformed or unsupported bodies
+    """
+    if content_encoding and content_encoding != 'identity':
+        data = decompress(data, content_encoding)
+    if mimetype in MSGPACK_MIMES:
+        return unpackb(data)
+    return json.loads(data)
+
+def encode_body(value, form):
+    """
+    Serialize a response in a negotiated form
+
+    Args:
+        value: Result dictionary (NumPy arrays allowed)
+        form: 'json', 'columns' or 'msgpack'
+
+    Returns:
+        Tuple of (body bytes, media type)
+    """
+    if form == 'msgpack':
+        return packb(value, float32=True), MSGPACK_MIME
+    body = json.dumps(to_json(value), separators=(',', ':')).encode('utf-8')
+    return body, COLUMNS_MIME if form == 'columns' else JSON_MIME
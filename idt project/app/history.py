@@ -0,0 +1,526 @@
+import argparse
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# Stored channels, in column order; status is kept as 1.0 (active) / 0.0
+STORE_COLUMNS = ['cpu_percent', 'memory_percent', 'io_percent', 'temperature', 'is_active']
+
+# Seconds per slot of the summary pyramid levels of a new store; a level is kept
+# when it is a multiple of the level below it (starting at the store resolution)
+PYRAMID_LEVELS = (900, 10800, 86400)
+
+# Per pyramid slot and channel: min, max, sum and count of the samples it covers
+PYRAMID_FIELDS = ['min', 'max', 'sum', 'count']
+
+# Pyramid partitions cover whole days, as many as fit in about this many slots
+PYRAMID_PARTITION_SLOTS = 4096
+
+# Subdirectory of the store holding the pyramid levels
+PYRAMID_DIR = 'pyramid'
+
+# Fill of an empty pyramid slot, broadcast over PYRAMID_FIELDS
+_EMPTY_SUMMARY = np.array([np.nan, np.nan, 0, 0], dtype=np.float32)
+
+def _to_datetime64(timestamps):
+    """Parse timestamps (strings, datetime64 or epoch seconds) to datetime64[s]"""
+    timestamps = np.asarray(timestamps)
+    if timestamps.dtype.kind in 'iuf':
+        return timestamps.astype('int64').astype('datetime64[s]')
+    return timestamps.astype('datetime64[s]')
+
+def raw_summary(values):
+    """Samples (..., len(STORE_COLUMNS)) as one-sample summaries (..., len(STORE_COLUMNS), 4)"""
+    present = ~np.isnan(values)
+    return np.stack([values, values, np.where(present, values, 0), present], axis=-1).astype(np.float32)
+
+def combine_summaries(summary, factor):
+    """
+    Merge every factor consecutive slots of a summary array into one
+
+    Args:
+        summary: Array of shape (..., n_slots, n_channels, len(PYRAMID_FIELDS)),
+                 n_slots a multiple of factor
+
+    Returns:
+        Array of shape (..., n_slots // factor, n_channels, len(PYRAMID_FIELDS))
+    """
+    blocks = summary.reshape(summary.shape[:-3] + (-1, factor) + summary.shape[-2:])
+    return np.stack([
+        np.fmin.reduce(blocks[..., 0], axis=-2),
+        np.fmax.reduce(blocks[..., 1], axis=-2),
+        blocks[..., 2].sum(axis=-2),
+        blocks[..., 3].sum(axis=-2)
+    ], axis=-1)
+
+class HistoryStore:
+    """Columnar on-disk store of workload history, partitioned per server and day
+
+    Each partition is a raw float32 file <root>/<YYYY-MM-DD>/<server_id>.f32 of
+    shape (slots_per_day, len(STORE_COLUMNS)), where slot = seconds since
+    midnight // resolution and missing samples are NaN. Because the time index is
+    implicit, a time range within one day is a plain slice of the memory-mapped
+    file and reading it copies nothing.
+
+    Coarser views are kept in a pyramid of summary levels (15 minutes, 3 hours
+    and 1 day by default), each holding min, max, sum and count per slot and
+    channel in <root>/pyramid/<level>s/<partition>/<server_id>.f32. A pyramid
+    partition spans as many days as fit in about PYRAMID_PARTITION_SLOTS slots,
+    so a year at the daily level is one file per server. Writes update the
+    slots they touch, level by level, so the pyramid is always current.
+    """
+
+    def __init__(self, root, resolution=60, max_open=256, levels=PYRAMID_LEVELS, read_only=False):
+        """
+        Open or create a store
+
+        Args:
+            root: Store directory
+            resolution: Seconds per slot for a new store (an existing store keeps its own)
+            max_open: Maximum number of partitions kept memory-mapped at once
+            levels: Pyramid levels in seconds for a new store (an existing store
+                    keeps its own; see build_pyramids)
+            read_only: Open an existing store for reading only; nothing is written,
+                       so any number of processes may open it concurrently
+        """
+        self.root = root
+        self.max_open = max_open
+        self.read_only = read_only
+        # (server_id, day) or (level, server_id, partition) -> ndarray view of its np.memmap,
+        # since slicing a plain view is several times cheaper than slicing the memmap
+        self._open = OrderedDict()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # Serializes write() and build_pyramids()
+        self._dirty = False                   # Written since the last flush()
+        self._flusher = None
+        self._flusher_pid = None
+
+        meta_path = os.path.join(root, 'store.json')
+        created = not os.path.exists(meta_path)
+        if not created:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta['columns'] != STORE_COLUMNS:
+                raise ValueError(f"History store {root} has columns {meta['columns']}, expected {STORE_COLUMNS}")
+            resolution = meta['resolution_s']
+            latest = meta.get('latest')
+            levels = meta.get('pyramid_levels', [])
+        elif read_only:
+            raise FileNotFoundError(f"No history store at {root}")
+        else:
+            if 86400 % resolution:
+                raise ValueError(f"Resolution must divide a day evenly, got {resolution} s")
+            os.makedirs(root, exist_ok=True)
+            latest = None
+
+        self.resolution = resolution
+        self.slots_per_day = 86400 // resolution
+        self._set_levels(levels)
+        # Newest sample time written so far, persisted by flush()
+        self.latest = None if latest is None else np.datetime64(latest, 's')
+        if created:
+            self._write_meta()
+
+    def _write_meta(self):
+        """Replace store.json atomically, keeping the newest 'latest' any writer has recorded"""
+        path = os.path.join(self.root, 'store.json')
+        if os.path.exists(path):
+            with open(path) as f:
+                stored = json.load(f).get('latest')
+            if stored is not None and (self.latest is None or np.datetime64(stored, 's') > self.latest):
+                self.latest = np.datetime64(stored, 's')
+        meta = {
+            'resolution_s': self.resolution,
+            'columns': STORE_COLUMNS,
+            'latest': None if self.latest is None else str(self.latest),
+            'pyramid_levels': self.levels
+        }
+        temporary = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(meta, f)
+        os.replace(temporary, path)
+
+    def _set_levels(self, levels):
+        """Keep the pyramid levels that each divide a day and are multiples of the level below"""
+        self.levels = []
+        below = self.resolution
+        for level in sorted(int(level) for level in levels):
+            if level > below and level % below == 0 and 86400 % level == 0:
+                self.levels.append(level)
+                below = level
+        # Days per pyramid partition of each level
+        self._span_days = {level: max(1, PYRAMID_PARTITION_SLOTS * level // 86400) for level in self.levels}
+
+    def _path(self, server_id, day):
+        return os.path.join(self.root, str(day), f'{int(server_id)}.f32')
+
+    def _partition(self, server_id, day, create=False):
+        """Memory-map one partition, creating it filled with NaN if asked; None if absent"""
+        key = (int(server_id), np.datetime64(day, 'D'))
+        return self._memmap(key, (self.slots_per_day, len(STORE_COLUMNS)), np.nan, create)
+
+    def _level_partition(self, level, server_id, index, create=False):
+        """Memory-map one pyramid partition (index counts spans since 1970); None if absent"""
+        shape = (self._span_days[level] * 86400 // level, len(STORE_COLUMNS), len(PYRAMID_FIELDS))
+        return self._memmap((level, int(server_id), int(index)), shape, _EMPTY_SUMMARY, create)
+
+    def _memmap(self, key, shape, fill, create):
+        """Open partition from the LRU, or memory-map its file (new files start as fill)"""
+        with self._lock:
+            partition = self._open.get(key)
+            if partition is not None:
+                self._open.move_to_end(key)
+                return partition
+
+            if len(key) == 2:
+                path = self._path(*key)
+            else:
+                level, server_id, index = key
+                path = os.path.join(self.root, PYRAMID_DIR, f'{level}s', str(index), f'{server_id}.f32')
+            if os.path.exists(path):
+                partition = np.memmap(path, dtype=np.float32, mode='r' if self.read_only else 'r+', shape=shape)
+            elif create:
+                if self.read_only:
+                    raise ValueError(f"History store {self.root} is open read-only")
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                partition = np.memmap(path, dtype=np.float32, mode='w+', shape=shape)
+                partition[:] = fill
+            else:
+                return None
+
+            self._open[key] = partition = partition.view(np.ndarray)
+            while len(self._open) > self.max_open:
+                evicted = self._open.popitem(last=False)[1]
+                if not self.read_only:
+                    evicted.base.flush()
+            return partition
+
+    def write(self, columns):
+        """
+        Write telemetry columns (sample_workload.csv schema) into their partitions
+
+        Samples landing on the same slot overwrite each other, latest last, and
+        the pyramid slots covering the written slots are recomputed. Concurrent
+        calls are serialized.
+
+        Args:
+            columns: Dictionary of equal-length arrays with 'timestamp', 'server_id',
+                     the STORE_COLUMNS metrics and optionally 'status'
+
+        Returns:
+            Number of samples written
+        """
+        if self.read_only:
+            raise ValueError(f"History store {self.root} is open read-only")
+        server_ids = np.asarray(columns['server_id'], dtype=np.int64)
+        n_samples = len(server_ids)
+        if n_samples == 0:
+            return 0
+        with self._write_lock:
+            self._write(columns, server_ids)
+            self._dirty = True
+        return n_samples
+
+    def _write(self, columns, server_ids):
+        n_samples = len(server_ids)
+        timestamps = _to_datetime64(columns['timestamp'])
+        days = timestamps.astype('datetime64[D]')
+        slots = (timestamps - days).astype(np.int64) // self.resolution
+        newest = timestamps.max()
+        if self.latest is None or newest > self.latest:
+            self.latest = newest
+
+        values = np.empty((n_samples, len(STORE_COLUMNS)), dtype=np.float32)
+        for i, name in enumerate(STORE_COLUMNS[:4]):
+            values[:, i] = np.asarray(columns[name], dtype=np.float32)
+        status = columns.get('status')
+        values[:, 4] = 1.0 if status is None else (np.asarray(status) == 'active')
+
+        # Group samples by (server, day) so each partition is written once per batch
+        day_numbers = days.astype(np.int64)
+        order = np.lexsort((day_numbers, server_ids))
+        boundaries = np.flatnonzero(
+            (np.diff(server_ids[order]) != 0) | (np.diff(day_numbers[order]) != 0)
+        ) + 1
+        touched = {}
+        for group in np.split(order, boundaries):
+            first = group[0]
+            partition = self._partition(server_ids[first], days[first], create=True)
+            partition[slots[group]] = values[group]
+            # Servers written over the same day and slot range update their pyramids together
+            span = (days[first], int(slots[group].min()), int(slots[group].max()) + 1)
+            touched.setdefault(span, []).append(server_ids[first])
+
+        for (day, first_slot, stop_slot), span_servers in touched.items():
+            self._update_pyramids(span_servers, day, first_slot, stop_slot)
+
+    def _summary_rows(self, level, server_id, start, stop):
+        """
+        Stored slots of one level over [start, stop) epoch seconds within one day
+
+        Returns raw samples at the store resolution and summaries at pyramid
+        levels; None if the partition does not exist.
+        """
+        day = start // 86400
+        if level == self.resolution:
+            partition = self._partition(server_id, np.datetime64(int(day), 'D'))
+            offset = day * 86400
+        else:
+            index = day // self._span_days[level]
+            partition = self._level_partition(level, server_id, index)
+            offset = index * self._span_days[level] * 86400
+        if partition is None:
+            return None
+        return partition[(start - offset) // level:(stop - offset) // level]
+
+    def _update_pyramids(self, server_ids, day, first_slot, stop_slot):
+        """Recompute, level by level, the pyramid slots covering slots [first_slot, stop_slot) of a day"""
+        day_start = np.datetime64(day, 'D').astype('datetime64[s]').astype(np.int64)
+        start = day_start + first_slot * self.resolution
+        stop = day_start + stop_slot * self.resolution
+        below = self.resolution
+        for level in self.levels:
+            # Whole slots of this level; they never cross a day, so they lie in one partition
+            start = start // level * level
+            stop = -(-stop // level) * level
+            rows = np.stack([self._summary_rows(below, server_id, start, stop) for server_id in server_ids])
+            if below == self.resolution:
+                rows = raw_summary(rows)
+            merged = combine_summaries(rows, level // below)
+
+            index = start // 86400 // self._span_days[level]
+            offset = (start - index * self._span_days[level] * 86400) // level
+            for server_id, summary in zip(server_ids, merged):
+                partition = self._level_partition(level, server_id, index, create=True)
+                partition[offset:offset + len(summary)] = summary
+            below = level
+
+    def build_pyramids(self, levels=PYRAMID_LEVELS, chunk_servers=256):
+        """
+        (Re)build the pyramid levels from the stored samples
+
+        Needed for stores written before pyramids existed, or to change levels.
+
+        Args:
+            levels: Pyramid levels in seconds
+            chunk_servers: Servers summarized together per day, which bounds memory
+        """
+        if self.read_only:
+            raise ValueError(f"History store {self.root} is open read-only")
+        with self._write_lock:
+            self._set_levels(levels)
+            for day in self.days():
+                server_ids = self.servers(day)
+                for start in range(0, len(server_ids), chunk_servers):
+                    self._update_pyramids(server_ids[start:start + chunk_servers], day, 0, self.slots_per_day)
+            self._dirty = True
+        self.flush()
+
+    def flush(self):
+        """Write dirty pages of every open partition, and the store metadata, to disk"""
+        with self._lock:
+            if not self._dirty:
+                return
+            # Cleared first, so a write racing with this flush is picked up by the next one
+            self._dirty = False
+            for partition in self._open.values():
+                partition.base.flush()
+            self._write_meta()
+
+    def start_flusher(self, interval):
+        """Flush every interval seconds on a background thread and at interpreter exit"""
+        with self._lock:
+            # Threads do not survive a fork, so a forked worker starts its own
+            if self._flusher is not None and self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            self._flusher = threading.Thread(target=self._run_flusher, args=(interval,),
+                                             name='history-flush', daemon=True)
+            self._flusher.start()
+        atexit.register(self.flush)
+
+    def _run_flusher(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"History flush error: {e}")
+
+    def days(self):
+        """Sorted datetime64[D] array of days with at least one partition"""
+        names = [name for name in os.listdir(self.root)
+                 if name != PYRAMID_DIR and os.path.isdir(os.path.join(self.root, name))]
+        return np.sort(np.array(names, dtype='datetime64[D]'))
+
+    def servers(self, day=None):
+        """Sorted server ids stored on a day (default: on any day)"""
+        days = self.days() if day is None else [np.datetime64(day, 'D')]
+        ids = set()
+        for stored_day in days:
+            directory = os.path.join(self.root, str(stored_day))
+            if os.path.isdir(directory):
+                ids.update(int(name[:-len('.f32')]) for name in os.listdir(directory) if name.endswith('.f32'))
+        return np.array(sorted(ids), dtype=np.int64)
+
+    def end_time(self):
+        """End of the slot holding the newest sample (None if the store is empty)"""
+        if self.latest is None:
+            return None
+        return self.latest - self.latest.astype(np.int64) % self.resolution + self.resolution
+
+    def _slot_range(self, start, end):
+        """Split [start, end) into (day, first_slot, stop_slot) partition pieces"""
+        start = np.datetime64(start, 's')
+        end = np.datetime64(end, 's')
+        pieces = []
+        day = start.astype('datetime64[D]')
+        while day.astype('datetime64[s]') < end:
+            day_start = day.astype('datetime64[s]')
+            first = max(0, (start - day_start).astype(np.int64) // self.resolution)
+            stop = min(self.slots_per_day, -(-(end - day_start).astype(np.int64) // self.resolution))
+            if stop > first:
+                pieces.append((day, int(first), int(stop)))
+            day += 1
+        return pieces
+
+    def segments(self, server_id, start, end):
+        """
+        Zero-copy views of one server's samples in [start, end), one per day
+
+        Returns:
+            List of (slot start time, read-only (n_slots, len(STORE_COLUMNS)) view);
+            days without a partition are skipped
+        """
+        views = []
+        for day, first, stop in self._slot_range(start, end):
+            partition = self._partition(server_id, day)
+            if partition is not None:
+                view = partition[first:stop]
+                view.flags.writeable = False
+                views.append((day.astype('datetime64[s]') + first * self.resolution, view))
+        return views
+
+    def read(self, server_ids, start, end):
+        """
+        Samples of several servers over [start, end) as one dense array
+
+        A single server within a single day is returned as a zero-copy view;
+        otherwise partitions are copied into a new array with NaN for gaps.
+
+        Returns:
+            Tuple of (datetime64[s] slot times, float32 array of shape
+            (n_servers, n_slots, len(STORE_COLUMNS)))
+        """
+        server_ids = np.atleast_1d(np.asarray(server_ids, dtype=np.int64))
+        pieces = self._slot_range(start, end)
+        times = np.concatenate([
+            day.astype('datetime64[s]') + np.arange(first, stop) * self.resolution
+            for day, first, stop in pieces
+        ]) if pieces else np.array([], dtype='datetime64[s]')
+
+        if len(server_ids) == 1 and len(pieces) == 1:
+            day, first, stop = pieces[0]
+            partition = self._partition(server_ids[0], day)
+            if partition is not None:
+                view = partition[None, first:stop]
+                view.flags.writeable = False
+                return times, view
+
+        values = np.full((len(server_ids), len(times), len(STORE_COLUMNS)), np.nan, dtype=np.float32)
+        offset = 0
+        for day, first, stop in pieces:
+            for i, server_id in enumerate(server_ids):
+                partition = self._partition(server_id, day)
+                if partition is not None:
+                    values[i, offset:offset + stop - first] = partition[first:stop]
+            offset += stop - first
+        return times, values
+
+    def summaries(self, server_id, start, end, level=None):
+        """
+        One server's summaries at one level over [start, end), widened to whole slots
+
+        Args:
+            server_id: Server id
+            start, end: Time range
+            level: Seconds per slot, the store resolution (default) or a pyramid level
+
+        Returns:
+            Tuple of (datetime64[s] slot start times, float32 array of shape
+            (n_slots, len(STORE_COLUMNS), len(PYRAMID_FIELDS))); empty slots have
+            NaN min and max and zero sum and count
+        """
+        level = self.resolution if level is None else int(level)
+        if level != self.resolution and level not in self.levels:
+            raise ValueError(f"No pyramid level of {level} s; available: {[self.resolution] + self.levels}")
+        first = np.datetime64(start, 's').astype(np.int64) // level * level
+        stop = -(-np.datetime64(end, 's').astype(np.int64) // level) * level
+        n_slots = max(0, int(stop - first) // level)
+        times = (first + np.arange(n_slots) * level).astype('datetime64[s]')
+        if level == self.resolution:
+            _, values = self.read(server_id, np.datetime64(int(first), 's'), np.datetime64(int(stop), 's'))
+            return times, raw_summary(values[0])
+
+        summary = np.empty((n_slots, len(STORE_COLUMNS), len(PYRAMID_FIELDS)), dtype=np.float32)
+        summary[:] = _EMPTY_SUMMARY
+        span = self._span_days[level] * 86400
+        for index in range(first // span, -(-stop // span)):
+            piece_start = max(first, index * span)
+            piece_stop = min(stop, (index + 1) * span)
+            partition = self._level_partition(level, server_id, index)
+            if partition is not None:
+                summary[(piece_start - first) // level:(piece_stop - first) // level] = \
+                    partition[(piece_start - index * span) // level:(piece_stop - index * span) // level]
+        return times, summary
+
+    def last(self, server_ids, hours, end=None):
+        """Samples of the given servers over the last hours before end (default: end of store)"""
+        end = self.end_time() if end is None else np.datetime64(end, 's')
+        if end is None:
+            raise ValueError("History store is empty")
+        return self.read(server_ids, end - np.timedelta64(int(hours * 3600), 's'), end)
+
+def import_csv(path, store, chunk_rows=1_000_000):
+    """
+    Stream a CSV in the sample_workload.csv schema into a HistoryStore
+
+    The file is read in chunks of chunk_rows rows, so memory stays bounded
+    regardless of file size.
+
+    Returns:
+        Number of samples imported
+    """
+    dtypes = {name: np.float32 for name in STORE_COLUMNS[:4]}
+    dtypes.update({'server_id': np.int64, 'status': 'category'})
+    imported = 0
+    for chunk in pd.read_csv(path, chunksize=chunk_rows, dtype=dtypes):
+        columns = {name: chunk[name].to_numpy() for name in chunk.columns}
+        # Vectorized parse; np.datetime64 string parsing is per element
+        columns['timestamp'] = pd.to_datetime(chunk['timestamp']).to_numpy()
+        imported += store.write(columns)
+    store.flush()
+    return imported
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Import workload CSV files into the columnar history store")
+    parser.add_argument('csv', nargs='*', help="CSV files in the sample_workload.csv schema")
+    parser.add_argument('--store', default=os.path.join('app', 'data', 'history'))
+    parser.add_argument('--resolution', type=int, default=60, help="Seconds per slot for a new store")
+    parser.add_argument('--chunk-rows', type=int, default=1_000_000)
+    parser.add_argument('--build-pyramids', type=int, nargs='*', metavar='SECONDS',
+                        help="Rebuild the pyramid levels (default levels if none are given)")
+    args = parser.parse_args()
+
+    history = HistoryStore(args.store, resolution=args.resolution)
+    for csv_path in args.csv:
+        count = import_csv(csv_path, history, chunk_rows=args.chunk_rows)
+        print(f"Imported {count} samples from {csv_path} into {args.store}")
+    if args.build_pyramids is not None:
+        history.build_pyramids(args.build_pyramids or PYRAMID_LEVELS)
+        print(f"Built pyramid levels {history.levels} in {args.store}")
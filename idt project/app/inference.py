@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+
+class Overloaded(RuntimeError):
+    """Raised when the inference queue is full; the request should be retried later"""
+
+def _split(result, offsets):
+    """Split a batched result (array or dict of arrays) back into per-request parts"""
+    if isinstance(result, dict):
+        parts = {key: np.split(np.asarray(value), offsets) for key, value in result.items()}
+        return [{key: values[i] for key, values in parts.items()} for i in range(len(offsets) + 1)]
+    return np.split(np.asarray(result), offsets)
+
+class MicroBatcher:
+    """Bounded inference queue that merges concurrent requests into one forward pass
+
+    Request threads submit input arrays and wait on a future. A single worker
+    thread collects whatever arrives within max_wait seconds (up to max_batch
+    rows), concatenates it along the first axis, calls run_batch once and hands
+    every caller its slice of the output. Submissions with the same key (e.g.
+    the telemetry generation) share a single queued or running computation. At
+    most max_queue requests may wait; further submissions raise Overloaded so
+    the server can answer 503 instead of queueing without bound.
+    """
+
+    def __init__(self, run_batch, max_batch=4096, max_wait=0.005, max_queue=64, name='inference'):
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.name = name
+
+        self._pending = []  # (inputs, future)
+        self._keyed = {}    # key -> future of a queued or running request
+        self._condition = threading.Condition()
+        self._thread = None
+        self._pid = None
+        self._counters = {'requests': 0, 'coalesced': 0, 'rejected': 0, 'batches': 0, 'batched_rows': 0}
+
+    def _ensure_worker(self):
+        """Start the worker thread; threads do not survive a fork, so check the pid too"""
+        if self._thread is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name=f'{self.name}-batcher', daemon=True)
+            self._thread.start()
+
+    def submit(self, inputs, key=None):
+        """
+        Queue an input array for the next batch
+
+        Args:
+            inputs: Array whose first axis is the batch axis
+            key: Optional hashable identifying the inputs; a request with the same
+                 key that is still queued or running is reused instead
+
+        Returns:
+            Future resolving to this request's part of the run_batch output
+
+        Raises:
+            Overloaded: If max_queue requests are already waiting
+        """
+        inputs = np.asarray(inputs)
+        future = Future()
+        with self._condition:
+            if key is not None and key in self._keyed:
+                self._counters['coalesced'] += 1
+                return self._keyed[key]
+            if len(self._pending) >= self.max_queue:
+                self._counters['rejected'] += 1
+                raise Overloaded(f"{self.name} queue is full ({self.max_queue} requests waiting)")
+            self._counters['requests'] += 1
+            self._pending.append((inputs, future))
+            if key is not None:
+                self._keyed[key] = future
+                future.add_done_callback(lambda _: self._forget(key, future))
+            self._ensure_worker()
+            self._condition.notify()
+        return future
+
+    def __call__(self, inputs, key=None, timeout=None):
+        """Submit inputs and wait for the result"""
+        return self.submit(inputs, key).result(timeout)
+
+    def _forget(self, key, future):
+        with self._condition:
+            if self._keyed.get(key) is future:
+                del self._keyed[key]
+
+    def _next_batch(self):
+        """Wait for work, linger up to max_wait for more, then take up to max_batch rows"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._pending)
+            deadline = time.monotonic() + self.max_wait
+            while sum(len(inputs) for inputs, _ in self._pending) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            # Always take at least one request, even if it alone exceeds max_batch
+            rows = len(self._pending[0][0])
+            count = 1
+            while count < len(self._pending) and rows + len(self._pending[count][0]) <= self.max_batch:
+                rows += len(self._pending[count][0])
+                count += 1
+            batch, self._pending = self._pending[:count], self._pending[count:]
+            self._counters['batches'] += 1
+            self._counters['batched_rows'] += rows
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            futures = [future for _, future in batch]
+            try:
+                inputs = [inputs for inputs, _ in batch]
+                result = self.run_batch(inputs[0] if len(inputs) == 1 else np.concatenate(inputs))
+                parts = _split(result, np.cumsum([len(part) for part in inputs])[:-1])
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future, part in zip(futures, parts):
+                future.set_result(part)
+
+    def queue_depth(self):
+        """Number of requests waiting for a batch"""
+        return len(self._pending)
+
+    def stats(self):
+        """Queue depth, limits and request/batch counters"""
+        with self._condition:
+            counters = dict(self._counters)
+            depth = len(self._pending)
+        batches = counters['batches']
+        return dict(
+            counters,
+            queue_depth=depth,
+            max_queue=self.max_queue,
+            max_batch=self.max_batch,
+            max_wait_ms=self.max_wait * 1000,
+            mean_batch_rows=round(counters['batched_rows'] / batches, 1) if batches else None
+        )
+
+def batcher_from_env(run_batch, name='inference'):
+    """
+    Build a MicroBatcher from environment variables
+
+    INFERENCE_MAX_QUEUE: Requests allowed to wait before answering 503 (default 64)
+    INFERENCE_MAX_BATCH: Maximum rows per forward pass (default 4096)
+    INFERENCE_BATCH_WAIT_MS: How long to wait for more requests to batch (default 5)
+    """
+    return MicroBatcher(
+        run_batch,
+        max_batch=int(os.environ.get('INFERENCE_MAX_BATCH', 4096)),
+        max_wait=float(os.environ.get('INFERENCE_BATCH_WAIT_MS', 5)) / 1000,
+        max_queue=int(os.environ.get('INFERENCE_MAX_QUEUE', 64)),
+        name=name
+    )
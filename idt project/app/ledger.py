@@ -0,0 +1,302 @@
+import os
+import threading
+import time
+import numpy as np
+from app.models.resource_allocation import ResourceAllocationModel
+from app.models.simulator import IDLE_POWER_KW, DYNAMIC_POWER_KW, SLEEP_POWER_KW
+from app.telemetry import ServerIndex
+
+# Cooling power at cooling level 100; expected_power_savings is (100 - level) * 0.05
+COOLING_KW_PER_LEVEL = 0.05
+
+# Rollup resolutions and their bucket length in seconds
+RESOLUTIONS = {'minute': 60, 'hour': 3600, 'day': 86400}
+
+# Fields summed per bucket for each kind of key
+SERVER_FIELDS = ('measured_kw', 'estimated_kw', 'saved_kw')
+ZONE_FIELDS = ('cooling_kw', 'cooling_saved_kw')
+FLEET_FIELDS = SERVER_FIELDS + ZONE_FIELDS
+
+def measured_power(cpu, active):
+    """IT power (kW) of servers from measured CPU utilization (percent) and power state"""
+    cpu = np.asarray(cpu, dtype=np.float64)
+    return np.where(active, IDLE_POWER_KW + DYNAMIC_POWER_KW * cpu / 100, SLEEP_POWER_KW)
+
+def server_power(cpu, codes):
+    """
+    Estimated IT power (kW) of servers after allocation decisions
+
+    Hibernated servers sleep; every workload keeps drawing dynamic power for
+    its CPU load (percent) on whichever server hosts it.
+
+    Args:
+        cpu: Forecast CPU utilization in percent
+        codes: Action codes (indices into ResourceAllocationModel.ACTIONS)
+    """
+    cpu = np.asarray(cpu, dtype=np.float64)
+    return np.where(codes == 2, SLEEP_POWER_KW, IDLE_POWER_KW) + DYNAMIC_POWER_KW * cpu / 100
+
+class RollupRing:
+    """Fixed ring of time buckets with per-key sums and sample counts of some fields
+
+    Bucket b (seconds since the epoch // bucket seconds) lives in slot
+    b % n_buckets. Writing to a slot that still holds an older bucket clears
+    it first, so memory never grows and old buckets age out.
+    """
+
+    def __init__(self, seconds, n_buckets, n_keys, n_fields):
+        self.seconds = seconds
+        self.buckets = np.full(n_buckets, -1, dtype=np.int64)  # Bucket number held by each slot
+        self.sums = np.zeros((n_buckets, n_keys, n_fields), dtype=np.float32)
+        self.counts = np.zeros((n_buckets, n_keys, n_fields), dtype=np.uint32)
+
+    def add(self, timestamp, keys, values):
+        """
+        Add one sample per key to the bucket of timestamp
+
+        Args:
+            timestamp: Seconds since the epoch
+            keys: Integer key of each sample
+            values: Dictionary of field index -> array of values, one per key
+        """
+        bucket = int(timestamp // self.seconds)
+        slot = bucket % len(self.buckets)
+        if self.buckets[slot] != bucket:
+            if self.buckets[slot] > bucket:
+                return  # Older than the ring
+            self.sums[slot] = 0
+            self.counts[slot] = 0
+            self.buckets[slot] = bucket
+        n_keys = self.sums.shape[1]
+        counts = np.bincount(keys, minlength=n_keys).astype(np.uint32)
+        for field, field_values in values.items():
+            self.sums[slot, :, field] += np.bincount(keys, field_values, minlength=n_keys)
+            self.counts[slot, :, field] += counts
+
+    def series(self, key, n_buckets, newest):
+        """Bucket numbers, sums and counts of one key for the n_buckets buckets up to newest"""
+        numbers = np.arange(newest - n_buckets + 1, newest + 1)
+        slots = numbers % len(self.buckets)
+        held = (self.buckets[slots] == numbers)[:, None]
+        sums = np.where(held, self.sums[slots, key], 0).astype(np.float64)
+        return numbers, sums, np.where(held, self.counts[slots, key], 0).astype(np.int64)
+
+class EnergyLedger:
+    """
+    Streaming record of measured and estimated power with fixed-memory rollups
+
+    Every telemetry batch adds the measured IT power of each server (from its
+    utilization and the allocation simulator's power model), every allocation
+    decision its estimated power and savings, and every cooling decision its
+    cooling power and savings. Samples are summed into minute, hour and day
+    rings per server, per cooling zone and for the whole fleet, so a rollup
+    reads its buckets directly instead of scanning history.
+    """
+
+    def __init__(self, capacity=10000, max_zones=64, minutes=60, hours=48, days=30, renewable=65):
+        self.capacity = capacity
+        self.max_zones = max_zones
+        self.renewable = renewable
+        self.lock = threading.Lock()
+        sizes = {'minute': minutes, 'hour': hours, 'day': days}
+        keys = {'server': (capacity, SERVER_FIELDS), 'zone': (max_zones, ZONE_FIELDS), 'fleet': (1, FLEET_FIELDS)}
+        self._rings = {
+            kind: {name: RollupRing(RESOLUTIONS[name], sizes[name], n_keys, len(fields))
+                   for name in RESOLUTIONS}
+            for kind, (n_keys, fields) in keys.items()
+        }
+        self._fields = {kind: fields for kind, (_, fields) in keys.items()}
+
+        self._index = ServerIndex(capacity)
+        self._zones = {}
+
+        self._measured = np.full(capacity, np.nan)  # Latest measured power per server slot
+        self._latest = {}                           # Latest fleet total per field
+
+    def _add(self, kind, timestamp, keys, values):
+        """Add samples of named fields to every resolution of one kind of key"""
+        fields = self._fields[kind]
+        indexed = {fields.index(field): np.asarray(column, dtype=np.float64) for field, column in values.items()}
+        for ring in self._rings[kind].values():
+            ring.add(timestamp, keys, indexed)
+
+    def _add_fleet(self, timestamp, values):
+        self._latest.update(values)
+        self._add('fleet', timestamp, np.zeros(1, dtype=np.int64),
+                  {field: [value] for field, value in values.items()})
+
+    def record_measured(self, server_ids, cpu, active, timestamp=None):
+        """
+        Record measured IT power of servers from their latest readings
+
+        Args:
+            server_ids, cpu, active: Per-server ids, CPU utilization (percent) and power state
+            timestamp: Seconds since the epoch (default now)
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        server_ids = np.asarray(server_ids, dtype=np.int64)
+        power = measured_power(cpu, active)
+        with self.lock:
+            slots = self._index.register(server_ids)
+            kept = slots >= 0
+            self._measured[slots[kept]] = power[kept]
+            self._add('server', timestamp, slots[kept], {'measured_kw': power[kept]})
+            self._add_fleet(timestamp, {'measured_kw': float(np.nansum(self._measured))})
+
+    def record_allocation(self, server_ids, cpu, actions, savings, timestamp=None, fleet=True):
+        """
+        Record the estimated power and savings of allocation decisions
+
+        Args:
+            server_ids: Server id of each decision
+            cpu: Forecast CPU utilization the decision was made for (percent)
+            actions: Action names or codes (see ResourceAllocationModel.ACTIONS)
+            savings: expected_energy_savings of each decision (kW)
+            timestamp: Seconds since the epoch (default now)
+            fleet: Whether the decisions cover the whole fleet and update the
+                   fleet totals; decisions for a subset of servers (e.g. a
+                   client request) are recorded per server only
+        """
+        server_ids = np.asarray(server_ids, dtype=np.int64)
+        if not len(server_ids):
+            return
+        timestamp = time.time() if timestamp is None else timestamp
+        codes = np.asarray(actions)
+        if codes.dtype.kind not in 'iu':
+            names = codes.astype(str)
+            codes = np.zeros(len(names), dtype=np.int8)
+            for code, action in enumerate(ResourceAllocationModel.ACTIONS):
+                codes[names == action] = code
+        estimated = server_power(cpu, codes)
+        savings = np.asarray(savings, dtype=np.float64)
+        with self.lock:
+            slots = self._index.register(server_ids)
+            kept = slots >= 0
+            self._add('server', timestamp, slots[kept], {'estimated_kw': estimated[kept], 'saved_kw': savings[kept]})
+            if not fleet:
+                return
+            # Activations bring one more server up
+            self._add_fleet(timestamp, {
+                'estimated_kw': float(estimated.sum() + IDLE_POWER_KW * np.count_nonzero(codes == 1)),
+                'saved_kw': float(savings.sum())
+            })
+
+    def record_cooling(self, zones, levels, timestamp=None):
+        """
+        Record the power and savings of cooling decisions
+
+        Args:
+            zones: Zone name of each decision; 'fleet' is the single controller
+                   for the whole fleet and also feeds the fleet totals
+            levels: Numeric cooling level (0-100) of each decision
+            timestamp: Seconds since the epoch (default now)
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        levels = np.asarray(levels, dtype=np.float64)
+        power = levels * COOLING_KW_PER_LEVEL
+        saved = (100 - levels) * COOLING_KW_PER_LEVEL
+        with self.lock:
+            for zone in zones:
+                if zone not in self._zones and len(self._zones) < self.max_zones:
+                    self._zones[zone] = len(self._zones)
+            keys = np.array([self._zones.get(zone, -1) for zone in zones], dtype=np.int64)
+            kept = keys >= 0
+            self._add('zone', timestamp, keys[kept], {'cooling_kw': power[kept], 'cooling_saved_kw': saved[kept]})
+            fleet = [i for i, zone in enumerate(zones) if zone == 'fleet']
+            if fleet:
+                self._add_fleet(timestamp, {'cooling_kw': float(power[fleet[-1]]),
+                                            'cooling_saved_kw': float(saved[fleet[-1]])})
+
+    def rollup(self, resolution='hour', server=None, zone=None, n_buckets=None, now=None):
+        """
+        Mean power and energy per bucket for the fleet, one server or one zone
+
+        Args:
+            resolution: 'minute', 'hour' or 'day'
+            server, zone: Server id or zone name to report (default the whole fleet)
+            n_buckets: Buckets up to the current one (default all the ring holds)
+            now: Seconds since the epoch of the current bucket (default now)
+
+        Returns:
+            Dictionary with 'bucket_start' (UTC ISO times), the mean of every
+            field in kW and the matching energy in kWh (field name with 'kwh';
+            the mean held over the bucket, or its elapsed part for the current
+            one), None where a bucket has no samples of a field, and 'samples'
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"resolution must be one of {list(RESOLUTIONS)}")
+        if n_buckets is not None and n_buckets < 1:
+            raise ValueError("buckets must be at least 1")
+        kind, key = 'fleet', 0
+        with self.lock:
+            if server is not None:
+                key = int(self._index.lookup(server))
+                if key < 0:
+                    raise KeyError(f"No energy records for server {server}")
+                kind = 'server'
+            elif zone is not None:
+                if zone not in self._zones:
+                    raise KeyError(f"No energy records for zone {zone}")
+                kind, key = 'zone', self._zones[zone]
+            ring = self._rings[kind][resolution]
+            n_buckets = len(ring.buckets) if n_buckets is None else min(int(n_buckets), len(ring.buckets))
+            now = time.time() if now is None else now
+            numbers, sums, counts = ring.series(key, n_buckets, int(now // ring.seconds))
+
+        hours = np.clip(now - numbers * ring.seconds, 0, ring.seconds) / 3600
+        result = {'bucket_start': np.datetime_as_string((numbers * ring.seconds).astype('datetime64[s]'), timezone='UTC')}
+        for i, field in enumerate(self._fields[kind]):
+            present = counts[:, i] > 0
+            mean = sums[:, i] / np.maximum(counts[:, i], 1)
+            result[field] = np.where(present, np.round(mean, 3), None)
+            result[field + 'h'] = np.where(present, np.round(mean * hours, 3), None)
+        result['samples'] = counts.max(axis=1)
+        return result
+
+    def latest(self):
+        """Latest fleet total of every recorded field (kW)"""
+        with self.lock:
+            return dict(self._latest)
+
+    def summary(self):
+        """
+        Current fleet power and savings for /api/system/status
+
+        Returns:
+            Dictionary with 'current' (measured IT plus cooling kW), 'saved'
+            (estimated allocation plus cooling savings, kW) and 'renewable'
+            (percent), or None before anything is recorded
+        """
+        latest = self.latest()
+        if not latest:
+            return None
+        return {
+            'current': round(latest.get('measured_kw', latest.get('estimated_kw', 0.0)) + latest.get('cooling_kw', 0.0), 2),
+            'saved': round(latest.get('saved_kw', 0.0) + latest.get('cooling_saved_kw', 0.0), 2),
+            'renewable': self.renewable
+        }
+
+    def stats(self):
+        """Tracked servers and zones, ring sizes and memory held by the rollups"""
+        rings = [ring for kind in self._rings.values() for ring in kind.values()]
+        return {
+            'servers': len(self._index),
+            'zones': sorted(self._zones, key=self._zones.get),
+            'buckets': {name: len(ring.buckets) for name, ring in self._rings['fleet'].items()},
+            'memory_bytes': int(sum(ring.sums.nbytes + ring.counts.nbytes + ring.buckets.nbytes for ring in rings))
+        }
+
+def ledger_from_env(capacity):
+    """
+    EnergyLedger configured from the environment
+
+    LEDGER_MINUTES, LEDGER_HOURS, LEDGER_DAYS: Buckets kept per resolution (default 60, 48, 30)
+    LEDGER_ZONES: Cooling zones tracked (default 64)
+    RENEWABLE_PERCENT: Renewable share reported in the summary (default 65)
+    """
+    return EnergyLedger(
+        capacity, int(os.environ.get('LEDGER_ZONES', 64)),
+        int(os.environ.get('LEDGER_MINUTES', 60)), int(os.environ.get('LEDGER_HOURS', 48)),
+        int(os.environ.get('LEDGER_DAYS', 30)),
+        float(os.environ['RENEWABLE_PERCENT']) if 'RENEWABLE_PERCENT' in os.environ else 65
+    )
@@ -0,0 +1,272 @@
+import bisect
+import functools
+import threading
+import time
+import weakref
+import numpy as np
+
+# Default latency buckets in seconds (Prometheus client defaults plus sub-millisecond ones)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _ThreadOwner:
+    """Held only in a thread's local storage, so it is released when the thread exits"""
+
+class _ThreadShards:
+    """One mutable shard per live thread, so updates never take a lock
+
+    A thread's first update creates its shard (a locked step); later updates
+    mutate it in place. When the thread exits, its shard is added into a base
+    shard and dropped, so the number of shards follows the live threads rather
+    than every thread that ever updated the metric. Readers copy the shards
+    under the lock; a value read while another thread updates it is at most one
+    observation behind.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._local = threading.local()
+        self._base = factory()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._factory()
+            with self._lock:
+                self._shards.append(shard)
+            owner = _ThreadOwner()
+            finalizer = weakref.finalize(owner, self._retire, shard)
+            finalizer.atexit = False
+            self._local.owner = owner
+            self._local.shard = shard
+            return shard
+
+    def _retire(self, shard):
+        """Fold an exited thread's shard into the base shard"""
+        with self._lock:
+            for i, value in enumerate(shard):
+                self._base[i] += value
+            self._shards.remove(shard)
+
+    def all(self):
+        with self._lock:
+            return [list(self._base)] + [list(shard) for shard in self._shards]
+
+class _CounterChild:
+    def __init__(self):
+        self._shards = _ThreadShards(lambda: [0.0])
+
+    def inc(self, amount=1.0):
+        self._shards.get()[0] += amount
+
+    def value(self):
+        return sum(shard[0] for shard in self._shards.all())
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self._buckets = buckets
+        # Shard layout: one count per bucket, one for +Inf, then the running sum
+        self._shards = _ThreadShards(lambda: [0] * (len(buckets) + 1) + [0.0])
+
+    def observe(self, value):
+        shard = self._shards.get()
+        shard[bisect.bisect_left(self._buckets, value)] += 1
+        shard[-1] += value
+
+    def snapshot(self):
+        """Per-bucket (non-cumulative) counts including +Inf, and the sum"""
+        shards = self._shards.all()
+        counts = [sum(shard[i] for shard in shards) for i in range(len(self._buckets) + 1)]
+        return counts, sum(shard[-1] for shard in shards)
+
+class _Family:
+    """A named metric with a fixed set of label names and one child per label values"""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """Child metric for these label values (created on first use)"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _header(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+class Counter(_Family):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1.0):
+        self.labels().inc(amount)
+
+    def render(self):
+        lines = self._header()
+        for values, child in list(self._children.items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value())}')
+        return lines
+
+class Histogram(_Family):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def render(self):
+        lines = self._header()
+        bounds = [_format_value(float(bound)) for bound in self.buckets] + ['+Inf']
+        for values, child in list(self._children.items()):
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                bucket_labels = _format_labels(self.labelnames, values, f'le="{bound}"')
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+class CallbackMetric:
+    """Gauge or counter whose samples are read from existing state at scrape time
+
+    The callback returns a number, or a dictionary mapping label value tuples to
+    numbers, so components that already keep counters (caches, queues, the model
+    registry) are exported without touching their hot paths.
+    """
+
+    def __init__(self, name, documentation, callback, labelnames=(), kind='gauge'):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        samples = self.callback()
+        if not isinstance(samples, dict):
+            samples = {(): samples}
+        for values, value in samples.items():
+            if value is not None:
+                lines.append(f'{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}')
+        return lines
+
+class MetricsRegistry:
+    """In-process metric registry rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name, documentation, callback, labelnames=(), kind='gauge'):
+        """Register (or replace) a metric read from callback() at scrape time"""
+        with self._lock:
+            self._metrics[name] = CallbackMetric(name, documentation, callback, labelnames, kind)
+            return self._metrics[name]
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        """All metrics in the text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                # One failing callback must not break the whole scrape
+                lines.append(f'# {metric.name} unavailable: {_escape(e)}')
+        return '\n'.join(lines) + '\n'
+
+# Process-wide registry shared by the app and the model classes
+METRICS = MetricsRegistry()
+
+INFERENCE_SECONDS = METRICS.histogram(
+    'model_inference_seconds', 'Model inference time per call', ('model', 'batch_size')
+)
+FUZZY_EVAL_SECONDS = METRICS.histogram(
+    'fuzzy_eval_seconds', 'Fuzzy cooling rule evaluation time per call', ('mode', 'kind')
+)
+
+def batch_size_label(n):
+    """Batch size rounded up to a power of 4, keeping the label set small"""
+    size = 1
+    while size < n:
+        size *= 4
+    return str(size)
+
+def timed_batch(model):
+    """
+    Decorate a batched model method to record its time in model_inference_seconds
+
+    The first positional argument after self is the batch; its size becomes the
+    batch_size label (rounded up to a power of 4).
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, inputs, *args, **kwargs):
+            start = time.perf_counter()
+            result = method(self, inputs, *args, **kwargs)
+            elapsed = time.perf_counter() - start
+            size = len(inputs) if np.ndim(inputs) else 1
+            INFERENCE_SECONDS.labels(model, batch_size_label(size)).observe(elapsed)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,44 @@
+import os
+
+# Served model artifacts; training runs write versions to <SAVED_DIR>/<model>/<version>/
+SAVED_DIR = os.path.join('app', 'models', 'saved')
+
+# File in <SAVED_DIR>/<model>/ naming the promoted version
+CURRENT = 'CURRENT'
+
+def artifact_dir(model, saved_dir=SAVED_DIR):
+    """
+    Directory to load a model's artifacts from
+
+    The pointer is read once, so every file of one load comes from the same
+    version even if a newer one is promoted meanwhile. Models that were never
+    promoted (e.g. the shipped demo artifacts) load from saved_dir itself.
+
+    Args:
+        model: Model directory name, e.g. 'workload' or 'resource'
+        saved_dir: Root of the served artifacts
+
+    Returns:
+        Path of the promoted version directory, or saved_dir
+    """
+    try:
+        with open(os.path.join(saved_dir, model, CURRENT)) as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return saved_dir
+    return os.path.join(saved_dir, model, version)
+
+def promote_version(version_dir):
+    """
+    Serve a complete version directory by swapping its model's CURRENT pointer
+
+    Version directories are never modified after they are written, and the
+    pointer is replaced in a single rename, so loaders see either the old or
+    the new set of artifacts, never a mix.
+    """
+    model_dir, version = os.path.split(os.path.normpath(version_dir))
+    pointer = os.path.join(model_dir, CURRENT)
+    staging = f'{pointer}.{os.getpid()}.tmp'
+    with open(staging, 'w') as f:
+        f.write(version)
+    os.replace(staging, pointer)
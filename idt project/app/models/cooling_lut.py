@@ -0,0 +1,210 @@
+import argparse
+import bisect
+import os
+import numpy as np
+from app.models.fuzzy_engine import CompiledFuzzyEngine
+
+# Input ranges covered by the membership functions; every membership is constant
+# outside them, so clamping inputs to the grid loses nothing
+LUT_BOUNDS = ((15.0, 40.0), (20.0, 80.0), (0.0, 100.0))
+
+# Plain-Python copy of the thresholds for level_name()
+_THRESHOLDS = CompiledFuzzyEngine.LEVEL_THRESHOLDS.tolist()
+
+def level_name(numeric):
+    """Linguistic cooling level of one numeric level"""
+    return str(CompiledFuzzyEngine.LEVEL_NAMES[bisect.bisect_right(_THRESHOLDS, numeric)])
+
+class CoolingLUT:
+    """Precomputed fuzzy cooling output over a (temperature, humidity, heat) grid
+
+    Queries are answered by trilinear interpolation between the eight
+    surrounding grid points, so a query costs a few table reads whatever the
+    size of the rule base: lookup() answers one query in plain Python and
+    evaluate() answers arrays of queries. The table holds the rules' weighted
+    output sum and total weight rather than their ratio: both are continuous,
+    while the defuzzified level jumps to the default where no rule fires and
+    cannot be interpolated there.
+
+    The table only needs NumPy: it can be saved to a small .npz and loaded on
+    controllers that do not ship the rule base. sampled_max_error is the
+    largest difference from the exact rules at the points checked when the
+    table was built: an estimate, not a bound, since the error between samples
+    can be larger (about 7 levels at the default grid either way).
+    """
+
+    def __init__(self, axes, values, default_level=50.0, sampled_max_error=None):
+        """
+        Args:
+            axes: Three evenly spaced grid axes (temperature, humidity, heat)
+            values: (weighted sum, total weight) at every grid point, shape
+                    (len(temperature), len(humidity), len(heat), 2)
+            default_level: Output where no rule fires
+            sampled_max_error: Largest absolute error against the exact rules
+                               over the points checked at build time
+        """
+        self.axes = [np.asarray(axis, dtype=np.float64) for axis in axes]
+        self.values = np.ascontiguousarray(values, dtype=np.float32)
+        self.default_level = float(default_level)
+        self.sampled_max_error = sampled_max_error
+        self._lower = np.array([axis[0] for axis in self.axes])
+        self._step = np.array([axis[1] - axis[0] for axis in self.axes])
+        self._size = np.array([len(axis) for axis in self.axes])
+        self._strides = np.array([self._size[1] * self._size[2], self._size[2], 1])
+        # One contiguous table per channel: take() on 1-D arrays is the fast gather
+        self._sum = np.ascontiguousarray(self.values[..., 0].reshape(-1))
+        self._weight = np.ascontiguousarray(self.values[..., 1].reshape(-1))
+        # Scalar lookups read Python floats straight from the buffers
+        self._sum_view = memoryview(self._sum)
+        self._weight_view = memoryview(self._weight)
+        self._scalar_axes = [
+            (float(self._lower[axis]), 1.0 / float(self._step[axis]), int(self._size[axis]), int(self._strides[axis]))
+            for axis in range(3)
+        ]
+
+    @classmethod
+    def build(cls, engine, grid=(101, 61, 101), bounds=LUT_BOUNDS, probes=200_000, seed=0):
+        """
+        Tabulate a compiled rule base and estimate the interpolation error
+
+        Args:
+            engine: CompiledFuzzyEngine of the loaded rules
+            grid: Points per axis; the default steps are 0.25 °C, 1 % and 1 heat unit
+            bounds: (low, high) range per axis
+            probes: Random points checked in addition to every cell centre
+
+        Returns:
+            CoolingLUT with sampled_max_error set; unsampled inputs can exceed it
+        """
+        axes = [np.linspace(low, high, n) for (low, high), n in zip(bounds, grid)]
+        mesh = np.meshgrid(*axes, indexing='ij')
+        values = np.stack(engine.aggregate(*mesh), axis=-1)
+        table = cls(axes, values, engine.default_level)
+
+        # Error against the exact path at cell centres (furthest from grid points) and random points
+        centres = [(axis[:-1] + axis[1:]) / 2 for axis in axes]
+        checks = [np.meshgrid(*centres, indexing='ij')]
+        rng = np.random.default_rng(seed)
+        checks.append([rng.uniform(low, high, probes) for low, high in bounds])
+        table.sampled_max_error = 0.0
+        for points in checks:
+            points = [np.ravel(axis) for axis in points]
+            _, exact = engine.evaluate(*points)
+            error = float(np.max(np.abs(table.numeric(*points) - exact)))
+            table.sampled_max_error = max(table.sampled_max_error, error)
+        return table
+
+    def numeric(self, temp, humidity, heat):
+        """Numeric cooling levels for arrays of inputs (broadcast together)"""
+        inputs = np.broadcast_arrays(
+            np.asarray(temp, dtype=np.float64),
+            np.asarray(humidity, dtype=np.float64),
+            np.asarray(heat, dtype=np.float64)
+        )
+        shape = inputs[0].shape
+
+        base = np.zeros(inputs[0].size, dtype=np.intp)
+        fractions = []
+        for axis, x in enumerate(inputs):
+            # Clamp to the grid (np.clip is slow on older NumPy)
+            position = (x.ravel() - self._lower[axis]) * (1.0 / self._step[axis])
+            np.maximum(position, 0, out=position)
+            np.minimum(position, self._size[axis] - 1, out=position)
+            index = np.minimum(position.astype(np.intp), self._size[axis] - 2)
+            base += index * self._strides[axis]
+            fractions.append(position - index)
+
+        # Blend the eight cell corners of each channel, one axis at a time
+        ft, fh, fq = fractions
+        s0, s1, s2 = self._strides
+        corners = (base, base + s1, base + s0, base + s0 + s1)
+        channels = []
+        for table in (self._sum, self._weight):
+            c00, c01, c10, c11 = (
+                table.take(b) + (table.take(b + s2) - table.take(b)) * fq for b in corners
+            )
+            c0 = c00 + (c01 - c00) * fh
+            c1 = c10 + (c11 - c10) * fh
+            channels.append(c0 + (c1 - c0) * ft)
+        weighted_sum, total_weight = channels
+
+        numeric = np.full(len(total_weight), self.default_level)
+        np.divide(weighted_sum, total_weight, out=numeric, where=total_weight > 0)
+        return numeric.reshape(shape)
+
+    def lookup(self, temp, humidity, heat):
+        """Numeric cooling level for one query, in plain Python"""
+        base = 0
+        fractions = []
+        for x, (lower, inverse_step, size, stride) in zip((temp, humidity, heat), self._scalar_axes):
+            position = min(max((x - lower) * inverse_step, 0.0), size - 1.0)
+            index = min(int(position), size - 2)
+            base += index * stride
+            fractions.append(position - index)
+
+        ft, fh, fq = fractions
+        s0, s1, s2 = (axis[3] for axis in self._scalar_axes)
+        channels = []
+        for table in (self._sum_view, self._weight_view):
+            c00 = table[base] + (table[base + s2] - table[base]) * fq
+            b = base + s1
+            c01 = table[b] + (table[b + s2] - table[b]) * fq
+            b = base + s0
+            c10 = table[b] + (table[b + s2] - table[b]) * fq
+            b = base + s0 + s1
+            c11 = table[b] + (table[b + s2] - table[b]) * fq
+            c0 = c00 + (c01 - c00) * fh
+            c1 = c10 + (c11 - c10) * fh
+            channels.append(c0 + (c1 - c0) * ft)
+        weighted_sum, total_weight = channels
+        return weighted_sum / total_weight if total_weight > 0 else self.default_level
+
+    def evaluate(self, temp, humidity, heat):
+        """
+        Drop-in replacement for CompiledFuzzyEngine.evaluate
+
+        Returns:
+            Tuple of (cooling level names, numeric cooling levels) as NumPy arrays
+        """
+        numeric = self.numeric(temp, humidity, heat)
+        levels = np.searchsorted(CompiledFuzzyEngine.LEVEL_THRESHOLDS, numeric, side='right')
+        return CompiledFuzzyEngine.LEVEL_NAMES[levels], numeric
+
+    def save(self, path):
+        """Write the table to a standalone .npz file"""
+        np.savez_compressed(
+            path, temperature=self.axes[0], humidity=self.axes[1], heat=self.axes[2],
+            values=self.values, default_level=self.default_level,
+            sampled_max_error=np.nan if self.sampled_max_error is None else self.sampled_max_error
+        )
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """Load a table written by save()"""
+        with np.load(path) as archive:
+            error = float(archive['sampled_max_error'])
+            return cls(
+                (archive['temperature'], archive['humidity'], archive['heat']), archive['values'],
+                float(archive['default_level']), None if np.isnan(error) else error
+            )
+
+def grid_from_env(default=(101, 61, 101)):
+    """Grid points per axis from COOLING_LUT_GRID, e.g. '51,31,51'"""
+    value = os.environ.get('COOLING_LUT_GRID')
+    return tuple(int(n) for n in value.split(',')) if value else default
+
+if __name__ == '__main__':
+    from app.models.cooling_optimization import CoolingOptimizationModel
+
+    parser = argparse.ArgumentParser(description="Export the fuzzy cooling rules as a standalone lookup table")
+    parser.add_argument('--grid', type=int, nargs=3, default=list(grid_from_env()),
+                        help="Points along temperature, humidity and heat")
+    parser.add_argument('--out', default=os.path.join('app', 'models', 'saved', 'cooling_lut.npz'))
+    args = parser.parse_args()
+
+    model = CoolingOptimizationModel(mode='exact')
+    table = CoolingLUT.build(model.engine, tuple(args.grid))
+    table.save(args.out)
+    print(f"Wrote {args.out} ({os.path.getsize(args.out) / 1024:.0f} KB), grid {tuple(args.grid)}, "
+          f"sampled max error {table.sampled_max_error:.4f} levels")
@@ -1,7 +1,77 @@
 import numpy as np
 import pandas as pd
 import os
+import time
 import joblib
+from app.models.fuzzy_engine import CompiledFuzzyEngine
+from app.models.cooling_zones import optimize_zones
+from app.models.cooling_lut import CoolingLUT, grid_from_env, level_name
+from app.metrics import FUZZY_EVAL_SECONDS
+
+# Fuzzy set definitions: (shape, parameters) for each linguistic term
+MEMBERSHIP_SETS = {
+    'temp': {
+        'cold': ('trapezoidal', (15, 18, 22, 25)),
+        'normal': ('triangular', (22, 25, 28)),
+        'hot': ('trapezoidal', (25, 28, 35, 40))
+    },
+    'humidity': {
+        'low': ('trapezoidal', (20, 25, 35, 40)),
+        'normal': ('triangular', (35, 45, 55)),
+        'high': ('trapezoidal', (50, 60, 70, 80))
+    },
+    'heat': {
+        'low': ('trapezoidal', (0, 10, 30, 40)),
+        'medium': ('triangular', (30, 50, 70)),
+        'high': ('trapezoidal', (60, 70, 90, 100))
+    }
+}
+
+# Output fuzzy sets (simplified as crisp values for demo)
+COOLING_LEVELS = {
+    'very_low': 10,
+    'low': 30,
+    'medium': 50,
+    'high': 70,
+    'very_high': 90
+}
+
+def room_temperature(temperature, runaway=None, stuck=None):
+    """
+    Temperature the room controller acts on: the mean server temperature
+
+    Readings of stuck sensors are left out (unless every sensor is stuck), and
+    servers in thermal runaway count at full weight: the result is at least
+    their mean temperature.
+    """
+    temperature = np.asarray(temperature, dtype=np.float64)
+    trusted = temperature if stuck is None or np.all(stuck) else temperature[~np.asarray(stuck)]
+    avg_temp = np.mean(trusted)
+    if runaway is not None and np.any(runaway):
+        avg_temp = max(avg_temp, np.mean(temperature[np.asarray(runaway)]))
+    return avg_temp
+
+def server_columns(servers):
+    """
+    Temperature, CPU and memory arrays of a cooling request's servers
+
+    Args:
+        servers: List of per-server dicts, or a dict of columns (one array per field)
+
+    Returns:
+        Tuple of (temperature, cpu, memory) arrays; missing fields default to 25 °C and 50 %
+    """
+    defaults = (('temperature', 25), ('cpu', 50), ('memory', 50))
+    if isinstance(servers, dict):
+        n_servers = len(next(iter(servers.values()), []))
+        return tuple(
+            np.asarray(servers[key], dtype=np.float64) if key in servers else np.full(n_servers, float(default))
+            for key, default in defaults
+        )
+    return tuple(
+        np.array([server.get(key, default) for server in servers], dtype=np.float64)
+        for key, default in defaults
+    )
 
 class FuzzyMembership:
     """Simple implementation of fuzzy membership functions"""
@@ -17,22 +87,30 @@ class FuzzyMembership:
         return max(min(min((x - a) / (b - a), 1), (d - x) / (d - c)), 0)
 
 class CoolingOptimizationModel:
-    def __init__(self):
-        """Initialize the Cooling Optimization Model using Fuzzy Logic Controller"""
+    def __init__(self, mode=None):
+        """
+        Initialize the Cooling Optimization Model using Fuzzy Logic Controller
+        
+        Args:
+            mode: 'exact' (compiled rules, the default) or 'lut' (interpolated lookup
+                  table built from the rules, off by up to about 7 levels near
+                  inputs where a rule barely fires); defaults to the COOLING_MODE
+                  environment variable
+        """
         # Define fuzzy sets for temperature
-        self.temp_cold = lambda x: FuzzyMembership.trapezoidal(x, 15, 18, 22, 25)
-        self.temp_normal = lambda x: FuzzyMembership.triangular(x, 22, 25, 28)
-        self.temp_hot = lambda x: FuzzyMembership.trapezoidal(x, 25, 28, 35, 40)
+        self.temp_cold = self._membership('temp', 'cold')
+        self.temp_normal = self._membership('temp', 'normal')
+        self.temp_hot = self._membership('temp', 'hot')
         
         # Define fuzzy sets for humidity
-        self.humid_low = lambda x: FuzzyMembership.trapezoidal(x, 20, 25, 35, 40)
-        self.humid_normal = lambda x: FuzzyMembership.triangular(x, 35, 45, 55)
-        self.humid_high = lambda x: FuzzyMembership.trapezoidal(x, 50, 60, 70, 80)
+        self.humid_low = self._membership('humidity', 'low')
+        self.humid_normal = self._membership('humidity', 'normal')
+        self.humid_high = self._membership('humidity', 'high')
         
         # Define fuzzy sets for server heat output
-        self.heat_low = lambda x: FuzzyMembership.trapezoidal(x, 0, 10, 30, 40)
-        self.heat_medium = lambda x: FuzzyMembership.triangular(x, 30, 50, 70)
-        self.heat_high = lambda x: FuzzyMembership.trapezoidal(x, 60, 70, 90, 100)
+        self.heat_low = self._membership('heat', 'low')
+        self.heat_medium = self._membership('heat', 'medium')
+        self.heat_high = self._membership('heat', 'high')
         
         # Load saved model if exists
         model_path = os.path.join('app', 'models', 'saved', 'cooling_optimization_rules.pkl')
@@ -48,6 +126,24 @@ class CoolingOptimizationModel:
             
             # Save rules
             joblib.dump(self.rules, model_path)
+        
+        # Compile rules once for vectorized evaluation
+        self.engine = CompiledFuzzyEngine(self.rules, MEMBERSHIP_SETS, COOLING_LEVELS)
+        
+        # Optionally tabulate the rules; batched queries then interpolate the table
+        self.mode = mode or os.environ.get('COOLING_MODE', 'exact')
+        self.lut = None
+        if self.mode == 'lut':
+            self.lut = CoolingLUT.build(self.engine, grid_from_env())
+            print(f"Built cooling lookup table {self.lut.values.shape[:3]}, "
+                  f"sampled max error {self.lut.sampled_max_error:.3f} levels against the exact rules")
+    
+    @staticmethod
+    def _membership(variable, term):
+        """Build a scalar membership function from MEMBERSHIP_SETS"""
+        shape, params = MEMBERSHIP_SETS[variable][term]
+        function = getattr(FuzzyMembership, shape)
+        return lambda x: function(x, *params)
     
     def _define_rules(self):
         """Define fuzzy logic rules for cooling optimization"""
@@ -96,15 +192,6 @@ class CoolingOptimizationModel:
             'any': 1.0
         }
         
-        # Output fuzzy sets (simplified as crisp values for demo)
-        cooling_levels = {
-            'very_low': 10,
-            'low': 30,
-            'medium': 50,
-            'high': 70,
-            'very_high': 90
-        }
-        
         # Apply rules and calculate weighted sum
         total_weight = 0
         weighted_sum = 0
@@ -121,7 +208,7 @@ class CoolingOptimizationModel:
             weighted_rule = rule_strength * weight
             
             # Add to weighted sum
-            weighted_sum += weighted_rule * cooling_levels[cooling_level]
+            weighted_sum += weighted_rule * COOLING_LEVELS[cooling_level]
             total_weight += weighted_rule
         
         # Calculate defuzzified result (weighted average)
@@ -144,36 +231,101 @@ class CoolingOptimizationModel:
         
         return cooling_level, cooling_level_numeric
     
+    def apply_rules_batch(self, temps, humidities, heats):
+        """
+        Apply fuzzy rules to arrays of inputs in one vectorized pass
+        
+        Args:
+            temps: Array of temperatures (°C), e.g. one per rack or CRAC zone
+            humidities: Array of humidity percentages (broadcast against temps)
+            heats: Array of server heat outputs (broadcast against temps)
+        
+        Returns:
+            Tuple of (cooling level names, numeric cooling levels) as NumPy arrays;
+            in 'lut' mode numeric levels approximate the exact rules, with errors
+            up to about self.lut.sampled_max_error (an estimate, not a bound)
+        """
+        start = time.perf_counter()
+        if self.lut is not None:
+            result = self.lut.evaluate(temps, humidities, heats)
+        else:
+            result = self.engine.evaluate(temps, humidities, heats)
+        FUZZY_EVAL_SECONDS.labels(self.mode, 'batch').observe(time.perf_counter() - start)
+        return result
+    
+    def optimize_zones(self, topology, rack_temperature, rack_heat, humidity=45, coupling=0.25, max_step=20.0):
+        """
+        Per-rack, per-aisle and per-room cooling settings in one vectorized pass
+        
+        Args:
+            topology: app.models.cooling_zones.CoolingTopology
+            rack_temperature, rack_heat: Per-rack inputs, see CoolingTopology.rack_inputs
+            humidity: Humidity percentage, scalar or one per room
+            coupling: Fraction of each aisle's level taken from its neighbours' mean
+            max_step: Largest allowed level difference below a neighbouring aisle
+        
+        Returns:
+            Dictionary with 'racks', 'aisles' and 'rooms' columns
+        """
+        return optimize_zones(self.apply_rules_batch, topology, rack_temperature, rack_heat,
+                              humidity, coupling, max_step)
+    
     def optimize(self, server_data):
         """
         Optimize cooling based on server conditions
         
         Args:
-            server_data: Dictionary containing server temperature and workload data
+            server_data: Dictionary containing server temperature and workload data;
+                         'servers' is a list of dicts or a dict of columns
         
         Returns:
             Dictionary with cooling optimization settings
         """
         # Extract relevant data
-        servers = server_data.get('servers', [])
+        temperature, cpu, memory = server_columns(server_data.get('servers', []))
+        
+        # Get ambient humidity (would come from sensors in a real system)
+        ambient_humidity = server_data.get('cooling', {}).get('humidity', 45)
+        
+        return self.optimize_arrays(temperature, cpu, memory, ambient_humidity)
+    
+    def optimize_arrays(self, temperature, cpu, memory, humidity=45, runaway=None, stuck=None):
+        """
+        Optimize cooling from per-server arrays
+        
+        Args:
+            temperature: Array of server temperatures (°C)
+            cpu: Array of CPU utilization percentages
+            memory: Array of memory utilization percentages
+            humidity: Ambient humidity percentage
+            runaway, stuck: Optional boolean arrays of servers flagged by the anomaly
+                            detector (see room_temperature)
+        
+        Returns:
+            Dictionary with cooling optimization settings
+        """
+        temperature = np.asarray(temperature, dtype=np.float64)
         
         # Calculate average temperature and heat output across servers
-        if servers:
-            avg_temp = np.mean([server.get('temperature', 25) for server in servers])
+        if len(temperature):
+            avg_temp = room_temperature(temperature, runaway, stuck)
             
             # Calculate heat output based on CPU utilization
-            heat_outputs = [server.get('cpu', 50) * 0.7 + server.get('memory', 50) * 0.3 for server in servers]
+            heat_outputs = np.asarray(cpu, dtype=np.float64) * 0.7 + np.asarray(memory, dtype=np.float64) * 0.3
             avg_heat = np.mean(heat_outputs)
         else:
             # Default values if no server data
             avg_temp = 25
             avg_heat = 50
         
-        # Get ambient humidity (would come from sensors in a real system)
-        ambient_humidity = server_data.get('cooling', {}).get('humidity', 45)
-        
-        # Apply fuzzy logic rules
-        cooling_level, cooling_numeric = self._apply_rules(avg_temp, ambient_humidity, avg_heat)
+        # Apply fuzzy logic rules, or read the precomputed table in 'lut' mode
+        start = time.perf_counter()
+        if self.lut is not None:
+            cooling_numeric = self.lut.lookup(avg_temp, humidity, avg_heat)
+            cooling_level = level_name(cooling_numeric)
+        else:
+            cooling_level, cooling_numeric = self._apply_rules(avg_temp, humidity, avg_heat)
+        FUZZY_EVAL_SECONDS.labels(self.mode, 'scalar').observe(time.perf_counter() - start)
         
         # Calculate fan speed based on cooling level
         fan_speed = int(cooling_numeric)
@@ -0,0 +1,284 @@
+import json
+import numpy as np
+import pandas as pd
+from app.models.fuzzy_engine import CompiledFuzzyEngine
+
+class CoolingTopology:
+    """Rack -> aisle -> room layout of the datacenter as index arrays
+
+    Racks, aisles and rooms are numbered 0..n-1; rack_aisle and aisle_room map
+    each level to its parent, and edge_src/edge_dst list pairs of neighbouring
+    aisles that share air (both directions). Servers are mapped to racks with a sorted
+    id array so a whole fleet is placed with one searchsorted call.
+    """
+
+    def __init__(self, rack_names, rack_aisle, aisle_names, aisle_room, room_names,
+                 server_ids, server_rack, neighbours):
+        """
+        Args:
+            rack_names, aisle_names, room_names: Names at each level
+            rack_aisle: Aisle index of each rack
+            aisle_room: Room index of each aisle
+            server_ids: Server ids placed in racks
+            server_rack: Rack index of each server id
+            neighbours: Iterable of (aisle index, aisle index) pairs sharing air
+        """
+        self.rack_names = np.asarray(rack_names)
+        self.aisle_names = np.asarray(aisle_names)
+        self.room_names = np.asarray(room_names)
+        self.rack_aisle = np.asarray(rack_aisle, dtype=np.intp)
+        self.aisle_room = np.asarray(aisle_room, dtype=np.intp)
+
+        order = np.argsort(server_ids, kind='stable')
+        self.server_ids = np.asarray(server_ids, dtype=np.int64)[order]
+        self.server_rack = np.asarray(server_rack, dtype=np.intp)[order]
+
+        pairs = np.asarray(list(neighbours), dtype=np.intp).reshape(-1, 2)
+        self.edge_src = np.concatenate([pairs[:, 0], pairs[:, 1]])
+        self.edge_dst = np.concatenate([pairs[:, 1], pairs[:, 0]])
+        self.aisle_degree = np.bincount(self.edge_dst, minlength=self.n_aisles)
+
+    @property
+    def n_racks(self):
+        return len(self.rack_names)
+
+    @property
+    def n_aisles(self):
+        return len(self.aisle_names)
+
+    @property
+    def n_rooms(self):
+        return len(self.room_names)
+
+    @classmethod
+    def grid(cls, n_racks, racks_per_aisle=20, aisles_per_room=10, servers_per_rack=20):
+        """
+        Regular layout: consecutive server ids fill racks, racks fill aisles in
+        rows and aisles fill rooms; adjacent aisles of a room are neighbours
+        """
+        n_aisles = -(-n_racks // racks_per_aisle)
+        n_rooms = -(-n_aisles // aisles_per_room)
+        rack_aisle = np.arange(n_racks) // racks_per_aisle
+        aisle_room = np.arange(n_aisles) // aisles_per_room
+        neighbours = [(a, a + 1) for a in range(n_aisles - 1) if aisle_room[a] == aisle_room[a + 1]]
+        server_ids = np.arange(1, n_racks * servers_per_rack + 1)
+        return cls(
+            [f'R{i + 1}' for i in range(n_racks)], rack_aisle,
+            [f'A{i + 1}' for i in range(n_aisles)], aisle_room,
+            [f'room-{i + 1}' for i in range(n_rooms)],
+            server_ids, (server_ids - 1) // servers_per_rack, neighbours
+        )
+
+    @classmethod
+    def grid_for(cls, server_ids, racks_per_aisle=20, aisles_per_room=10, servers_per_rack=20):
+        """
+        The grid() layout restricted to the racks holding the given servers
+
+        Servers keep their grid rack, aisle and room names, so placement does
+        not depend on which other servers report, but only occupied racks (and
+        their aisles and rooms) exist: size and cost follow the number of
+        servers rather than the highest id. Ids below 1 are not placed.
+        """
+        server_ids = np.unique(np.asarray(server_ids, dtype=np.int64))
+        server_ids = server_ids[server_ids >= 1]
+        racks, server_rack = np.unique((server_ids - 1) // servers_per_rack, return_inverse=True)
+        aisles, rack_aisle = np.unique(racks // racks_per_aisle, return_inverse=True)
+        rooms, aisle_room = np.unique(aisles // aisles_per_room, return_inverse=True)
+        # Grid neighbours are consecutive aisles of a room, kept when both are occupied
+        adjacent = np.flatnonzero((np.diff(aisles) == 1) & (aisle_room[:-1] == aisle_room[1:]))
+        return cls(
+            [f'R{i + 1}' for i in racks], rack_aisle,
+            [f'A{i + 1}' for i in aisles], aisle_room,
+            [f'room-{i + 1}' for i in rooms],
+            server_ids, server_rack, zip(adjacent, adjacent + 1)
+        )
+
+    @classmethod
+    def from_dict(cls, config):
+        """
+        Build a topology from its JSON form
+
+        Args:
+            config: {'racks': [{'rack': 'R1', 'aisle': 'A1', 'room': 'room-1',
+                     'servers': [1, 2]}, ...], 'neighbours': [['A1', 'A2'], ...]}.
+                     Without 'neighbours', aisles listed one after another in the
+                     same room are neighbours.
+        """
+        racks = config['racks']
+        aisle_names = list(dict.fromkeys(rack['aisle'] for rack in racks))
+        room_names = list(dict.fromkeys(rack['room'] for rack in racks))
+        aisle_index = {name: i for i, name in enumerate(aisle_names)}
+        room_index = {name: i for i, name in enumerate(room_names)}
+
+        aisle_room = np.zeros(len(aisle_names), dtype=np.intp)
+        for rack in racks:
+            aisle_room[aisle_index[rack['aisle']]] = room_index[rack['room']]
+
+        if 'neighbours' in config:
+            neighbours = [(aisle_index[a], aisle_index[b]) for a, b in config['neighbours']]
+        else:
+            neighbours = [
+                (a, a + 1) for a in range(len(aisle_names) - 1) if aisle_room[a] == aisle_room[a + 1]
+            ]
+
+        server_ids = [server for rack in racks for server in rack.get('servers', [])]
+        server_rack = [i for i, rack in enumerate(racks) for _ in rack.get('servers', [])]
+        return cls(
+            [rack['rack'] for rack in racks], [aisle_index[rack['aisle']] for rack in racks],
+            aisle_names, aisle_room, room_names, server_ids, server_rack, neighbours
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Load a topology JSON file (see from_dict)"""
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def rack_index(self, server_ids):
+        """Rack index of each server id, -1 for servers not placed in a rack"""
+        server_ids = np.asarray(server_ids, dtype=np.int64)
+        if len(self.server_ids) == 0:
+            return np.full(len(server_ids), -1, dtype=np.intp)
+        position = np.minimum(np.searchsorted(self.server_ids, server_ids), len(self.server_ids) - 1)
+        return np.where(self.server_ids[position] == server_ids, self.server_rack[position], -1)
+
+    def rack_inputs(self, server_ids, temperature, cpu, memory):
+        """
+        Per-rack fuzzy inputs from per-server readings
+
+        A rack reports its hottest server and its mean heat output
+        (0.7 * cpu + 0.3 * memory, as in optimize_arrays). Racks without
+        readings report 25 °C and no heat.
+
+        Returns:
+            Tuple of (rack temperatures, rack heats), one entry per rack
+        """
+        racks = self.rack_index(server_ids)
+        placed = racks >= 0
+        racks = racks[placed]
+        temperature = np.asarray(temperature, dtype=np.float64)[placed]
+        heat = (np.asarray(cpu, dtype=np.float64) * 0.7 + np.asarray(memory, dtype=np.float64) * 0.3)[placed]
+
+        counts = np.bincount(racks, minlength=self.n_racks)
+        rack_heat = np.zeros(self.n_racks)
+        np.divide(np.bincount(racks, weights=heat, minlength=self.n_racks), counts, out=rack_heat, where=counts > 0)
+
+        rack_temperature = np.full(self.n_racks, 25.0)
+        if len(racks):
+            # Segment max: sort by rack, then reduce each run
+            order = np.argsort(racks, kind='stable')
+            starts = np.flatnonzero(np.r_[True, np.diff(racks[order]) != 0])
+            rack_temperature[racks[order][starts]] = np.maximum.reduceat(temperature[order], starts)
+        return rack_temperature, rack_heat
+
+def _segment_max(values, segments, n_segments, empty):
+    """Maximum of values per segment index, empty for segments without values"""
+    result = np.full(n_segments, -np.inf)
+    np.maximum.at(result, segments, values)
+    result[np.isneginf(result)] = empty
+    return result
+
+def _segment_mean(values, segments, n_segments, weights=None, empty=0.0):
+    """(Weighted) mean of values per segment index"""
+    weights = np.ones(len(values)) if weights is None else weights
+    total = np.bincount(segments, weights=weights, minlength=n_segments)
+    mean = np.full(n_segments, float(empty))
+    np.divide(np.bincount(segments, weights=values * weights, minlength=n_segments), total,
+              out=mean, where=total > 0)
+    return mean
+
+def couple_aisles(topology, levels, coupling=0.25, max_step=20.0, max_iterations=100):
+    """
+    Apply neighbouring-aisle coupling to per-aisle cooling levels
+
+    Warmer neighbours push an aisle towards their mean by the coupling
+    fraction (shared air mixes), and no aisle may run more than max_step below
+    a neighbour, so a hot aisle does not spill into an under-cooled one. Levels
+    are only ever raised; the constraint is propagated until it holds.
+    """
+    levels = np.asarray(levels, dtype=np.float64)
+    if len(topology.edge_src) == 0:
+        return levels.copy()
+
+    has_neighbours = topology.aisle_degree > 0
+    neighbour_mean = np.zeros(topology.n_aisles)
+    np.divide(np.bincount(topology.edge_dst, weights=levels[topology.edge_src], minlength=topology.n_aisles),
+              topology.aisle_degree, out=neighbour_mean, where=has_neighbours)
+    coupled = np.where(has_neighbours, np.maximum(levels, (1 - coupling) * levels + coupling * neighbour_mean), levels)
+
+    for _ in range(max_iterations):
+        floor = _segment_max(coupled[topology.edge_src] - max_step, topology.edge_dst, topology.n_aisles, -np.inf)
+        raised = np.maximum(coupled, floor)
+        if np.array_equal(raised, coupled):
+            break
+        coupled = raised
+    return coupled
+
+def optimize_zones(evaluate, topology, rack_temperature, rack_heat, humidity=45, coupling=0.25, max_step=20.0):
+    """
+    Cooling settings for every rack, aisle and room in one vectorized pass
+
+    Args:
+        evaluate: Batched rule evaluation, e.g. CoolingOptimizationModel.apply_rules_batch
+        topology: CoolingTopology
+        rack_temperature, rack_heat: Per-rack inputs (see CoolingTopology.rack_inputs)
+        humidity: Humidity percentage, scalar or one per room
+        coupling: Fraction of each aisle's level taken from its neighbours' mean
+        max_step: Largest allowed level difference below a neighbouring aisle
+
+    Returns:
+        Dictionary with 'racks', 'aisles' and 'rooms' column dictionaries of
+        NumPy arrays and a 'timestamp'
+    """
+    rack_temperature = np.asarray(rack_temperature, dtype=np.float64)
+    rack_heat = np.asarray(rack_heat, dtype=np.float64)
+    room_humidity = np.broadcast_to(np.asarray(humidity, dtype=np.float64), (topology.n_rooms,))
+    aisle_humidity = room_humidity[topology.aisle_room]
+
+    # Racks: local level, e.g. for in-row coolers and rack fans
+    _, rack_levels = evaluate(rack_temperature, aisle_humidity[topology.rack_aisle], rack_heat)
+
+    # Aisles: supply air must cover the hottest rack; heat is the aisle mean
+    aisle_temperature = _segment_max(rack_temperature, topology.rack_aisle, topology.n_aisles, 25.0)
+    aisle_heat = _segment_mean(rack_heat, topology.rack_aisle, topology.n_aisles)
+    _, aisle_levels = evaluate(aisle_temperature, aisle_humidity, aisle_heat)
+    aisle_levels = couple_aisles(topology, aisle_levels, coupling, max_step)
+    aisle_setpoints = np.round(24 - (aisle_levels - 50) / 10, 1)
+
+    # Rooms: heat-weighted level; the room supply setpoint follows its coldest aisle demand
+    aisle_weight = np.bincount(topology.rack_aisle, weights=rack_heat, minlength=topology.n_aisles) + 1e-9
+    room_levels = _segment_mean(aisle_levels, topology.aisle_room, topology.n_rooms, aisle_weight, empty=50.0)
+    room_setpoints = -_segment_max(-aisle_setpoints, topology.aisle_room, topology.n_rooms, -24.0)
+
+    level_names = CompiledFuzzyEngine.LEVEL_NAMES[np.searchsorted(
+        CompiledFuzzyEngine.LEVEL_THRESHOLDS, np.concatenate([aisle_levels, room_levels]), side='right'
+    )]
+    return {
+        'racks': {
+            'name': topology.rack_names,
+            'aisle': topology.aisle_names[topology.rack_aisle],
+            'temperature': rack_temperature,
+            'heat': np.round(rack_heat, 1),
+            'cooling_numeric': np.round(rack_levels, 1)
+        },
+        'aisles': {
+            'name': topology.aisle_names,
+            'room': topology.room_names[topology.aisle_room],
+            'temperature': aisle_temperature,
+            'heat': np.round(aisle_heat, 1),
+            'cooling_level': level_names[:topology.n_aisles],
+            'cooling_numeric': np.round(aisle_levels, 1),
+            'fan_speed_percent': aisle_levels.astype(np.int64),
+            'ac_temperature_setpoint': aisle_setpoints
+        },
+        'rooms': {
+            'name': topology.room_names,
+            'humidity': room_humidity,
+            'cooling_level': level_names[topology.n_aisles:],
+            'cooling_numeric': np.round(room_levels, 1),
+            'fan_speed_percent': room_levels.astype(np.int64),
+            'ac_temperature_setpoint': room_setpoints,
+            'expected_power_savings': np.round((100 - room_levels) * 0.05, 2)
+        },
+        'timestamp': pd.Timestamp.now().isoformat()
+    }
@@ -1,11 +1,17 @@
 import numpy as np
 import pandas as pd
+from app.models.cooling_zones import optimize_zones
+from app.models.cooling_optimization import room_temperature, server_columns
+from app.models.resource_allocation import next_hour_columns
+from app.models.workload_forecasting import horizon_from_env, horizon_label
 
 class DummyWorkloadModel:
     """Fallback model for workload forecasting when TensorFlow model fails"""
     
-    def __init__(self):
+    def __init__(self, horizon=None):
         print("Using dummy workload forecasting model")
+        self.forecast_horizon = horizon_from_env() if horizon is None else horizon
+        self.quantiles = None
     
     def predict(self, historical_data=None):
         """Generate dummy workload forecasts"""
@@ -18,7 +24,7 @@ class DummyWorkloadModel:
             base_io = 40 + np.random.normal(0, 20)
             
             server_forecasts = []
-            for hour in range(1, 7):
+            for hour in range(1, self.forecast_horizon + 1):
                 time_factor = np.sin(hour / 6 * np.pi) * 10
                 
                 forecast = {
@@ -35,7 +41,30 @@ class DummyWorkloadModel:
         return {
             'forecasts': forecasts,
             'timestamp': pd.Timestamp.now().isoformat(),
-            'forecast_horizon': '6 hours'
+            'forecast_horizon': horizon_label(self.forecast_horizon)
+        }
+    
+    def predict_steps(self, windows, batch_size=None):
+        """Persist the last observed readings over the horizon as a (n, forecast_horizon, 3, 1) forecast"""
+        windows = np.asarray(windows, dtype=np.float32)
+        last = windows[:, -1, :3].reshape(-1, 1, 3, 1)
+        return np.repeat(last, self.forecast_horizon, axis=1)
+    
+    def predict_batch(self, windows, server_ids=None, batch_size=None):
+        """Generate dummy columnar forecasts from the last observed window values"""
+        windows = np.asarray(windows, dtype=np.float32)
+        n_servers = windows.shape[0]
+        if server_ids is None:
+            server_ids = np.arange(1, n_servers + 1)
+        
+        # Persist the most recent CPU, memory and I/O readings
+        last = windows[:, -1, :3]
+        
+        return {
+            'server_id': np.asarray(server_ids),
+            'cpu_forecast': last[:, 0].copy(),
+            'memory_forecast': last[:, 1].copy(),
+            'io_forecast': last[:, 2].copy()
         }
 
 class DummyResourceModel:
@@ -45,40 +74,48 @@ class DummyResourceModel:
         print("Using dummy resource allocation model")
     
     def decide(self, workload_data):
-        """Generate dummy resource allocation decisions"""
-        forecasts = workload_data.get('forecasts', [])
-        next_hour_forecasts = [f for f in forecasts if f['time_offset'] == 1]
-        
-        decisions = []
-        
-        for forecast in next_hour_forecasts:
-            server_id = forecast['server_id']
-            cpu = forecast['cpu_forecast']
-            memory = forecast['memory_forecast']
-            
-            if cpu > 80 or memory > 85:
-                action = "activate"
-            elif cpu < 20 and memory < 30:
-                action = "hibernate"
-            else:
-                action = "maintain"
-            
-            decision = {
-                'server_id': server_id,
-                'action': action,
-                'target': None,
-                'expected_cpu_savings': 5.0 if action == "hibernate" else 0,
-                'expected_energy_savings': 0.3 if action == "hibernate" else 0,
-                'confidence': 0.8
-            }
-            
-            decisions.append(decision)
+        """Generate dummy resource allocation decisions from per-point or columnar forecasts"""
+        batch = self.decide_batch(*next_hour_columns(workload_data))
+        columns = {key: batch[key].tolist() for key in batch}
+        decisions = [dict(zip(columns, values)) for values in zip(*columns.values())]
         
         return {
             'decisions': decisions,
             'timestamp': pd.Timestamp.now().isoformat(),
             'optimization_goal': 'energy_efficiency'
         }
+    
+    def decide_batch(self, server_ids, cpu, memory, io, overheating=None, suspect=None):
+        """Generate dummy columnar allocation decisions with threshold rules"""
+        cpu = np.asarray(cpu, dtype=np.float32)
+        memory = np.asarray(memory, dtype=np.float32)
+        
+        action = np.full(len(cpu), 'maintain', dtype=object)
+        idle = (cpu < 20) & (memory < 30)
+        action[idle if suspect is None else idle & ~suspect] = 'hibernate'
+        overloaded = (cpu > 80) | (memory > 85)
+        action[overloaded if overheating is None else overloaded | overheating] = 'activate'
+        hibernate = action == 'hibernate'
+        
+        return {
+            'server_id': np.asarray(server_ids),
+            'action': action.astype(str),
+            'target': np.full(len(cpu), None, dtype=object),
+            'expected_cpu_savings': np.where(hibernate, 5.0, 0),
+            'expected_energy_savings': np.where(hibernate, 0.3, 0),
+            'confidence': np.full(len(cpu), 0.8)
+        }
+    
+    def decide_grid(self, cpu, memory, io):
+        """Generate dummy action codes for (n_scenarios, n_servers) what-if fleets"""
+        cpu = np.asarray(cpu, dtype=np.float32)
+        memory = np.asarray(memory, dtype=np.float32)
+        
+        codes = np.zeros(cpu.shape, dtype=np.int8)
+        codes[(cpu < 20) & (memory < 30)] = 2
+        codes[(cpu > 80) | (memory > 85)] = 1
+        
+        return {'action': codes, 'expected_energy_savings': np.where(codes == 2, 0.3, 0)}
 
 class DummyCoolingModel:
     """Fallback model for cooling optimization when the main model fails"""
@@ -88,11 +125,30 @@ class DummyCoolingModel:
     
     def optimize(self, server_data):
         """Generate dummy cooling optimization settings"""
-        servers = server_data.get('servers', [])
-        
-        if servers:
-            avg_temp = np.mean([server.get('temperature', 25) for server in servers])
-            avg_cpu = np.mean([server.get('cpu', 50) for server in servers])
+        return self.optimize_arrays(*server_columns(server_data.get('servers', [])))
+    
+    def apply_rules_batch(self, temps, humidities, heats):
+        """Dummy threshold rules for arrays of inputs, same levels as optimize_arrays"""
+        temps, _, heats = np.broadcast_arrays(
+            np.asarray(temps, dtype=np.float64), np.asarray(humidities, dtype=np.float64),
+            np.asarray(heats, dtype=np.float64)
+        )
+        high = (temps > 40) | (heats > 70)
+        low = ~high & (temps < 30) & (heats < 40)
+        numeric = np.where(high, 70.0, np.where(low, 30.0, 50.0))
+        levels = np.where(high, 'high', np.where(low, 'low', 'medium'))
+        return levels, numeric
+    
+    def optimize_zones(self, topology, rack_temperature, rack_heat, humidity=45, coupling=0.25, max_step=20.0):
+        """Generate dummy per-zone cooling settings"""
+        return optimize_zones(self.apply_rules_batch, topology, rack_temperature, rack_heat,
+                              humidity, coupling, max_step)
+    
+    def optimize_arrays(self, temperature, cpu, memory, humidity=45, runaway=None, stuck=None):
+        """Generate dummy cooling optimization settings from per-server arrays"""
+        if len(temperature):
+            avg_temp = room_temperature(temperature, runaway, stuck)
+            avg_cpu = np.mean(cpu)
         else:
             avg_temp = 25
             avg_cpu = 50
@@ -113,4 +169,4 @@ class DummyCoolingModel:
             'ac_temperature_setpoint': 24 - (cooling_numeric - 50) / 10,
             'expected_power_savings': (100 - cooling_numeric) * 0.05,
             'timestamp': pd.Timestamp.now().isoformat()
-        } 
\ No newline at end of file
+        }
\ No newline at end of file
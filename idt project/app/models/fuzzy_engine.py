@@ -0,0 +1,129 @@
+import numpy as np
+
+class CompiledFuzzyEngine:
+    """Vectorized fuzzy inference over arrays of (temperature, humidity, heat) inputs
+    
+    The rule list is compiled once into index and weight arrays so that each call
+    evaluates every input in a single NumPy pass. Operations are applied in the
+    same order as CoolingOptimizationModel._apply_rules, so results match the
+    scalar path exactly.
+    """
+    
+    # Crisp thresholds separating the linguistic cooling levels
+    LEVEL_THRESHOLDS = np.array([20, 40, 60, 80], dtype=np.float64)
+    LEVEL_NAMES = np.array(['very_low', 'low', 'medium', 'high', 'very_high'])
+    
+    def __init__(self, rules, membership_sets, cooling_levels, default_level=50):
+        """
+        Compile fuzzy rules into membership parameter and rule weight matrices
+        
+        Args:
+            rules: List of (temp_cond, humid_cond, heat_cond, cooling_level, weight)
+            membership_sets: Dictionary with 'temp', 'humidity' and 'heat' entries, each
+                             mapping a fuzzy set name to (shape, parameters)
+            cooling_levels: Dictionary mapping cooling level names to crisp values
+            default_level: Output used when no rule fires
+        """
+        self.default_level = float(default_level)
+        
+        # Membership parameters per input variable, one row per fuzzy set
+        self.variables = []
+        for variable in ('temp', 'humidity', 'heat'):
+            names, params = self._compile_sets(membership_sets[variable])
+            self.variables.append((names, params))
+        
+        # Rule matrices: set index per input variable, weight and crisp output
+        self.rule_index = np.array([
+            [self.variables[v][0].index(rule[v]) for v in range(3)] for rule in rules
+        ], dtype=np.intp).reshape(-1, 3)
+        self.rule_weight = np.array([rule[4] for rule in rules], dtype=np.float64)
+        self.rule_output = np.array([cooling_levels[rule[3]] for rule in rules], dtype=np.float64)
+    
+    @staticmethod
+    def _compile_sets(sets):
+        """Convert fuzzy sets to trapezoid parameters (a, b, c, d) plus an 'any' row"""
+        names = []
+        params = []
+        for name, (shape, points) in sets.items():
+            if shape == 'triangular':
+                # A triangle is a trapezoid whose plateau collapses to its peak
+                a, b, c = points
+                points = (a, b, b, c)
+            elif shape != 'trapezoidal':
+                raise ValueError(f"Unsupported membership shape: {shape}")
+            names.append(name)
+            params.append(points)
+        
+        names.append('any')
+        return names, np.array(params, dtype=np.float64)
+    
+    @staticmethod
+    def _memberships(x, params):
+        """Evaluate every fuzzy set of one variable, returns (n_sets + 1, n) array"""
+        a, b, c, d = (params[:, i:i + 1] for i in range(4))
+        rising = np.minimum((x - a) / (b - a), 1)
+        falling = (d - x) / (d - c)
+        memberships = np.maximum(np.minimum(rising, falling), 0)
+        
+        # Final row is the 'any' condition which always fully applies
+        return np.vstack([memberships, np.ones((1, x.shape[1]))])
+    
+    def aggregate(self, temp, humidity, heat):
+        """
+        Rule outputs before defuzzification, for arrays of inputs
+        
+        Both results are continuous in the inputs (the level is their ratio,
+        which jumps to default_level where no rule fires).
+        
+        Returns:
+            Tuple of (weighted output sum, total rule weight) arrays
+        """
+        inputs = np.broadcast_arrays(
+            np.asarray(temp, dtype=np.float64),
+            np.asarray(humidity, dtype=np.float64),
+            np.asarray(heat, dtype=np.float64)
+        )
+        shape = inputs[0].shape
+        
+        memberships = [
+            self._memberships(x.reshape(1, -1), params)
+            for x, (_, params) in zip(inputs, self.variables)
+        ]
+        
+        # Rule strength (min operator for AND) for every rule and input, shape (n_rules, n)
+        strength = np.minimum(
+            np.minimum(memberships[0][self.rule_index[:, 0]], memberships[1][self.rule_index[:, 1]]),
+            memberships[2][self.rule_index[:, 2]]
+        )
+        weighted = strength * self.rule_weight[:, None]
+        
+        # Accumulate rule by rule to keep the scalar summation order
+        weighted_sum = np.zeros(weighted.shape[1])
+        total_weight = np.zeros(weighted.shape[1])
+        for rule in range(weighted.shape[0]):
+            weighted_sum += weighted[rule] * self.rule_output[rule]
+            total_weight += weighted[rule]
+        
+        return weighted_sum.reshape(shape), total_weight.reshape(shape)
+    
+    def defuzzify(self, weighted_sum, total_weight):
+        """Weighted-average cooling level and its linguistic name"""
+        numeric = np.full(np.shape(weighted_sum), self.default_level)
+        np.divide(weighted_sum, total_weight, out=numeric, where=total_weight > 0)
+        
+        levels = self.LEVEL_NAMES[np.searchsorted(self.LEVEL_THRESHOLDS, numeric, side='right')]
+        return levels, numeric
+    
+    def evaluate(self, temp, humidity, heat):
+        """
+        Evaluate the rule base for arrays of inputs
+        
+        Args:
+            temp: Array of temperatures in °C
+            humidity: Array of relative humidity percentages
+            heat: Array of server heat outputs (0-100)
+        
+        Returns:
+            Tuple of (cooling level names, numeric cooling levels) as NumPy arrays
+        """
+        return self.defuzzify(*self.aggregate(temp, humidity, heat))
@@ -0,0 +1,243 @@
+import json
+import os
+import numpy as np
+
+# Layers the NumPy executor knows how to run
+SUPPORTED_LAYERS = {
+    'InputLayer', 'Conv1D', 'LayerNormalization', 'Dropout', 'Attention',
+    'Concatenate', 'Flatten', 'Dense', 'Reshape'
+}
+
+def _softmax(x, axis=-1):
+    """Numerically stable softmax"""
+    x = x - np.max(x, axis=axis, keepdims=True)
+    np.exp(x, out=x)
+    x /= np.sum(x, axis=axis, keepdims=True)
+    return x
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0, out=x),
+    'sigmoid': lambda x: 1.0 / (1.0 + np.exp(-x)),
+    'tanh': np.tanh,
+    'softmax': _softmax
+}
+
+def _history_names(node):
+    """Collect inbound layer names from a Keras 2 or Keras 3 inbound_nodes config"""
+    if isinstance(node, dict):
+        if 'keras_history' in node:
+            return [node['keras_history'][0]]
+        names = []
+        for value in node.values():
+            names.extend(_history_names(value))
+        return names
+
+    if isinstance(node, (list, tuple)):
+        # Keras 2 entries look like [layer_name, node_index, tensor_index, kwargs]
+        if len(node) >= 3 and isinstance(node[0], str) and isinstance(node[1], int):
+            return [node[0]]
+        names = []
+        for value in node:
+            names.extend(_history_names(value))
+        return names
+
+    return []
+
+def keras_graph(model):
+    """
+    Describe a Keras functional model for NumpyModel
+
+    Returns:
+        Tuple of (graph, weights): the JSON-compatible graph (layer type, the
+        config fields the executor needs and inbound layer names) and a dict of
+        float32 weights keyed '<layer name>/<index>'
+    """
+    config = model.get_config()
+    layers = []
+    weights = {}
+
+    for layer_config in config['layers']:
+        class_name = layer_config['class_name']
+        if class_name not in SUPPORTED_LAYERS:
+            raise ValueError(f"Layer type {class_name} is not supported by the NumPy runtime")
+
+        name = layer_config.get('name', layer_config['config']['name'])
+        layer = model.get_layer(name)
+        layer_weights = layer.get_weights()
+        for i, value in enumerate(layer_weights):
+            weights[f'{name}/{i}'] = np.asarray(value, dtype=np.float32)
+
+        layer_config_fields = layer_config['config']
+        layers.append({
+            'name': name,
+            'class_name': class_name,
+            'inputs': _history_names(layer_config.get('inbound_nodes', [])),
+            'n_weights': len(layer_weights),
+            'activation': layer_config_fields.get('activation', 'linear'),
+            'dilation_rate': layer_config_fields.get('dilation_rate', [1]),
+            'padding': layer_config_fields.get('padding', 'valid'),
+            'epsilon': layer_config_fields.get('epsilon', 1e-3),
+            'axis': layer_config_fields.get('axis', -1),
+            'use_scale': layer_config_fields.get('use_scale', False),
+            'score_mode': layer_config_fields.get('score_mode', 'dot'),
+            'target_shape': layer_config_fields.get('target_shape')
+        })
+
+    graph = {
+        'layers': layers,
+        'outputs': _history_names(config['output_layers'])
+    }
+    return graph, weights
+
+def export_keras_model(model, path):
+    """
+    Export a Keras functional model to a compact .npz file for NumpyModel
+
+    The archive holds the JSON graph from keras_graph plus the float32 weights
+    of every layer.
+
+    Args:
+        model: Keras functional model using only SUPPORTED_LAYERS
+        path: Destination .npz path
+
+    Returns:
+        The path written
+    """
+    graph, weights = keras_graph(model)
+    np.savez_compressed(path, __graph__=np.array(json.dumps(graph)), **weights)
+    return path
+
+class NumpyModel:
+    """Pure-NumPy inference for models exported with export_keras_model
+
+    Supports causal/dilated Conv1D, LayerNormalization, dot-product Attention,
+    Dense, Concatenate, Flatten, Reshape and Dropout (identity at inference). Calling the
+    model mirrors Keras: model(x, training=False) returns a float32 array.
+    """
+
+    def __init__(self, graph, weights):
+        self.layers = graph['layers']
+        self.outputs = graph['outputs']
+        self.weights = {
+            layer['name']: [weights[f"{layer['name']}/{i}"] for i in range(layer['n_weights'])]
+            for layer in self.layers
+        }
+
+    @classmethod
+    def load(cls, path):
+        """Load an exported .npz model"""
+        with np.load(path) as archive:
+            graph = json.loads(str(archive['__graph__']))
+            weights = {key: archive[key] for key in archive.files if key != '__graph__'}
+        return cls(graph, weights)
+
+    @classmethod
+    def from_keras(cls, model):
+        """Convert an in-memory Keras model without writing a file"""
+        return cls(*keras_graph(model))
+
+    def get_weights(self):
+        """Weights of every layer in graph order, matching Keras get_weights()"""
+        return [weight for layer in self.layers for weight in self.weights[layer['name']]]
+
+    def __call__(self, x, training=False):
+        """Run a forward pass on a batch, returns the output array"""
+        values = {}
+        for layer in self.layers:
+            inputs = [values[name] for name in layer['inputs']]
+            if layer['class_name'] == 'InputLayer':
+                values[layer['name']] = np.asarray(x, dtype=np.float32)
+            else:
+                values[layer['name']] = self._run_layer(layer, inputs, self.weights[layer['name']])
+
+        outputs = [values[name] for name in self.outputs]
+        return outputs[0] if len(outputs) == 1 else outputs
+
+    def predict(self, x, batch_size=1024, verbose=0):
+        """Keras-style predict over a large input in chunks"""
+        x = np.asarray(x, dtype=np.float32)
+        return np.concatenate([self(x[i:i + batch_size]) for i in range(0, len(x), batch_size)])
+
+    def _run_layer(self, layer, inputs, weights):
+        """Dispatch one layer"""
+        class_name = layer['class_name']
+
+        if class_name == 'Dense':
+            kernel, bias = weights
+            return ACTIVATIONS[layer['activation']](inputs[0] @ kernel + bias)
+
+        if class_name == 'Conv1D':
+            return ACTIVATIONS[layer['activation']](self._conv1d(layer, inputs[0], *weights))
+
+        if class_name == 'LayerNormalization':
+            gamma, beta = weights
+            x = inputs[0]
+            mean = x.mean(axis=-1, keepdims=True)
+            variance = x.var(axis=-1, keepdims=True)
+            return (x - mean) / np.sqrt(variance + layer['epsilon']) * gamma + beta
+
+        if class_name == 'Attention':
+            return self._attention(layer, inputs, weights)
+
+        if class_name == 'Concatenate':
+            return np.concatenate(inputs, axis=layer['axis'])
+
+        if class_name == 'Flatten':
+            return inputs[0].reshape(inputs[0].shape[0], -1)
+
+        if class_name == 'Reshape':
+            return inputs[0].reshape(inputs[0].shape[0], *layer['target_shape'])
+
+        # Dropout is the identity at inference time
+        return inputs[0]
+
+    @staticmethod
+    def _conv1d(layer, x, kernel, bias):
+        """1-D convolution over (batch, time, channels) with causal or same/valid padding"""
+        kernel_size = kernel.shape[0]
+        dilation = layer['dilation_rate'][0]
+        span = (kernel_size - 1) * dilation
+        steps = x.shape[1]
+
+        if layer['padding'] == 'causal':
+            x = np.pad(x, ((0, 0), (span, 0), (0, 0)))
+        elif layer['padding'] == 'same':
+            x = np.pad(x, ((0, 0), (span // 2, span - span // 2), (0, 0)))
+        else:
+            steps -= span
+
+        # Stack the dilated taps along the channel axis for a single matrix product
+        taps = np.concatenate(
+            [x[:, tap * dilation:tap * dilation + steps] for tap in range(kernel_size)], axis=-1
+        )
+        return taps @ kernel.reshape(-1, kernel.shape[-1]) + bias
+
+    @staticmethod
+    def _attention(layer, inputs, weights):
+        """Luong-style dot-product attention over [query, value(, key)]"""
+        if layer['score_mode'] != 'dot':
+            raise ValueError(f"Attention score_mode {layer['score_mode']} is not supported")
+        query, value = inputs[0], inputs[1]
+        key = inputs[2] if len(inputs) > 2 else value
+
+        scores = query @ key.transpose(0, 2, 1)
+        if layer['use_scale']:
+            scores = scores * weights[0]
+        return _softmax(scores) @ value
+
+def export_saved_models(saved_dir=os.path.join('app', 'models', 'saved')):
+    """Convert every .h5 model in saved_dir to a .npz next to it, returns written paths"""
+    import tensorflow as tf
+
+    written = []
+    for filename in sorted(os.listdir(saved_dir)):
+        if filename.endswith('.h5'):
+            model = tf.keras.models.load_model(os.path.join(saved_dir, filename), compile=False)
+            path = os.path.join(saved_dir, filename[:-len('.h5')] + '.npz')
+            written.append(export_keras_model(model, path))
+            print(f"Exported {filename} -> {path} ({os.path.getsize(path) / 1024:.0f} KB)")
+    return written
+
+if __name__ == '__main__':
+    export_saved_models()
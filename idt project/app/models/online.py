@@ -0,0 +1,263 @@
+import copy
+import threading
+import time
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+from app.models.numpy_runtime import NumpyModel
+
+# TensorFlow is imported when the first update runs; collecting examples does not need it
+
+class ReplayBuffer:
+    """Fixed-size store of (window, target) training examples
+
+    Storage is preallocated. Once full, new examples replace random slots
+    (reservoir sampling), so the buffer stays a uniform sample of everything
+    seen while the newest examples are tracked separately for each update.
+    """
+
+    def __init__(self, capacity, lookback, n_features, n_targets=3, seed=0):
+        self.capacity = capacity
+        self.windows = np.empty((capacity, lookback, n_features), dtype=np.float32)
+        self.targets = np.empty((capacity, n_targets), dtype=np.float32)
+        self.size = 0
+        self.seen = 0
+        self._rng = np.random.default_rng(seed)
+
+    def add(self, windows, targets):
+        """Insert examples, returns the slots they were written to (-1 if dropped)"""
+        n = len(windows)
+        slots = np.full(n, -1, dtype=np.int64)
+
+        free = min(n, self.capacity - self.size)
+        slots[:free] = np.arange(self.size, self.size + free)
+        self.size += free
+
+        # Reservoir sampling: example number k replaces a random slot with probability capacity / k
+        if n > free:
+            numbers = self.seen + np.arange(free, n) + 1
+            candidates = (self._rng.random(n - free) * numbers).astype(np.int64)
+            slots[free:] = np.where(candidates < self.capacity, candidates, -1)
+
+        self.seen += n
+        kept = slots >= 0
+        self.windows[slots[kept]] = windows[kept]
+        self.targets[slots[kept]] = targets[kept]
+        return slots
+
+    def sample(self, n):
+        """Random slots of stored examples"""
+        return self._rng.integers(0, self.size, n)
+
+class RecentExamples:
+    """Ring of the newest (window, target) examples, kept apart from the reservoir
+
+    The reservoir admits example number k with probability capacity / k, so
+    after a long uptime it keeps almost none of the newest examples; this ring
+    always holds the latest capacity of them.
+    """
+
+    def __init__(self, capacity, lookback, n_features, n_targets=3):
+        self.capacity = capacity
+        self.windows = np.empty((capacity, lookback, n_features), dtype=np.float32)
+        self.targets = np.empty((capacity, n_targets), dtype=np.float32)
+        self.size = 0
+        self._head = 0  # Next write position
+
+    def add(self, windows, targets):
+        """Append examples, overwriting the oldest once full"""
+        windows, targets = windows[-self.capacity:], targets[-self.capacity:]
+        positions = (self._head + np.arange(len(windows))) % self.capacity
+        self.windows[positions] = windows
+        self.targets[positions] = targets
+        self._head = (self._head + len(windows)) % self.capacity
+        self.size = min(self.size + len(windows), self.capacity)
+
+    def newest(self, n):
+        """Copies of the n newest examples (at most size), as (windows, targets)"""
+        positions = (self._head - 1 - np.arange(min(n, self.size))) % self.capacity
+        return self.windows[positions], self.targets[positions]
+
+class OnlineUpdater:
+    """Keeps the serving forecaster fresh with small incremental updates
+
+    Telemetry batches are turned into training examples: each server's window
+    before the batch paired with its first new cpu/memory/io sample. An update
+    refits the scaler statistics incrementally (running mean/variance), runs a
+    few gradient steps on batches mixing the newest examples with the replay
+    buffer, then builds a new serving model and swaps it into the registry in
+    one step. Requests in flight keep using the previous instance.
+    """
+
+    def __init__(self, registry, name='workload', replay_size=20000, recent_size=4096, batch_size=256, steps=20,
+                 recent_fraction=0.5, learning_rate=1e-4, min_examples=256):
+        self.registry = registry
+        self.name = name
+        self.replay_size = replay_size
+        self.recent_size = max(recent_size, min_examples)
+        self.batch_size = batch_size
+        self.steps = steps
+        self.recent_fraction = recent_fraction
+        self.learning_rate = learning_rate
+        self.min_examples = min_examples
+
+        self.replay = None
+        self.recent = None
+        self._pending = 0           # Examples collected since the last update
+        self._trainer = None        # Keras copy of the network with persistent optimizer state
+        self._lock = threading.Lock()
+        self._update_lock = threading.Lock()
+        self._thread = None
+        self._stopped = threading.Event()
+        self._stats = {'updates': 0, 'examples': 0, 'last_loss': None, 'last_update_s': None, 'cpu_seconds': 0.0}
+
+    def collect(self, telemetry, server_ids, features):
+        """
+        Record training examples from a telemetry batch; call before ingesting it
+
+        Args:
+            telemetry: TelemetryBuffer the batch is about to be ingested into
+            server_ids: Server id of each sample in the batch
+            features: (n_samples, n_features) feature matrix of the batch
+
+        Returns:
+            Number of examples recorded
+        """
+        unique_ids, first = np.unique(np.asarray(server_ids, dtype=np.int64), return_index=True)
+        found_ids, windows = telemetry.windows_for(unique_ids)
+        if len(found_ids) == 0:
+            return 0
+        targets = np.clip(features[first[np.searchsorted(unique_ids, found_ids)], :3] / 100.0, 0.0, 1.0)
+
+        with self._lock:
+            if self.replay is None:
+                self.replay = ReplayBuffer(self.replay_size, *windows.shape[1:])
+                self.recent = RecentExamples(self.recent_size, *windows.shape[1:])
+            targets = targets.astype(np.float32)
+            self.replay.add(windows, targets)
+            self.recent.add(windows, targets)
+            self._pending += len(found_ids)
+            self._stats['examples'] += len(found_ids)
+        return len(found_ids)
+
+    def _fitted_scaler(self, forecaster, windows):
+        """Copy of the serving scaler with its running statistics updated by windows"""
+        scaler = copy.deepcopy(forecaster.scaler) if hasattr(forecaster.scaler, 'partial_fit') else StandardScaler()
+        scaler.partial_fit(windows[:, -1, :])
+        return scaler
+
+    def _trainer_for(self, forecaster):
+        """Keras network to train, initialized from the serving weights on first use"""
+        import tensorflow as tf
+        from app.models.workload_forecasting import build_network
+
+        if self._trainer is None:
+            self._trainer = build_network(forecaster.lookback, forecaster.n_features)
+            self._trainer.set_weights(forecaster.model.get_weights())
+            self._trainer.compile(
+                optimizer=tf.keras.optimizers.Adam(self.learning_rate),
+                loss=tf.keras.losses.MeanSquaredError()
+            )
+        return self._trainer
+
+    def update(self):
+        """
+        Run one incremental update and hot-swap the serving model
+
+        Returns:
+            Dictionary with the examples used, final loss and CPU seconds, or
+            None if fewer than min_examples new examples have arrived
+        """
+        with self._update_lock:
+            with self._lock:
+                if self.replay is None or self._pending < self.min_examples:
+                    return None
+                recent_windows, recent_targets = self.recent.newest(self._pending)
+                self._pending = 0
+
+            cpu_start = time.process_time()
+            wall_start = time.perf_counter()
+            forecaster = self.registry.get(self.name)
+            if not hasattr(forecaster, 'model'):
+                # Dummy fallback models have no network to update
+                return None
+            if forecaster.forecast_horizon > 1 or forecaster.quantiles:
+                # Examples only carry the next-step target; multi-horizon heads need retraining
+                return None
+            replay = self.replay
+
+            # Only the latest step of each window is new data for the scaler
+            scaler = self._fitted_scaler(forecaster, recent_windows)
+            trainer = self._trainer_for(forecaster)
+
+            n_recent = max(1, int(self.batch_size * self.recent_fraction))
+            rng = np.random.default_rng()
+            loss = None
+            for _ in range(self.steps):
+                chosen = rng.integers(0, len(recent_windows), n_recent)
+                slots = replay.sample(self.batch_size - n_recent)
+                windows = np.concatenate([recent_windows[chosen], replay.windows[slots]])
+                targets = np.concatenate([recent_targets[chosen], replay.targets[slots]])
+                inputs = scaler.transform(windows.reshape(-1, windows.shape[2])).astype(np.float32)
+                loss = float(trainer.train_on_batch(inputs.reshape(windows.shape), targets))
+
+            self.registry.replace(self.name, self._serving_copy(forecaster, trainer, scaler))
+
+            cpu_seconds = time.process_time() - cpu_start
+            result = {
+                'examples': int(len(recent_windows)),
+                'loss': round(loss, 6),
+                'cpu_seconds': round(cpu_seconds, 3),
+                'wall_seconds': round(time.perf_counter() - wall_start, 3)
+            }
+            with self._lock:
+                self._stats['updates'] += 1
+                self._stats['last_loss'] = result['loss']
+                self._stats['last_update_s'] = result['wall_seconds']
+                self._stats['cpu_seconds'] += cpu_seconds
+            return result
+
+    @staticmethod
+    def _serving_copy(forecaster, trainer, scaler):
+        """New forecaster instance serving the trained weights and updated scaler"""
+        from app.models.workload_forecasting import build_network
+
+        updated = copy.copy(forecaster)
+        if isinstance(forecaster.model, NumpyModel):
+            updated.model = NumpyModel.from_keras(trainer)
+        else:
+            updated.model = build_network(forecaster.lookback, forecaster.n_features)
+            updated.model.set_weights(trainer.get_weights())
+        updated.scaler = scaler
+        return updated
+
+    def start(self, interval):
+        """Run update() every interval seconds on a background thread"""
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, args=(interval,), name='online-updates', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, interval):
+        while not self._stopped.wait(interval):
+            try:
+                result = self.update()
+                if result is not None:
+                    print(f"Online update of {self.name} model: {result}")
+            except Exception as e:
+                print(f"Online update error: {e}")
+
+    def stats(self):
+        """Update counters, replay buffer fill and pending example count"""
+        with self._lock:
+            return dict(
+                self._stats,
+                cpu_seconds=round(self._stats['cpu_seconds'], 3),
+                replay_size=self.replay.size if self.replay is not None else 0,
+                pending=self._pending
+            )
@@ -2,21 +2,102 @@ import numpy as np
 import pandas as pd
 import os
 import joblib
-import tensorflow as tf
-from tensorflow.keras.models import Sequential, Model
-from tensorflow.keras.layers import Dense, Input, Concatenate, Dropout
+from app.models.artifacts import artifact_dir
+from app.models.numpy_runtime import NumpyModel
+from app.metrics import timed_batch
+
+# TensorFlow is imported lazily in __init__ and build_policy_network
+
+def build_policy_network(state_dim=12, action_dim=8):
+    """Build DRL model with Adaptive Decision Tree structure"""
+    import tensorflow as tf
+    from tensorflow.keras.models import Model
+    from tensorflow.keras.layers import Dense, Input, Concatenate, Dropout
+    
+    # Input: Server states (CPU%, RAM%, I/O% for each server)
+    state_input = Input(shape=(state_dim,))
+    
+    # First level decision tree - server activation branch
+    activation_branch = Dense(64, activation='relu')(state_input)
+    activation_branch = Dense(32, activation='relu')(activation_branch)
+    
+    # Second level decision tree - workload migration branch
+    migration_branch = Dense(64, activation='relu')(state_input)
+    migration_branch = Dense(32, activation='relu')(migration_branch)
+    
+    # Combine branches
+    combined = Concatenate()([activation_branch, migration_branch])
+    combined = Dense(64, activation='relu')(combined)
+    combined = Dropout(0.2)(combined)
+    
+    # Output layer - probability of each action
+    outputs = Dense(action_dim, activation='softmax')(combined)
+    
+    # Create model
+    model = Model(inputs=state_input, outputs=outputs)
+    model.compile(optimizer='adam', loss=tf.keras.losses.CategoricalCrossentropy())
+    return model
+
+def rule_actions(cpu, memory, io, prefers_activate, overheating=None, suspect=None):
+    """
+    Action codes (indices into ResourceAllocationModel.ACTIONS) for each server
+    
+    Thresholds keep decisions safe; the policy picks how overloads are handled.
+    
+    Args:
+        cpu, memory, io: Arrays of loads in percent
+        prefers_activate: Boolean array, True where the policy prefers activation
+        overheating: Optional boolean array of servers to shed load from as if overloaded
+        suspect: Optional boolean array of servers with anomalous readings, never hibernated
+    """
+    overloaded = (cpu > 80) | (memory > 85)
+    if overheating is not None:
+        overloaded |= overheating
+    idle = (cpu < 20) & (memory < 30) & (io < 15)
+    if suspect is not None:
+        idle &= ~suspect
+    codes = np.zeros(np.shape(cpu), dtype=np.int8)
+    codes[overloaded & prefers_activate] = 1
+    codes[overloaded & ~prefers_activate] = 3
+    codes[idle & ~overloaded] = 2
+    return codes
+
+def next_hour_columns(workload_data):
+    """
+    Next-hour (server_id, cpu, memory, io) forecast columns of a workload payload
+
+    Accepts per-point 'forecasts' dicts, or one array per field as returned by
+    predict_batch or a compact /api/workload/forecast response; with a
+    'time_offset' column only the next hour is kept.
+    """
+    keys = ('server_id', 'cpu_forecast', 'memory_forecast', 'io_forecast')
+    if 'cpu_forecast' in workload_data:
+        columns = [np.asarray(workload_data[key]) for key in keys]
+        if 'time_offset' in workload_data:
+            next_hour = np.asarray(workload_data['time_offset']) == 1
+            columns = [column[next_hour] for column in columns]
+        return tuple(columns)
+
+    next_hour = [f for f in workload_data.get('forecasts', []) if f['time_offset'] == 1]
+    return tuple([f[key] for f in next_hour] for key in keys)
 
 class ResourceAllocationModel:
-    def __init__(self):
+    def __init__(self, runtime=None):
         """Initialize the Resource Allocation Model using DRL with Adaptive Decision Trees"""
         self.model = None
         self.state_dim = 12  # Server states (4 servers x 3 metrics)
         self.action_dim = 8  # Actions (activate/hibernate for 4 servers)
+        self.runtime = runtime or os.environ.get('MODEL_RUNTIME', 'keras')
         
-        # Check if model exists, otherwise build it
-        model_path = os.path.join('app', 'models', 'saved', 'resource_allocation_model.h5')
+        # Check if model exists (the promoted training version, if any), otherwise build it
+        saved_dir = artifact_dir('resource')
+        model_path = os.path.join(saved_dir, 'resource_allocation_model.h5')
+        export_path = os.path.join(saved_dir, 'resource_allocation_model.npz')
         
-        if os.path.exists(model_path):
+        if self.runtime == 'numpy' and os.path.exists(export_path):
+            self.model = NumpyModel.load(export_path)
+        elif os.path.exists(model_path):
+            import tensorflow as tf
             self.model = tf.keras.models.load_model(model_path)
         else:
             # For demo purposes, we'll build a simple model
@@ -24,89 +105,173 @@ class ResourceAllocationModel:
             self._build_model()
             
             # Create directory if it doesn't exist
-            os.makedirs(os.path.join('app', 'models', 'saved'), exist_ok=True)
+            os.makedirs(saved_dir, exist_ok=True)
             
             # Save dummy model
             self.model.save(model_path)
     
     def _build_model(self):
         """Build DRL model with Adaptive Decision Tree structure"""
-        # Input: Server states (CPU%, RAM%, I/O% for each server)
-        state_input = Input(shape=(self.state_dim,))
+        self.model = build_policy_network(self.state_dim, self.action_dim)
+    
+    # Actions the allocator can take, indexed by the action codes in decide_batch
+    ACTIONS = np.array(['maintain', 'activate', 'hibernate', 'migrate_workload'])
+    
+    # Linear server power model (kW) used for savings estimates
+    IDLE_POWER_KW = 0.2
+    DYNAMIC_POWER_KW = 0.3
+    
+    def _policy_scores(self, states, batch_size=4096):
+        """
+        Score every server with one batched forward pass of the policy network
         
-        # First level decision tree - server activation branch
-        activation_branch = Dense(64, activation='relu')(state_input)
-        activation_branch = Dense(32, activation='relu')(activation_branch)
+        The network sees servers in shards of state_dim / 3 servers and outputs an
+        (activate, hibernate) probability pair per server, so fleets of any size are
+        split into shards, padded to a whole number of shards and scored together.
         
-        # Second level decision tree - workload migration branch
-        migration_branch = Dense(64, activation='relu')(state_input)
-        migration_branch = Dense(32, activation='relu')(migration_branch)
+        Args:
+            states: Array of shape (n_servers, 3) with CPU, memory and I/O fractions
         
-        # Combine branches
-        combined = Concatenate()([activation_branch, migration_branch])
-        combined = Dense(64, activation='relu')(combined)
-        combined = Dropout(0.2)(combined)
+        Returns:
+            Array of shape (n_servers, 2) with (activate, hibernate) probabilities
+        """
+        n_servers = states.shape[0]
+        servers_per_shard = self.state_dim // 3
+        n_shards = -(-n_servers // servers_per_shard)
         
-        # Output layer - probability of each action
-        outputs = Dense(self.action_dim, activation='softmax')(combined)
+        padded = np.zeros((n_shards * servers_per_shard, 3), dtype=np.float32)
+        padded[:n_servers] = states
+        shards = padded.reshape(n_shards, self.state_dim)
         
-        # Create model
-        self.model = Model(inputs=state_input, outputs=outputs)
-        self.model.compile(optimizer='adam', loss=tf.keras.losses.CategoricalCrossentropy())
+        outputs = np.empty((n_shards, self.action_dim), dtype=np.float32)
+        for start in range(0, n_shards, batch_size):
+            stop = min(start + batch_size, n_shards)
+            outputs[start:stop] = np.asarray(self.model(shards[start:stop], training=False))
+        
+        scores = outputs.reshape(-1, 2)[:n_servers]
+        return scores / np.maximum(scores.sum(axis=1, keepdims=True), 1e-12)
+    
+    @timed_batch('resource')
+    def decide_batch(self, server_ids, cpu, memory, io, overheating=None, suspect=None):
+        """
+        Decide resource allocation for a whole fleet from columnar forecasts
+        
+        Args:
+            server_ids: Array of server ids
+            cpu, memory, io: Arrays of next-hour forecasts in percent
+            overheating: Optional boolean array of servers in thermal runaway, which
+                         shed load as if overloaded
+            suspect: Optional boolean array of servers with anomalous readings, which
+                     are neither hibernated nor chosen as migration targets
+        
+        Returns:
+            Dictionary of NumPy arrays keyed by 'server_id', 'action', 'target',
+            'expected_cpu_savings', 'expected_energy_savings' and 'confidence'
+        """
+        server_ids = np.asarray(server_ids)
+        cpu = np.asarray(cpu, dtype=np.float64)
+        memory = np.asarray(memory, dtype=np.float64)
+        io = np.asarray(io, dtype=np.float64)
+        n_servers = len(server_ids)
+        
+        states = np.stack([cpu, memory, io], axis=1) / 100.0
+        scores = self._policy_scores(states).astype(np.float64) if n_servers else np.zeros((0, 2))
+        prefers_activate = scores[:, 0] >= scores[:, 1]
+        
+        codes = rule_actions(cpu, memory, io, prefers_activate, overheating, suspect)
+        
+        # Migrations go to the least loaded server that stays up and is not overloaded
+        target = np.full(n_servers, None, dtype=object)
+        migrating = codes == 3
+        trusted = codes == 0 if suspect is None else (codes == 0) & ~suspect
+        candidates = np.flatnonzero(trusted)
+        if migrating.any() and len(candidates):
+            target_id = server_ids[candidates[np.argmin(cpu[candidates])]]
+            target[migrating] = f"Server {target_id}"
+        else:
+            codes[migrating] = 1
+        
+        # Savings estimates from the linear power model
+        freed = (codes == 2) | (codes == 3)
+        energy_savings = np.where(freed, self.IDLE_POWER_KW + self.DYNAMIC_POWER_KW * cpu / 100, 0)
+        cpu_savings = np.where(freed, cpu, 0)
+        
+        return {
+            'server_id': server_ids,
+            'action': self.ACTIONS[codes],
+            'target': target,
+            'expected_cpu_savings': np.round(cpu_savings, 1),
+            'expected_energy_savings': np.round(energy_savings, 2),
+            'confidence': np.round(scores.max(axis=1), 2)
+        }
+    
+    @timed_batch('resource')
+    def decide_grid(self, cpu, memory, io):
+        """
+        Allocation action codes for many what-if versions of one fleet at once
+        
+        Every row is one scenario, decided as decide_batch decides a fleet: the
+        policy sees the same groups of servers, and migrations fall back to
+        activation in scenarios where no server stays up to take the workload.
+        The policy only changes the action of overloaded servers, so only server
+        groups with an overloaded server are scored.
+        
+        Args:
+            cpu, memory, io: Arrays of shape (n_scenarios, n_servers) in percent
+        
+        Returns:
+            Dictionary with (n_scenarios, n_servers) arrays 'action' (codes into
+            ACTIONS) and 'expected_energy_savings'
+        """
+        cpu = np.asarray(cpu, dtype=np.float64)
+        memory = np.asarray(memory, dtype=np.float64)
+        io = np.asarray(io, dtype=np.float64)
+        n_scenarios, n_servers = cpu.shape
+        group = self.state_dim // 3
+        n_groups = -(-n_servers // group)
+        
+        overloaded = np.zeros((n_scenarios, n_groups * group), dtype=bool)
+        overloaded[:, :n_servers] = (cpu > 80) | (memory > 85)
+        scored = overloaded.reshape(n_scenarios, n_groups, group).any(axis=2)
+        
+        prefers_activate = np.ones((n_scenarios, n_servers), dtype=bool)
+        if scored.any():
+            states = np.zeros((n_scenarios, n_groups * group, 3), dtype=np.float32)
+            states[:, :n_servers] = np.stack([cpu, memory, io], axis=2) / 100.0
+            states = states.reshape(n_scenarios, n_groups, group, 3)[scored]
+            scores = self._policy_scores(states.reshape(-1, 3)).reshape(-1, group, 2)
+            preference = np.ones((n_scenarios, n_groups, group), dtype=bool)
+            preference[scored] = scores[:, :, 0] >= scores[:, :, 1]
+            prefers_activate = preference.reshape(n_scenarios, -1)[:, :n_servers]
+        
+        codes = rule_actions(cpu, memory, io, prefers_activate)
+        no_target = ~(codes == 0).any(axis=1)
+        codes[no_target[:, None] & (codes == 3)] = 1
+        
+        freed = (codes == 2) | (codes == 3)
+        energy_savings = np.where(freed, self.IDLE_POWER_KW + self.DYNAMIC_POWER_KW * cpu / 100, 0)
+        return {'action': codes, 'expected_energy_savings': np.round(energy_savings, 2)}
     
     def decide(self, workload_data):
         """
         Decide resource allocation based on forecasted workload
         
         Args:
-            workload_data: Dictionary containing forecasted workload
+            workload_data: Dictionary containing forecasted workload, either per-point
+                           'forecasts' or columns (see next_hour_columns)
         
         Returns:
             Dictionary with resource allocation decisions
         """
-        # In a real system, we'd use the DRL model to make decisions
-        # For demo, we'll return mock decisions based on the workload data
-        
-        # Extract forecasts for the next hour
-        forecasts = workload_data.get('forecasts', [])
-        next_hour_forecasts = [f for f in forecasts if f['time_offset'] == 1]
-        
-        # Make decisions for each server
-        decisions = []
+        batch = self.decide_batch(*next_hour_columns(workload_data))
         
-        for forecast in next_hour_forecasts:
-            server_id = forecast['server_id']
-            cpu = forecast['cpu_forecast']
-            memory = forecast['memory_forecast']
-            io = forecast['io_forecast']
-            
-            # Simple decision logic for demo
-            if cpu > 80 or memory > 85:
-                # High load expected, prepare additional resources
-                action = "activate" if server_id != 3 else "migrate_workload"
-                target = "Server 5" if action == "migrate_workload" else None
-            elif cpu < 20 and memory < 30 and io < 15:
-                # Low load expected, save energy
-                action = "hibernate"
-                target = None
-            else:
-                # Moderate load, maintain current state
-                action = "maintain"
-                target = None
-            
-            decision = {
-                'server_id': server_id,
-                'action': action,
-                'target': target,
-                'expected_cpu_savings': round(5 + np.random.normal(0, 2), 1) if action in ["hibernate", "migrate_workload"] else 0,
-                'expected_energy_savings': round(0.3 + np.random.normal(0, 0.1), 2) if action in ["hibernate", "migrate_workload"] else 0,
-                'confidence': round(0.7 + np.random.normal(0, 0.1), 2)
-            }
-            
-            decisions.append(decision)
+        columns = {key: batch[key].tolist() for key in batch}
+        decisions = [
+            dict(zip(columns, values)) for values in zip(*columns.values())
+        ]
         
         return {
             'decisions': decisions,
             'timestamp': pd.Timestamp.now().isoformat(),
             'optimization_goal': 'energy_efficiency'
-        } 
\ No newline at end of file
+        }
\ No newline at end of file
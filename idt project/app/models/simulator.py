@@ -0,0 +1,295 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+from app.models.resource_allocation import ResourceAllocationModel, rule_actions
+
+# TensorFlow is imported inside train_policy; the environment itself is pure NumPy
+
+# Power model (kW), shared with the savings estimates in decide_batch
+IDLE_POWER_KW = ResourceAllocationModel.IDLE_POWER_KW
+DYNAMIC_POWER_KW = ResourceAllocationModel.DYNAMIC_POWER_KW
+SLEEP_POWER_KW = 0.01   # Hibernating server
+WAKE_ENERGY_KWH = 0.05  # One activation
+
+def synthetic_traces(n_servers, n_steps, seed=0):
+    """
+    Hourly cpu/memory/io demand traces with a daily cycle, as fractions of capacity
+
+    Returns:
+        Array of shape (n_servers, n_steps, 3)
+    """
+    rng = np.random.default_rng(seed)
+    hours = np.arange(n_steps)
+    base = rng.uniform(0.05, 0.6, (n_servers, 1, 3))
+    amplitude = rng.uniform(0.0, 0.35, (n_servers, 1, 3))
+    phase = rng.uniform(0, 2 * np.pi, (n_servers, 1, 1))
+    daily = np.sin(hours[None, :, None] * (2 * np.pi / 24) + phase)
+    noise = rng.normal(0, 0.05, (n_servers, n_steps, 3))
+    return np.clip(base + amplitude * daily + noise, 0.0, 1.0).astype(np.float32)
+
+def history_traces(store_root, start=None, end=None):
+    """Hourly demand traces from the history store, dropping servers with gaps"""
+    from app.history import HistoryStore
+    from app.models.training import load_fleet
+
+    store = HistoryStore(store_root, read_only=True)
+    start = store.days()[0] if start is None else start
+    end = store.end_time() if end is None else end
+    series = load_fleet(store_root, store.servers(), start, end)[:, :, :3] / 100.0
+    complete = ~np.isnan(series).any(axis=(1, 2))
+    if not complete.any():
+        raise ValueError("No server in the history store has a gap-free trace")
+    return np.clip(series[complete], 0.0, 1.0).astype(np.float32)
+
+class DatacenterEnv:
+    """Vectorized simulator of n_envs independent fleets of n_servers servers
+
+    Each server hosts its own workload, whose hourly cpu/memory/io demand is
+    replayed from a trace. Actions use the ResourceAllocationModel.ACTIONS
+    codes per server:
+
+        0 maintain          nothing changes
+        1 activate          wake the server, or if it is awake wake one
+                            hibernating server of the fleet; workloads whose
+                            home server woke up move back home
+        2 hibernate         move hosted workloads to the least loaded awake
+                            server, then sleep
+        3 migrate_workload  move hosted workloads to the least loaded awake
+                            server, stay awake
+
+    A step is one simulated hour. The reward is minus the energy used (kWh)
+    and sla_weight times the SLA violation: demand above a host's capacity plus
+    demand of workloads left on a hibernating host. All fleets advance in one
+    NumPy call per step; only the per-server migration pass loops over the
+    (small) number of servers per fleet.
+    """
+
+    def __init__(self, traces, n_envs=1024, n_servers=4, episode_hours=24, sla_weight=5.0, seed=0):
+        self.traces = np.asarray(traces, dtype=np.float32)
+        if self.traces.shape[1] <= episode_hours:
+            raise ValueError(f"Traces must be longer than an episode ({episode_hours} hours)")
+        self.n_envs = n_envs
+        self.n_servers = n_servers
+        self.episode_hours = episode_hours
+        self.sla_weight = sla_weight
+        self._rng = np.random.default_rng(seed)
+        self.reset()
+
+    @property
+    def state_dim(self):
+        return self.n_servers * 3
+
+    def reset(self):
+        """Start new episodes on random trace servers and offsets, returns observations"""
+        self.trace_rows = self._rng.integers(0, len(self.traces), (self.n_envs, self.n_servers))
+        self.offsets = self._rng.integers(0, self.traces.shape[1] - self.episode_hours, self.n_envs)
+        self.t = 0
+        self.awake = np.ones((self.n_envs, self.n_servers), dtype=bool)
+        self.host = np.tile(np.arange(self.n_servers), (self.n_envs, 1))
+        return self.observe()
+
+    def demand(self):
+        """Current (n_envs, n_servers, 3) demand of each server's own workload"""
+        return self.traces[self.trace_rows, (self.offsets + self.t)[:, None]]
+
+    def host_loads(self, demand=None):
+        """(n_envs, n_servers, 3) load carried by each host"""
+        demand = self.demand() if demand is None else demand
+        placement = self.host[:, :, None] == np.arange(self.n_servers)[None, None, :]
+        return np.einsum('ewh,ewm->ehm', placement.astype(np.float32), demand)
+
+    def observe(self):
+        """Policy input: every host's cpu/memory/io load, flattened per fleet"""
+        return np.clip(self.host_loads(), 0.0, 1.5).reshape(self.n_envs, self.state_dim)
+
+    def _move_workloads(self, source, movers, demand):
+        """Move workloads hosted on server source to the least loaded other awake host
+
+        Only fleets flagged in movers move; returns the fleets where a target existed.
+        """
+        loads = self.host_loads(demand)[:, :, 0]
+        eligible = self.awake.copy()
+        eligible[:, source] = False
+        loads = np.where(eligible, loads, np.inf)
+        target = np.argmin(loads, axis=1)
+        movable = movers & np.isfinite(loads[np.arange(self.n_envs), target])
+        moving = movable[:, None] & (self.host == source)
+        self.host = np.where(moving, target[:, None], self.host)
+        return movable
+
+    def step(self, codes):
+        """
+        Apply one action code per server and advance one hour
+
+        Args:
+            codes: Integer array of shape (n_envs, n_servers)
+
+        Returns:
+            Tuple of (observations, rewards, done, info) where info holds
+            per-fleet 'energy_kwh' and 'sla_violation' arrays
+        """
+        codes = np.asarray(codes)
+        demand = self.demand()
+        was_awake = self.awake.copy()
+
+        # Activation: wake the server itself, or one hibernating server per active request
+        activate = codes == 1
+        self.awake |= activate
+        extra = (activate & was_awake).sum(axis=1)
+        asleep = ~self.awake
+        asleep_rank = np.cumsum(asleep, axis=1) - 1
+        self.awake |= asleep & (asleep_rank < extra[:, None])
+        woke = self.awake & ~was_awake
+        # Workload w lives on server w when at home
+        self.host = np.where(woke, np.arange(self.n_servers), self.host)
+
+        # Migration and hibernation, server by server so targets see earlier moves
+        for server in range(self.n_servers):
+            movers = np.isin(codes[:, server], (2, 3)) & self.awake[:, server]
+            if not movers.any():
+                continue
+            moved = self._move_workloads(server, movers, demand)
+            sleeping = moved & (codes[:, server] == 2)
+            self.awake[sleeping, server] = False
+
+        loads = self.host_loads(demand)
+        cpu = loads[:, :, 0]
+        power = np.where(self.awake, IDLE_POWER_KW + DYNAMIC_POWER_KW * np.minimum(cpu, 1.0), SLEEP_POWER_KW)
+        energy = power.sum(axis=1) + WAKE_ENERGY_KWH * woke.sum(axis=1)
+
+        overload = np.maximum(loads[:, :, :2] - 1.0, 0.0).sum(axis=(1, 2))
+        stranded = np.where(~self.awake, cpu, 0.0).sum(axis=1)
+        sla = overload + stranded
+        rewards = -(energy + self.sla_weight * sla)
+
+        self.t += 1
+        done = self.t >= self.episode_hours
+        observations = self.reset() if done else self.observe()
+        return observations, rewards, done, {'energy_kwh': energy, 'sla_violation': sla}
+
+def policy_codes(scores, observations, n_servers, rng):
+    """
+    Sample the policy's activate/migrate preference and map it to action codes
+
+    Args:
+        scores: (n_envs, 2 * n_servers) policy network outputs
+        observations: (n_envs, 3 * n_servers) host loads as fractions
+
+    Returns:
+        Tuple of (codes, choices, decisive): the action codes, the sampled
+        preference per server and where it changed the action (overloaded servers)
+    """
+    pairs = scores.reshape(len(scores), n_servers, 2)
+    p_activate = pairs[:, :, 0] / np.maximum(pairs.sum(axis=2), 1e-12)
+    choices = rng.random(p_activate.shape) < p_activate
+    loads = observations.reshape(len(observations), n_servers, 3) * 100
+    codes = rule_actions(loads[:, :, 0], loads[:, :, 1], loads[:, :, 2], choices)
+    decisive = (loads[:, :, 0] > 80) | (loads[:, :, 1] > 85)
+    return codes, choices, decisive
+
+def train_policy(traces, iterations=200, n_envs=1024, episode_hours=24, learning_rate=1e-3, gamma=0.99,
+                 saved_dir=None, promote=True, seed=0):
+    """
+    Train the allocation policy network with REINFORCE on the simulator
+
+    Each iteration plays one episode in every fleet, computes discounted
+    returns with a per-step mean baseline and takes one gradient step on the
+    log-probability of the sampled activate/migrate preferences.
+
+    Returns:
+        Dictionary of training metadata (version, simulated hours per second, mean reward)
+    """
+    import tensorflow as tf
+    from app.models.numpy_runtime import export_keras_model
+    from app.models.resource_allocation import build_policy_network
+    from app.models.artifacts import SAVED_DIR, artifact_dir, promote_version
+
+    saved_dir = saved_dir or SAVED_DIR
+    env = DatacenterEnv(traces, n_envs=n_envs, episode_hours=episode_hours, seed=seed)
+    model_path = os.path.join(artifact_dir('resource', saved_dir), 'resource_allocation_model.h5')
+    model = build_policy_network(env.state_dim, env.n_servers * 2)
+    if os.path.exists(model_path):
+        # Continue from the served policy
+        model.set_weights(tf.keras.models.load_model(model_path, compile=False).get_weights())
+    optimizer = tf.keras.optimizers.Adam(learning_rate)
+    rng = np.random.default_rng(seed)
+    discounts = gamma ** np.arange(episode_hours)
+
+    simulated_hours = 0
+    start = time.perf_counter()
+    history = []
+    for iteration in range(iterations):
+        observations = env.reset()
+        episode = {'observations': [], 'choices': [], 'decisive': [], 'rewards': []}
+        done = False
+        while not done:
+            scores = np.asarray(model(observations, training=False))
+            codes, choices, decisive = policy_codes(scores, observations, env.n_servers, rng)
+            episode['observations'].append(observations)
+            episode['choices'].append(choices)
+            episode['decisive'].append(decisive)
+            observations, rewards, done, _ = env.step(codes)
+            episode['rewards'].append(rewards)
+        simulated_hours += n_envs * episode_hours
+
+        # Discounted reward-to-go, baselined by the mean over fleets at each step
+        rewards = np.stack(episode['rewards'])
+        returns = np.flip(np.cumsum(np.flip(rewards * discounts[:, None], axis=0), axis=0), axis=0)
+        returns /= discounts[:, None]
+        advantages = (returns - returns.mean(axis=1, keepdims=True)) / (returns.std() + 1e-8)
+
+        states = np.concatenate(episode['observations'])
+        choices = np.concatenate(episode['choices'])
+        decisive = np.concatenate(episode['decisive']).astype(np.float32)
+        advantages = advantages.reshape(-1, 1).astype(np.float32)
+        with tf.GradientTape() as tape:
+            pairs = tf.reshape(model(states, training=True), (-1, env.n_servers, 2))
+            p_activate = pairs[:, :, 0] / tf.maximum(tf.reduce_sum(pairs, axis=2), 1e-12)
+            log_prob = tf.math.log(tf.where(choices, p_activate, 1.0 - p_activate) + 1e-8)
+            loss = -tf.reduce_mean(tf.reduce_sum(log_prob * decisive, axis=1, keepdims=True) * advantages)
+        gradients = tape.gradient(loss, model.trainable_variables)
+        optimizer.apply_gradients(zip(gradients, model.trainable_variables))
+
+        history.append(float(rewards.sum(axis=0).mean()))
+        if (iteration + 1) % max(1, iterations // 10) == 0:
+            rate = simulated_hours / (time.perf_counter() - start)
+            print(f"iteration {iteration + 1}/{iterations}: mean episode reward {history[-1]:.3f}, "
+                  f"{rate:,.0f} simulated hours/s")
+
+    elapsed = time.perf_counter() - start
+    version = time.strftime('%Y%m%d-%H%M%S', time.gmtime())
+    version_dir = os.path.join(saved_dir, 'resource', version)
+    os.makedirs(version_dir, exist_ok=True)
+    model.save(os.path.join(version_dir, 'resource_allocation_model.h5'))
+    export_keras_model(model, os.path.join(version_dir, 'resource_allocation_model.npz'))
+    metadata = {
+        'version': version,
+        'iterations': iterations,
+        'fleets': n_envs,
+        'episode_hours': episode_hours,
+        'simulated_hours': simulated_hours,
+        'simulated_hours_per_second': round(simulated_hours / elapsed, 1),
+        'first_reward': history[0],
+        'final_reward': history[-1]
+    }
+    with open(os.path.join(version_dir, 'metadata.json'), 'w') as f:
+        json.dump(metadata, f, indent=2)
+    if promote:
+        promote_version(version_dir)
+    print(f"Saved resource allocation policy version {version} to {version_dir}")
+    return metadata
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Train the resource allocation policy on the datacenter simulator")
+    parser.add_argument('--store', help="History store to replay (default: synthetic traces)")
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--fleets', type=int, default=1024)
+    parser.add_argument('--episode-hours', type=int, default=24)
+    parser.add_argument('--no-promote', action='store_true', help="Only write the versioned artifacts")
+    args = parser.parse_args()
+
+    demand = history_traces(args.store) if args.store else synthetic_traces(512, 24 * 28)
+    train_policy(demand, iterations=args.iterations, n_envs=args.fleets,
+                 episode_hours=args.episode_hours, promote=not args.no_promote)
@@ -0,0 +1,261 @@
+import argparse
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import joblib
+from sklearn.preprocessing import StandardScaler
+from app.history import HistoryStore
+from app.models.artifacts import SAVED_DIR, promote_version
+from app.telemetry import FEATURE_COLUMNS
+
+# TensorFlow is imported inside train_forecaster so the data helpers stay importable without it
+
+def load_series(store_root, server_id, start, end, step_seconds=3600):
+    """
+    One server's history resampled to step_seconds as a (n_steps, 7) feature series
+
+    Each step is the mean of the store slots it covers (NaN if it has none), and
+    the hour-of-day features are computed from the step start time.
+    """
+    # Read-only, so the pool's concurrent opens never write to the store
+    store = HistoryStore(store_root, read_only=True)
+    if step_seconds % store.resolution:
+        raise ValueError(f"step_seconds must be a multiple of the store resolution ({store.resolution} s)")
+    slots_per_step = step_seconds // store.resolution
+
+    times, values = store.read([server_id], start, end)
+    n_steps = len(times) // slots_per_step
+    values = values[0, :n_steps * slots_per_step].reshape(n_steps, slots_per_step, -1)
+
+    series = np.full((n_steps, len(FEATURE_COLUMNS)), np.nan, dtype=np.float32)
+    observed = ~np.isnan(values[:, :, 0])
+    counts = observed.sum(axis=1)
+    has_data = counts > 0
+    series[has_data, :5] = np.nansum(values[has_data], axis=1) / counts[has_data, None]
+
+    step_times = times[::slots_per_step][:n_steps]
+    hours = (step_times - step_times.astype('datetime64[D]')).astype(np.int64) / 3600.0
+    series[:, 5] = np.sin(hours * (2 * np.pi / 24))
+    series[:, 6] = np.cos(hours * (2 * np.pi / 24))
+    return series
+
+def load_fleet(store_root, server_ids, start, end, step_seconds=3600, processes=None):
+    """Resample every server in parallel worker processes, returns a (n_servers, n_steps, 7) array"""
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        series = list(pool.map(
+            load_series,
+            [store_root] * len(server_ids), server_ids,
+            [start] * len(server_ids), [end] * len(server_ids),
+            [step_seconds] * len(server_ids)
+        ))
+    return np.stack(series)
+
+def window_index(series, lookback, horizon=1):
+    """
+    (server, start step) pairs of every complete window in a fleet series
+
+    A window is usable when its lookback steps and the following horizon
+    target steps are all observed. Only these index pairs are materialized; the windows
+    themselves are gathered batch by batch.
+    """
+    complete = ~np.isnan(series).any(axis=2)
+    # Number of complete steps in each run of lookback + horizon steps
+    cumulative = np.concatenate([np.zeros((len(series), 1), dtype=np.int64), np.cumsum(complete, axis=1)], axis=1)
+    span = lookback + horizon
+    runs = cumulative[:, span:] - cumulative[:, :-span]
+    servers, starts = np.nonzero(runs == span)
+    return np.stack([servers, starts], axis=1).astype(np.int64)
+
+def make_dataset(series, index, lookback, batch_size, n_inputs=len(FEATURE_COLUMNS), horizon=None,
+                 shuffle=True, seed=0):
+    """
+    Streaming tf.data pipeline of (window, target) batches
+
+    series holds n_inputs model input channels followed by the target channels.
+    Targets are the next step, or with horizon set the next horizon steps as
+    (batch, horizon, n_targets).
+    It is kept once as a constant, and each batch gathers its windows by index
+    in a parallel map, so the (n_windows, lookback, n_inputs) tensor never
+    exists in memory.
+    """
+    import tensorflow as tf
+
+    n_steps = series.shape[1]
+    flat = tf.constant(series.reshape(-1, series.shape[2]))
+    offsets = tf.range(lookback, dtype=tf.int64)
+    target_offsets = lookback + tf.range(horizon or 1, dtype=tf.int64)
+
+    def gather(batch_index):
+        base = batch_index[:, 0] * n_steps + batch_index[:, 1]
+        windows = tf.gather(flat, base[:, None] + offsets[None, :])[:, :, :n_inputs]
+        targets = tf.gather(flat, base[:, None] + target_offsets[None, :])[:, :, n_inputs:]
+        return windows, targets[:, 0] if horizon is None else targets
+
+    dataset = tf.data.Dataset.from_tensor_slices(index)
+    if shuffle:
+        dataset = dataset.shuffle(min(len(index), 100_000), seed=seed, reshuffle_each_iteration=True)
+    return (
+        dataset
+        .batch(batch_size)
+        .map(gather, num_parallel_calls=tf.data.AUTOTUNE, deterministic=False)
+        .prefetch(tf.data.AUTOTUNE)
+    )
+
+def fit_scaler(series):
+    """Fit a StandardScaler on every observed step, one server at a time"""
+    scaler = StandardScaler()
+    for server_series in series:
+        observed = server_series[~np.isnan(server_series).any(axis=1)]
+        if len(observed):
+            scaler.partial_fit(observed)
+    return scaler
+
+def training_channels(series, scaler):
+    """Scaled input features followed by cpu/memory/io fractions of capacity as targets"""
+    scaled = scaler.transform(series.reshape(-1, series.shape[2])).astype(np.float32).reshape(series.shape)
+    targets = np.clip(series[:, :, :3] / 100.0, 0.0, 1.0)
+    return np.concatenate([scaled, targets], axis=2)
+
+def train_forecaster(store_root, server_ids=None, start=None, end=None, epochs=5, batch_size=256,
+                     step_seconds=3600, horizon=1, quantiles=None, mixed_precision=True, threads=None,
+                     processes=None, checkpoint_dir=None, saved_dir=SAVED_DIR, promote=True):
+    """
+    Train the TCN + Attention forecaster on the history store
+
+    Args:
+        store_root: HistoryStore directory
+        server_ids: Servers to train on (default: every stored server)
+        start, end: Training time range (default: the whole store)
+        epochs: Passes over the training windows
+        batch_size: Windows per gradient step
+        step_seconds: Seconds per model time step (the model looks back 24 steps)
+        horizon: Steps forecast by one forward pass
+        quantiles: Optional quantile levels, e.g. [0.1, 0.5, 0.9], trained with the pinball loss
+        mixed_precision: Compute in bfloat16 with float32 weights
+        threads: TensorFlow intra-op threads (default: all cores)
+        processes: Worker processes for loading and resampling history
+        checkpoint_dir: Resumable checkpoints (default: <saved_dir>/checkpoints/workload[-h<horizon>...])
+        saved_dir: Where versioned artifacts are written
+        promote: Point the served workload artifacts at the new version
+
+    Returns:
+        Dictionary of training metadata (version, windows, samples/s, loss)
+    """
+    import tensorflow as tf
+    from app.models.numpy_runtime import export_keras_model
+    from app.models.workload_forecasting import build_network
+
+    store = HistoryStore(store_root, read_only=True)
+    server_ids = store.servers() if server_ids is None else np.asarray(server_ids)
+    start = store.days()[0] if start is None else start
+    end = store.end_time() if end is None else end
+    lookback = 24
+    quantiles = sorted(quantiles) if quantiles else None
+
+    prepare_start = time.perf_counter()
+    series = load_fleet(store_root, server_ids, start, end, step_seconds, processes)
+    scaler = fit_scaler(series)
+    index = window_index(series, lookback, horizon)
+    if len(index) == 0:
+        raise ValueError("No complete training windows in the selected history")
+    channels = training_channels(series, scaler)
+    del series
+    print(f"Prepared {len(index):,} windows from {len(server_ids)} servers "
+          f"in {time.perf_counter() - prepare_start:.1f} s")
+
+    if threads:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.keras.mixed_precision.set_global_policy('mixed_bfloat16' if mixed_precision else 'float32')
+    model = build_network(lookback, len(FEATURE_COLUMNS), horizon, quantiles)
+    # The original single-step head trains on (batch, 3) targets
+    single_step = horizon == 1 and not quantiles
+    dataset = make_dataset(channels, index, lookback, batch_size, horizon=None if single_step else horizon)
+
+    # Resume from the latest checkpoint of an interrupted run with the same output head
+    head = '' if single_step else f'-h{horizon}' + ('-q' + '_'.join(f'{q:g}' for q in quantiles) if quantiles else '')
+    checkpoint_dir = checkpoint_dir or os.path.join(saved_dir, 'checkpoints', 'workload' + head)
+    epoch = tf.Variable(0, dtype=tf.int64)
+    checkpoint = tf.train.Checkpoint(model=model, optimizer=model.optimizer, epoch=epoch)
+    manager = tf.train.CheckpointManager(checkpoint, checkpoint_dir, max_to_keep=3)
+    if manager.latest_checkpoint:
+        checkpoint.restore(manager.latest_checkpoint)
+        print(f"Resuming from {manager.latest_checkpoint} (epoch {int(epoch.numpy())})")
+
+    samples_per_second = []
+    loss = None
+    while int(epoch.numpy()) < epochs:
+        epoch_start = time.perf_counter()
+        history = model.fit(dataset, epochs=int(epoch.numpy()) + 1, initial_epoch=int(epoch.numpy()), verbose=0)
+        samples_per_second.append(len(index) / (time.perf_counter() - epoch_start))
+        loss = float(history.history['loss'][-1])
+        epoch.assign_add(1)
+        manager.save(checkpoint_number=int(epoch.numpy()))
+        print(f"epoch {int(epoch.numpy())}/{epochs}: loss {loss:.5f}, {samples_per_second[-1]:,.0f} samples/s")
+
+    # Serve in float32: rebuild without the mixed policy and copy the trained weights
+    tf.keras.mixed_precision.set_global_policy('float32')
+    serving_model = build_network(lookback, len(FEATURE_COLUMNS), horizon, quantiles)
+    serving_model.set_weights(model.get_weights())
+
+    version = time.strftime('%Y%m%d-%H%M%S', time.gmtime())
+    version_dir = os.path.join(saved_dir, 'workload', version)
+    os.makedirs(version_dir, exist_ok=True)
+    serving_model.save(os.path.join(version_dir, 'workload_forecast_model.h5'))
+    export_keras_model(serving_model, os.path.join(version_dir, 'workload_forecast_model.npz'))
+    joblib.dump(scaler, os.path.join(version_dir, 'workload_scaler.pkl'))
+    with open(os.path.join(version_dir, 'workload_forecast_config.json'), 'w') as f:
+        json.dump({'horizon': horizon, 'quantiles': quantiles}, f)
+
+    metadata = {
+        'version': version,
+        'servers': int(len(server_ids)),
+        'start': str(np.datetime64(start, 's')),
+        'end': str(np.datetime64(end, 's')),
+        'step_seconds': step_seconds,
+        'horizon': horizon,
+        'quantiles': quantiles,
+        'windows': int(len(index)),
+        'epochs': epochs,
+        'batch_size': batch_size,
+        'mixed_precision': mixed_precision,
+        'loss': loss,
+        'samples_per_second': round(float(np.median(samples_per_second)), 1) if samples_per_second else None
+    }
+    with open(os.path.join(version_dir, 'metadata.json'), 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+    if promote:
+        promote_version(version_dir)
+
+    # Checkpoints only serve to resume this run; the next run starts fresh
+    shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    print(f"Saved workload model version {version} to {version_dir} "
+          f"({metadata['samples_per_second']} samples/s)")
+    return metadata
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Train the workload forecaster on the history store")
+    parser.add_argument('--store', default=os.path.join('app', 'data', 'history'))
+    parser.add_argument('--servers', type=int, nargs='+', help="Server ids to train on (default: all)")
+    parser.add_argument('--start', help="Start time, e.g. 2023-10-01")
+    parser.add_argument('--end', help="End time (exclusive)")
+    parser.add_argument('--epochs', type=int, default=5)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--step-seconds', type=int, default=3600)
+    parser.add_argument('--horizon', type=int, default=1, help="Steps forecast per forward pass")
+    parser.add_argument('--quantiles', type=float, nargs='+', help="Quantile levels, e.g. 0.1 0.5 0.9")
+    parser.add_argument('--threads', type=int, help="TensorFlow intra-op threads")
+    parser.add_argument('--processes', type=int, help="History loading processes")
+    parser.add_argument('--float32', action='store_true', help="Disable mixed precision")
+    parser.add_argument('--no-promote', action='store_true', help="Only write the versioned artifacts")
+    args = parser.parse_args()
+
+    train_forecaster(
+        args.store, server_ids=args.servers, start=args.start, end=args.end, epochs=args.epochs,
+        batch_size=args.batch_size, step_seconds=args.step_seconds, horizon=args.horizon,
+        quantiles=args.quantiles, mixed_precision=not args.float32,
+        threads=args.threads, processes=args.processes, promote=not args.no_promote
+    )
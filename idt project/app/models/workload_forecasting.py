@@ -1,90 +1,252 @@
 import numpy as np
 import pandas as pd
-import tensorflow as tf
-from tensorflow.keras.models import Sequential, Model
-from tensorflow.keras.layers import Dense, Conv1D, LayerNormalization, Dropout, Input, Attention, Concatenate
 import os
+import json
 import joblib
+from app.models.artifacts import artifact_dir
+from app.models.numpy_runtime import NumpyModel
+from app.metrics import timed_batch
+
+# TensorFlow is imported on first use so importing this module stays cheap
+
+def quantile_loss(quantiles):
+    """Pinball loss of (..., n_quantiles) predictions against (...) targets"""
+    import tensorflow as tf
+    levels = tf.constant(quantiles, dtype=tf.float32)
+    
+    def loss(y_true, y_pred):
+        error = tf.cast(y_true, tf.float32)[..., None] - tf.cast(y_pred, tf.float32)
+        return tf.reduce_mean(tf.maximum(levels * error, (levels - 1.0) * error), axis=-1)
+    
+    return loss
+
+def point_forecast(steps, quantiles=None):
+    """Median (or only) quantile of a (..., n_quantiles) predict_steps output"""
+    if quantiles and 0.5 in quantiles:
+        return steps[..., quantiles.index(0.5)]
+    return steps[..., steps.shape[-1] // 2]
+
+def horizon_label(hours):
+    """Human-readable forecast_horizon value, e.g. '1 hour' or '6 hours'"""
+    return f"{hours} hour" if hours == 1 else f"{hours} hours"
+
+def horizon_from_env(default=1):
+    """Hours forecast by untrained demo models, from FORECAST_HORIZON"""
+    value = os.environ.get('FORECAST_HORIZON')
+    return int(value) if value else default
+
+def build_network(lookback=24, n_features=7, horizon=1, quantiles=None):
+    """
+    Build the TCN + Attention network (untrained)
+    
+    The head predicts every step of the horizon in one forward pass. With
+    horizon=1 and no quantiles the output is (batch, 3), the original single-step
+    shape; otherwise it is (batch, horizon, 3), or (batch, horizon, 3,
+    n_quantiles) compiled with the pinball loss when quantiles are given.
+    """
+    import tensorflow as tf
+    from tensorflow.keras.models import Model
+    from tensorflow.keras.layers import Dense, Conv1D, LayerNormalization, Dropout, Input, Attention, Concatenate, Reshape
+    
+    # Input shape: [batch_size, lookback, features]
+    # Features: CPU%, RAM%, disk I/O, timestamp features
+    input_shape = (lookback, n_features)
+    
+    # TCN part
+    inputs = Input(shape=input_shape)
+    x = Conv1D(filters=64, kernel_size=3, padding='causal', dilation_rate=1, activation='relu')(inputs)
+    x = LayerNormalization()(x)
+    x = Dropout(0.2)(x)
+    
+    x = Conv1D(filters=64, kernel_size=3, padding='causal', dilation_rate=2, activation='relu')(x)
+    x = LayerNormalization()(x)
+    x = Dropout(0.2)(x)
+    
+    x = Conv1D(filters=64, kernel_size=3, padding='causal', dilation_rate=4, activation='relu')(x)
+    x = LayerNormalization()(x)
+    tcn_output = Dropout(0.2)(x)
+    
+    # Attention mechanism
+    attention_output = Attention()([tcn_output, tcn_output])
+    
+    # Combine TCN and attention outputs
+    combined = Concatenate()([tcn_output, attention_output])
+    
+    # Output layers - predict CPU%, RAM%, and I/O for the next time window
+    flattened = tf.keras.layers.Flatten()(combined)
+    dense1 = Dense(128, activation='relu')(flattened)
+    dense2 = Dense(64, activation='relu')(dense1)
+    if horizon == 1 and not quantiles:
+        outputs = Dense(3, activation='sigmoid', dtype='float32')(dense2)  # 3 outputs: CPU%, RAM%, I/O%
+    else:
+        # Direct multi-step head: every (hour, metric[, quantile]) output at once
+        shape = (horizon, 3, len(quantiles)) if quantiles else (horizon, 3)
+        outputs = Dense(int(np.prod(shape)), activation='sigmoid', dtype='float32')(dense2)
+        outputs = Reshape(shape, dtype='float32')(outputs)
+    
+    # Create model
+    model = Model(inputs=inputs, outputs=outputs)
+    loss = quantile_loss(quantiles) if quantiles else tf.keras.losses.MeanSquaredError()
+    model.compile(optimizer='adam', loss=loss, metrics=None if quantiles else ['mae'])
+    return model
 
 class WorkloadForecastingModel:
-    def __init__(self):
+    def __init__(self, batch_size=1024, runtime=None):
         """Initialize the Workload Forecasting Model with TCN + Attention architecture"""
         self.model = None
         self.lookback = 24  # Hours of historical data to consider
-        self.forecast_horizon = 1  # Hours to forecast
+        self.forecast_horizon = 1  # Hours forecast by one forward pass
+        self.quantiles = None  # Quantile levels of the output head, if any
+        self.n_features = 7  # CPU%, RAM%, disk I/O, timestamp features
+        self.batch_size = batch_size  # Maximum windows per forward pass
         self.scaler = None
+        # 'keras' or 'numpy' (exported .npz weights, no TensorFlow import)
+        self.runtime = runtime or os.environ.get('MODEL_RUNTIME', 'keras')
+        
+        # Check if model exists (the promoted training version, if any), otherwise build it
+        saved_dir = artifact_dir('workload')
+        model_path = os.path.join(saved_dir, 'workload_forecast_model.h5')
+        export_path = os.path.join(saved_dir, 'workload_forecast_model.npz')
+        scaler_path = os.path.join(saved_dir, 'workload_scaler.pkl')
+        config_path = os.path.join(saved_dir, 'workload_forecast_config.json')
         
-        # Check if model exists, otherwise build it
-        model_path = os.path.join('app', 'models', 'saved', 'workload_forecast_model.h5')
-        scaler_path = os.path.join('app', 'models', 'saved', 'workload_scaler.pkl')
+        if os.path.exists(config_path):
+            # Written by app.models.training for multi-horizon and quantile heads
+            with open(config_path) as f:
+                config = json.load(f)
+            self.forecast_horizon = config['horizon']
+            self.quantiles = config.get('quantiles')
         
-        if os.path.exists(model_path) and os.path.exists(scaler_path):
-            self.model = tf.keras.models.load_model(model_path)
+        if self.runtime == 'numpy' and os.path.exists(export_path) and os.path.exists(scaler_path):
+            self.model = NumpyModel.load(export_path)
+            self.scaler = joblib.load(scaler_path)
+        elif os.path.exists(model_path) and os.path.exists(scaler_path):
+            import tensorflow as tf
+            self.model = tf.keras.models.load_model(model_path, compile=False)
             self.scaler = joblib.load(scaler_path)
         else:
             # For demo purposes, we'll build a simple model
             # In production, you'd train on real data
+            self.forecast_horizon = horizon_from_env()
             self._build_model()
             
             # Create directory if it doesn't exist
-            os.makedirs(os.path.join('app', 'models', 'saved'), exist_ok=True)
+            os.makedirs(saved_dir, exist_ok=True)
             
-            # Save dummy model and scaler
+            # Save dummy model and scaler, with the horizon its head was built for
             self.model.save(model_path)
             joblib.dump(self.scaler, scaler_path)
+            with open(config_path, 'w') as f:
+                json.dump({'horizon': self.forecast_horizon, 'quantiles': self.quantiles}, f)
     
     def _build_model(self):
         """Build TCN + Attention model architecture"""
-        # Input shape: [batch_size, lookback, features]
-        # Features: CPU%, RAM%, disk I/O, timestamp features
-        input_shape = (self.lookback, 7)  # 7 features
+        self.model = build_network(self.lookback, self.n_features, self.forecast_horizon, self.quantiles)
+        
+        # Create a dummy scaler for demo purposes
+        self.scaler = "dummy_scaler"
+    
+    def _scale_windows(self, windows):
+        """Apply the fitted feature scaler to a (n, lookback, features) array"""
+        if not hasattr(self.scaler, 'transform'):
+            # Demo models ship without a fitted scaler
+            return windows
+        flat = windows.reshape(-1, self.n_features)
+        return self.scaler.transform(flat).astype(np.float32).reshape(windows.shape)
+    
+    @timed_batch('workload')
+    def predict_steps(self, windows, batch_size=None):
+        """
+        Forecast every hour of the horizon for many servers with batched model calls
         
-        # TCN part
-        inputs = Input(shape=input_shape)
-        x = Conv1D(filters=64, kernel_size=3, padding='causal', dilation_rate=1, activation='relu')(inputs)
-        x = LayerNormalization()(x)
-        x = Dropout(0.2)(x)
+        Args:
+            windows: Array of shape (n_servers, lookback, 7) with historical features
+            batch_size: Maximum windows per forward pass (defaults to self.batch_size)
         
-        x = Conv1D(filters=64, kernel_size=3, padding='causal', dilation_rate=2, activation='relu')(x)
-        x = LayerNormalization()(x)
-        x = Dropout(0.2)(x)
+        Returns:
+            Float32 array of shape (n_servers, forecast_horizon, 3, n_quantiles)
+            with cpu/memory/io percentages; n_quantiles is 1 for point forecasts
+        """
+        windows = np.asarray(windows, dtype=np.float32)
+        if windows.ndim != 3 or windows.shape[1:] != (self.lookback, self.n_features):
+            raise ValueError(
+                f"Expected windows of shape (n_servers, {self.lookback}, {self.n_features}), "
+                f"got {windows.shape}"
+            )
         
-        x = Conv1D(filters=64, kernel_size=3, padding='causal', dilation_rate=4, activation='relu')(x)
-        x = LayerNormalization()(x)
-        tcn_output = Dropout(0.2)(x)
+        n_servers = windows.shape[0]
+        n_quantiles = len(self.quantiles) if self.quantiles else 1
+        batch_size = batch_size or self.batch_size
+        inputs = self._scale_windows(windows)
+        outputs = np.empty((n_servers, self.forecast_horizon, 3, n_quantiles), dtype=np.float32)
         
-        # Attention mechanism
-        attention_output = Attention()([tcn_output, tcn_output])
+        # One forward pass per chunk instead of one per server (or per hour)
+        for start in range(0, n_servers, batch_size):
+            stop = min(start + batch_size, n_servers)
+            chunk = np.asarray(self.model(inputs[start:stop], training=False))
+            outputs[start:stop] = chunk.reshape(stop - start, self.forecast_horizon, 3, n_quantiles)
         
-        # Combine TCN and attention outputs
-        combined = Concatenate()([tcn_output, attention_output])
+        if n_quantiles > 1:
+            # Independent sigmoid outputs can cross; keep quantiles ordered
+            outputs.sort(axis=3)
         
-        # Output layers - predict CPU%, RAM%, and I/O for the next time window
-        flattened = tf.keras.layers.Flatten()(combined)
-        dense1 = Dense(128, activation='relu')(flattened)
-        dense2 = Dense(64, activation='relu')(dense1)
-        outputs = Dense(3, activation='sigmoid')(dense2)  # 3 outputs: CPU%, RAM%, I/O%
+        # Sigmoid outputs are fractions of capacity, report percentages
+        outputs *= 100.0
+        return outputs
+    
+    def predict_batch(self, windows, server_ids=None, batch_size=None):
+        """
+        Predict next-hour workload for many servers with batched model calls
         
-        # Create model
-        self.model = Model(inputs=inputs, outputs=outputs)
-        self.model.compile(optimizer='adam', loss=tf.keras.losses.MeanSquaredError(), metrics=['mae'])
+        Args:
+            windows: Array of shape (n_servers, lookback, 7) with historical features
+            server_ids: Optional server ids, one per window (defaults to 1..n_servers)
+            batch_size: Maximum windows per forward pass (defaults to self.batch_size)
         
-        # Create a dummy scaler for demo purposes
-        self.scaler = "dummy_scaler"
+        Returns:
+            Dictionary of NumPy arrays keyed by 'server_id', 'cpu_forecast',
+            'memory_forecast' and 'io_forecast', one entry per server
+        """
+        n_servers = len(windows)
+        if server_ids is None:
+            server_ids = np.arange(1, n_servers + 1)
+        else:
+            server_ids = np.asarray(server_ids)
+            if server_ids.shape != (n_servers,):
+                raise ValueError(f"Expected {n_servers} server ids, got {server_ids.shape[0]}")
+        
+        outputs = point_forecast(self.predict_steps(windows, batch_size), self.quantiles)[:, 0]
+        
+        return {
+            'server_id': server_ids,
+            'cpu_forecast': outputs[:, 0],
+            'memory_forecast': outputs[:, 1],
+            'io_forecast': outputs[:, 2]
+        }
     
     def predict(self, historical_data=None):
         """
         Predict workload for the next time window
         
         Args:
-            historical_data: Optional historical workload data
-                             If None, uses mock data for demo
+            historical_data: Optional historical workload data, either an array of
+                             shape (n_servers, lookback, 7) or an object exposing
+                             windows() such as app.telemetry.TelemetryBuffer.
+                             If None or empty, uses mock data for demo
         
         Returns:
             Dictionary with forecasted workload values
         """
-        # In a real system, we'd use actual historical data
-        # For demo, we'll return mock predictions
+        if historical_data is not None:
+            if hasattr(historical_data, 'windows'):
+                server_ids, windows = historical_data.windows()
+            else:
+                server_ids, windows = None, historical_data
+            
+            if len(windows):
+                return self._forecasts_from_batch(self.predict_batch(windows, server_ids))
+        
+        # Without history, return mock predictions for demo
         
         # Generate some realistic forecasts
         servers = [1, 2, 3, 4]
@@ -101,9 +263,9 @@ class WorkloadForecastingModel:
             memory = max(10, min(90, base_memory))
             io = max(5, min(85, base_io))
             
-            # Create forecast data points for the next 6 hours
+            # Create forecast data points for every hour of the model horizon
             server_forecasts = []
-            for hour in range(1, 7):
+            for hour in range(1, self.forecast_horizon + 1):
                 # Add some time-based variation
                 time_factor = np.sin(hour / 6 * np.pi) * 10
                 
@@ -121,5 +283,33 @@ class WorkloadForecastingModel:
         return {
             'forecasts': forecasts,
             'timestamp': pd.Timestamp.now().isoformat(),
-            'forecast_horizon': '6 hours'
-        } 
\ No newline at end of file
+            'forecast_horizon': horizon_label(self.forecast_horizon)
+        }
+    
+    def _forecasts_from_batch(self, batch):
+        """Convert columnar predict_batch output to the per-point forecast format"""
+        rounded = {
+            key: np.round(batch[key].astype(np.float64), 1).tolist()
+            for key in ('cpu_forecast', 'memory_forecast', 'io_forecast')
+        }
+        forecasts = [
+            {
+                'server_id': server_id,
+                'time_offset': 1,
+                'cpu_forecast': cpu,
+                'memory_forecast': memory,
+                'io_forecast': io
+            }
+            for server_id, cpu, memory, io in zip(
+                batch['server_id'].tolist(),
+                rounded['cpu_forecast'],
+                rounded['memory_forecast'],
+                rounded['io_forecast']
+            )
+        ]
+        
+        return {
+            'forecasts': forecasts,
+            'timestamp': pd.Timestamp.now().isoformat(),
+            'forecast_horizon': horizon_label(1)
+        }
\ No newline at end of file
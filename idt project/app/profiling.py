@@ -0,0 +1,138 @@
+import cProfile
+import os
+import re
+import sys
+import threading
+import time
+
+def fold_stack(frame):
+    """A frame's call stack in the folded format read by flamegraph tools (outermost first)"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+class StackSampler:
+    """One background thread sampling the stacks of registered threads
+
+    Threads register while they handle a request; every interval the sampler
+    reads sys._current_frames() once and counts the folded stack of each
+    registered thread. The sampler thread starts on first use and sleeps while
+    nothing is registered, so an idle process pays nothing.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._active = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, thread_id):
+        """Start counting stacks of a thread"""
+        self._active[thread_id] = {}
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+                    self._thread.start()
+
+    def remove(self, thread_id):
+        """Stop counting a thread and return its {folded stack: samples}"""
+        return self._active.pop(thread_id, {})
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            if not self._active:
+                continue
+            frames = sys._current_frames()
+            for thread_id, stacks in list(self._active.items()):
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    stack = fold_stack(frame)
+                    stacks[stack] = stacks.get(stack, 0) + 1
+
+class RequestProfiler:
+    """
+    Profile every request and keep the profiles of slow ones
+
+    In 'sample' mode a StackSampler records the handling thread's stacks and
+    slow requests are written as .folded files (one "stack count" line per
+    stack), ready for flamegraph.pl or speedscope. In 'cprofile' mode each
+    request runs under cProfile and slow requests are written as .prof files
+    for pstats or snakeviz; cProfile is exact but slows every request down.
+    """
+
+    def __init__(self, slow_ms, directory='profiles', mode='sample', interval_ms=5):
+        if mode not in ('sample', 'cprofile'):
+            raise ValueError(f"Unknown profiling mode {mode!r}, expected 'sample' or 'cprofile'")
+        self.slow_seconds = slow_ms / 1000
+        self.directory = directory
+        self.mode = mode
+        self.sampler = StackSampler(interval_ms / 1000) if mode == 'sample' else None
+        self.dumped = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self):
+        """Begin profiling the current request; returns a token for finish()"""
+        if self.sampler is not None:
+            thread_id = threading.get_ident()
+            self.sampler.add(thread_id)
+            return thread_id
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def finish(self, token, name, elapsed):
+        """
+        Stop profiling and write the profile if the request was slow
+
+        Args:
+            token: Value returned by start()
+            name: Request description used in the file name, e.g. 'GET /api/control/cycle'
+            elapsed: Request duration in seconds
+
+        Returns:
+            Path of the written profile, or None for fast requests
+        """
+        if self.sampler is not None:
+            stacks = self.sampler.remove(token)
+        else:
+            token.disable()
+        if elapsed < self.slow_seconds:
+            return None
+
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', name).strip('_')
+        path = os.path.join(
+            self.directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{elapsed * 1000:.0f}ms-{os.getpid()}-{self.dumped}"
+        )
+        self.dumped += 1
+        if self.sampler is not None:
+            path += '.folded'
+            with open(path, 'w') as f:
+                f.writelines(f'{stack} {count}\n' for stack, count in stacks.items())
+        else:
+            path += '.prof'
+            token.dump_stats(path)
+        return path
+
+def profiler_from_env():
+    """
+    Build the request profiler from environment variables, or None when disabled
+
+    PROFILE_SLOW_MS: Keep profiles of requests slower than this (unset disables profiling)
+    PROFILE_MODE: 'sample' (default) or 'cprofile'
+    PROFILE_DIR: Output directory (default 'profiles')
+    PROFILE_INTERVAL_MS: Sampling interval in 'sample' mode (default 5)
+    """
+    slow_ms = os.environ.get('PROFILE_SLOW_MS')
+    if not slow_ms:
+        return None
+    return RequestProfiler(
+        float(slow_ms),
+        directory=os.environ.get('PROFILE_DIR', 'profiles'),
+        mode=os.environ.get('PROFILE_MODE', 'sample'),
+        interval_ms=float(os.environ.get('PROFILE_INTERVAL_MS', 5))
+    )
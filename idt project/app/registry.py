@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+import uuid
+
+def current_rss_bytes():
+    """Resident set size of this process in bytes (0 if unavailable)"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        import resource
+        # ru_maxrss is the peak RSS, reported in kilobytes on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+    except (ImportError, AttributeError):
+        return 0
+
+class ModelRegistry:
+    """Loads model artifacts once, on first use or on an explicit warmup
+
+    Each model is registered with a factory and an optional fallback factory used
+    when loading fails (e.g. TensorFlow is unavailable). Loading is thread-safe and
+    records wall time and resident memory growth per model. Calling warmup() in the
+    gunicorn master with preload_app enabled loads every artifact before workers
+    fork, so weights are shared copy-on-write instead of loaded once per worker.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._models = {}
+        self._generations = {}
+        self._tokens = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, factory, fallback=None):
+        """
+        Register a model factory under a name
+
+        Args:
+            name: Registry key, e.g. 'workload'
+            factory: Callable returning the model instance
+            fallback: Optional callable returning a replacement if factory raises
+        """
+        self._factories[name] = (factory, fallback)
+        self._stats[name] = {'loaded': False, 'fallback': False, 'load_seconds': None, 'rss_delta_mb': None}
+
+    def get(self, name):
+        """Return the model registered under name, loading it on first use"""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            # Another thread may have finished loading while we waited
+            if name not in self._models:
+                self._models[name] = self._load(name)
+                self._generations[name] = self._generations.get(name, 0) + 1
+                self._tokens[name] = uuid.uuid4().hex
+            return self._models[name]
+
+    def replace(self, name, model):
+        """
+        Atomically swap in a new instance for a registered model
+
+        Requests already holding the old instance finish with it; every later
+        get() returns the new one, and version() changes so cached results of
+        the old instance are no longer used.
+        """
+        with self._lock:
+            self._models[name] = model
+            self._generations[name] = self._generations.get(name, 0) + 1
+            self._tokens[name] = uuid.uuid4().hex
+
+    def _load(self, name):
+        """Build the model, falling back if the factory fails, and record its cost"""
+        factory, fallback = self._factories[name]
+        rss_before = current_rss_bytes()
+        start = time.perf_counter()
+        used_fallback = False
+
+        try:
+            model = factory()
+        except Exception as e:
+            if fallback is None:
+                raise
+            print(f"Error initializing {name} model: {e}")
+            model = fallback()
+            used_fallback = True
+
+        load_seconds = time.perf_counter() - start
+        rss_delta_mb = (current_rss_bytes() - rss_before) / (1024 * 1024)
+        self._stats[name] = {
+            'loaded': True,
+            'fallback': used_fallback,
+            'load_seconds': round(load_seconds, 3),
+            'rss_delta_mb': round(rss_delta_mb, 1)
+        }
+        print(f"Loaded {name} model in {load_seconds:.2f} s (+{rss_delta_mb:.1f} MB RSS)")
+        return model
+
+    def warmup(self, names=None):
+        """Load the given models (default: all registered) ahead of the first request"""
+        for name in names or list(self._factories):
+            self.get(name)
+
+    def version(self, name):
+        """
+        Version string for cache keys; changes whenever the model instance changes
+
+        Besides the generation it holds a token drawn when the instance was
+        loaded or swapped in, so instances of different processes (e.g. workers
+        that each applied their own online updates) never share cache entries,
+        while workers forked after a preload share the same instance and token.
+        """
+        generation = self._generations.get(name, 0)
+        return f"{name}:{generation}:{self._tokens[name]}" if generation else f"{name}:0"
+
+    def is_loaded(self, name):
+        """Whether the named model has been loaded"""
+        return name in self._models
+
+    def stats(self):
+        """Per-model load status, load time and resident memory growth, plus process RSS"""
+        return {
+            'models': {name: dict(stats) for name, stats in self._stats.items()},
+            'process_rss_mb': round(current_rss_bytes() / (1024 * 1024), 1),
+            'pid': os.getpid()
+        }
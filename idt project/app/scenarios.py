@@ -0,0 +1,253 @@
+import atexit
+import itertools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from app.models.resource_allocation import ResourceAllocationModel, next_hour_columns
+from app.models.simulator import IDLE_POWER_KW
+from app.ledger import server_power
+
+# Largest number of scenarios one grid may expand to
+MAX_SCENARIOS = 100000
+
+# Perturbations a grid may vary
+GRID_KEYS = ('load_scale', 'servers', 'humidity', 'temperature_offset')
+
+def _values(grid, key, default):
+    """One grid axis as a list; a single value is an axis of one"""
+    values = grid.get(key, default)
+    if isinstance(values, np.ndarray):
+        values = values.tolist()
+    if not isinstance(values, list):
+        values = [values]
+    if not values:
+        raise ValueError(f"'{key}' must list at least one value")
+    return values
+
+def _numbers(grid, key, default):
+    """One numeric grid axis as a list of finite floats"""
+    try:
+        values = [float(value) for value in _values(grid, key, default)]
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"'{key}' values must be numbers") from None
+    if not np.all(np.isfinite(values)):
+        raise ValueError(f"'{key}' values must be finite")
+    return values
+
+def _server_range(selection, fleet):
+    """(first, last) server ids of one 'servers' entry; null selects the whole fleet"""
+    if selection is None:
+        return fleet
+    try:
+        if not isinstance(selection, (list, tuple)) or len(selection) != 2:
+            raise ValueError
+        first, last = int(selection[0]), int(selection[1])
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError("Server ranges must be [first, last] with first <= last, or null") from None
+    limits = np.iinfo(np.int64)
+    if first > last or first < limits.min or last > limits.max:
+        raise ValueError("Server ranges must be [first, last] with first <= last, or null")
+    return first, last
+
+def scenario_grid(grid, server_ids, humidity=45):
+    """
+    Expand a grid of perturbations into one scenario per combination
+
+    Args:
+        grid: Lists of values per perturbation, all optional:
+              'load_scale': load multipliers (default [1.0])
+              'servers': [first, last] server id ranges the multiplier applies to,
+                         null for the whole fleet (default [null])
+              'humidity': ambient humidity percentages (default [humidity])
+              'temperature_offset': °C added to every server temperature (default [0])
+        server_ids: Ids of the fleet, to resolve whole-fleet ranges
+        humidity: Ambient humidity of scenarios that do not vary it
+
+    Returns:
+        Dictionary of scenario columns 'load_scale', 'first_server',
+        'last_server', 'humidity' and 'temperature_offset'
+    """
+    if not isinstance(grid, dict):
+        raise ValueError("Post the grid as an object of value lists")
+    unknown = set(grid) - set(GRID_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown grid keys {sorted(unknown)}; expected {list(GRID_KEYS)}")
+
+    server_ids = np.asarray(server_ids, dtype=np.int64)
+    fleet = (int(server_ids.min()), int(server_ids.max())) if len(server_ids) else (0, 0)
+    ranges = [_server_range(selection, fleet) for selection in _values(grid, 'servers', [None])]
+    scales = _numbers(grid, 'load_scale', [1.0])
+    if min(scales) < 0:
+        raise ValueError("load_scale must not be negative")
+    axes = [scales, ranges, _numbers(grid, 'humidity', [humidity]), _numbers(grid, 'temperature_offset', [0.0])]
+    n_scenarios = int(np.prod([len(axis) for axis in axes]))
+    if n_scenarios > MAX_SCENARIOS:
+        raise ValueError(f"The grid expands to {n_scenarios} scenarios; at most {MAX_SCENARIOS} are allowed")
+
+    scale, selection, humidity, offset = zip(*itertools.product(*axes))
+    first, last = np.array(selection, dtype=np.int64).T
+    return {
+        'load_scale': np.array(scale),
+        'first_server': first,
+        'last_server': last,
+        'humidity': np.array(humidity),
+        'temperature_offset': np.array(offset)
+    }
+
+def fleet_baseline(forecast, status):
+    """
+    What the scenarios perturb: the next-hour forecast and current readings
+
+    Args:
+        forecast: Forecast columns (see next_hour_columns)
+        status: fleet_status columns
+
+    Returns:
+        Dictionary of NumPy arrays
+    """
+    server_ids, cpu, memory, io = next_hour_columns(forecast)
+    return {
+        'server_id': np.asarray(server_ids, dtype=np.int64),
+        'cpu': np.asarray(cpu, dtype=np.float64),
+        'memory': np.asarray(memory, dtype=np.float64),
+        'io': np.asarray(io, dtype=np.float64),
+        'status_id': np.asarray(status['id'], dtype=np.int64),
+        'temperature': np.asarray(status['temperature'], dtype=np.float64),
+        'status_cpu': np.asarray(status['cpu'], dtype=np.float64),
+        'status_memory': np.asarray(status['memory'], dtype=np.float64)
+    }
+
+def _load_scale(server_ids, scenarios):
+    """(n_scenarios, n_servers) multiplier of every server in every scenario"""
+    selected = ((server_ids >= scenarios['first_server'][:, None]) &
+                (server_ids <= scenarios['last_server'][:, None]))
+    return np.where(selected, scenarios['load_scale'][:, None], 1.0)
+
+def simulate(resource, cooling, baseline, scenarios):
+    """
+    Allocation and cooling outcome of every scenario in one vectorized pass
+
+    Scaled forecasts (capped at 100 %) go through resource.decide_grid; the
+    scaled current readings and offset temperatures go through the cooling
+    rules as in optimize_arrays, one fuzzy evaluation per scenario. IT power
+    is the ledger's estimate (server_power), plus one more idle server per
+    activation.
+
+    Args:
+        resource, cooling: Models from the registry
+        baseline: fleet_baseline result
+        scenarios: scenario_grid columns
+
+    Returns:
+        Dictionary of outcome columns, one entry per scenario
+    """
+    scale = _load_scale(baseline['server_id'], scenarios)
+    cpu = np.minimum(baseline['cpu'] * scale, 100)
+    decisions = resource.decide_grid(cpu, np.minimum(baseline['memory'] * scale, 100),
+                                     np.minimum(baseline['io'] * scale, 100))
+    codes = decisions['action']
+    counts = {f'{action}_servers': (codes == code).sum(axis=1)
+              for code, action in enumerate(ResourceAllocationModel.ACTIONS)}
+    it_power = server_power(cpu, codes).sum(axis=1) + IDLE_POWER_KW * counts['activate_servers']
+
+    scale = _load_scale(baseline['status_id'], scenarios)
+    if len(baseline['status_id']):
+        heat = (np.minimum(baseline['status_cpu'] * scale, 100) * 0.7 +
+                np.minimum(baseline['status_memory'] * scale, 100) * 0.3)
+        avg_heat = heat.mean(axis=1)
+        avg_temp = baseline['temperature'].mean() + scenarios['temperature_offset']
+    else:
+        avg_heat = np.full(len(scale), 50.0)
+        avg_temp = 25 + scenarios['temperature_offset']
+    levels, numeric = cooling.apply_rules_batch(avg_temp, scenarios['humidity'], avg_heat)
+
+    return dict(
+        scenarios,
+        **counts,
+        it_power_kw=np.round(it_power, 2),
+        expected_energy_savings=np.round(decisions['expected_energy_savings'].sum(axis=1), 2),
+        cooling_level=np.asarray(levels),
+        fan_speed_percent=np.asarray(numeric).astype(np.int64),
+        ac_temperature_setpoint=np.round(24 - (np.asarray(numeric) - 50) / 10, 1),
+        expected_power_savings=np.round((100 - np.asarray(numeric)) * 0.05, 2)
+    )
+
+# Models of a pool worker process, loaded by _init_worker
+_worker_models = None
+
+def _init_worker():
+    from app.registry import ModelRegistry
+    from app.models.cooling_optimization import CoolingOptimizationModel
+    from app.models.dummy_models import DummyResourceModel, DummyCoolingModel
+
+    global _worker_models
+    registry = ModelRegistry()
+    registry.register('resource', ResourceAllocationModel, DummyResourceModel)
+    registry.register('cooling', CoolingOptimizationModel, DummyCoolingModel)
+    _worker_models = (registry.get('resource'), registry.get('cooling'))
+
+def _simulate_in_worker(baseline, scenarios):
+    return simulate(*_worker_models, baseline, scenarios)
+
+class ScenarioRunner:
+    """
+    Runs scenario grids in chunks, in-process or on a pool of worker processes
+
+    A chunk holds as many scenarios as fit in chunk_rows server evaluations,
+    which bounds memory for large fleets. With workers, chunks are spread
+    over processes that load their own resource and cooling models; the pool
+    starts on first use in the process that uses it.
+    """
+
+    def __init__(self, registry, workers=0, chunk_rows=1000000, start_method='spawn'):
+        self.registry = registry
+        self.workers = workers
+        self.chunk_rows = chunk_rows
+        self.start_method = start_method
+        self._pool = None
+        self._owner = None
+
+    def _executor(self):
+        if self._owner != os.getpid():
+            self._pool = ProcessPoolExecutor(self.workers, multiprocessing.get_context(self.start_method),
+                                             initializer=_init_worker)
+            self._owner = os.getpid()
+            atexit.register(self.close)
+        return self._pool
+
+    def run(self, baseline, scenarios):
+        """
+        Outcome columns of every scenario (see simulate)
+
+        Args:
+            baseline: fleet_baseline result
+            scenarios: scenario_grid columns
+        """
+        step = max(1, self.chunk_rows // max(len(baseline['server_id']), len(baseline['status_id']), 1))
+        n_scenarios = len(scenarios['load_scale'])
+        chunks = [{key: column[start:start + step] for key, column in scenarios.items()}
+                  for start in range(0, n_scenarios, step)]
+        if self.workers > 1 and len(chunks) > 1:
+            results = list(self._executor().map(_simulate_in_worker, itertools.repeat(baseline), chunks))
+        else:
+            resource, cooling = self.registry.get('resource'), self.registry.get('cooling')
+            results = [simulate(resource, cooling, baseline, chunk) for chunk in chunks]
+        return {key: np.concatenate([result[key] for result in results]) for key in results[0]}
+
+    def close(self):
+        """Shut down the worker pool"""
+        if self._pool is not None and self._owner == os.getpid():
+            self._pool.shutdown(cancel_futures=True)
+        self._pool = None
+        self._owner = None
+
+def scenario_runner_from_env(registry):
+    """
+    ScenarioRunner configured from the environment
+
+    SCENARIO_WORKERS: Worker processes for grids of more than one chunk (default 0, in-process)
+    SCENARIO_CHUNK_ROWS: Server evaluations per chunk (default 1000000)
+    """
+    return ScenarioRunner(registry, int(os.environ.get('SCENARIO_WORKERS', 0)),
+                          int(os.environ.get('SCENARIO_CHUNK_ROWS', 1000000)))
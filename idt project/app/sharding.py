@@ -0,0 +1,382 @@
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+import numpy as np
+from app.anomaly import RUNAWAY
+from app.control import ControlLoop, forecast_batch
+from app.models.resource_allocation import ResourceAllocationModel
+
+# Numeric result columns a shard writes back for every server, in order
+RESULT_COLUMNS = ['cpu_forecast', 'memory_forecast', 'io_forecast', 'action',
+                  'expected_cpu_savings', 'expected_energy_savings', 'confidence']
+
+# The 'action' result column holds indices into this array
+ACTIONS = ResourceAllocationModel.ACTIONS
+
+# Models a shard serves; the coordinator sends its own instance after a hot swap
+SHARD_MODELS = ('workload', 'resource')
+
+# Thread pools sized by these variables are limited in shard processes, so
+# shards do not oversubscribe the cores they are meant to spread across
+THREAD_VARIABLES = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS')
+
+def shard_of(server_ids, n_shards):
+    """Shard index of each server id (Fibonacci hashing, stable across processes)"""
+    hashed = np.asarray(server_ids, dtype=np.int64).astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    return ((hashed >> np.uint64(32)) % np.uint64(n_shards)).astype(np.intp)
+
+def _shard_arrays(buffer, capacity, lookback, n_features):
+    """Views of a shard's shared block: ids, windows, results and anomaly flags"""
+    ids = np.ndarray((capacity,), dtype=np.int64, buffer=buffer)
+    offset = ids.nbytes
+    windows = np.ndarray((capacity, lookback, n_features), dtype=np.float32, buffer=buffer, offset=offset)
+    offset += windows.nbytes
+    results = np.ndarray((capacity, len(RESULT_COLUMNS)), dtype=np.float64, buffer=buffer, offset=offset)
+    offset += results.nbytes
+    flags = np.ndarray((capacity,), dtype=np.uint8, buffer=buffer, offset=offset)
+    return ids, windows, results, flags
+
+class ShardError(RuntimeError):
+    """A control cycle failed on one or more shards; the cycle has no result"""
+
+def _shard_main(connection, block_name, capacity, lookback, n_features):
+    """
+    Shard worker: load the models, then answer one request per control cycle
+
+    The coordinator writes ids, windows and anomaly flags into the shared
+    block and sends the row count, plus any models replaced since the shard
+    last ran; the worker writes RESULT_COLUMNS rows back into the same block
+    and replies with its compute time, or with the error if the cycle failed,
+    so exactly one small reply answers every request.
+    """
+    from app.registry import ModelRegistry
+    from app.models.workload_forecasting import WorkloadForecastingModel
+    from app.models.dummy_models import DummyWorkloadModel, DummyResourceModel
+
+    registry = ModelRegistry()
+    registry.register('workload', WorkloadForecastingModel, DummyWorkloadModel)
+    registry.register('resource', ResourceAllocationModel, DummyResourceModel)
+    registry.warmup()
+    workload, resource = registry.get('workload'), registry.get('resource')
+
+    block = shared_memory.SharedMemory(name=block_name)
+    ids, windows, results, flags = _shard_arrays(block.buf, capacity, lookback, n_features)
+    connection.send({'pid': os.getpid(), 'models': {name: type(registry.get(name)).__name__
+                                                     for name in ('workload', 'resource')}})
+    try:
+        while True:
+            request = connection.recv()
+            if request is None:
+                break
+            try:
+                n_rows, models = request
+                if models:
+                    workload = models.get('workload', workload)
+                    resource = models.get('resource', resource)
+                start = time.perf_counter()
+                forecast = forecast_batch(workload, ids[:n_rows], windows[:n_rows])
+                allocation = resource.decide_batch(
+                    ids[:n_rows], forecast['cpu_forecast'], forecast['memory_forecast'], forecast['io_forecast'],
+                    overheating=(flags[:n_rows] & RUNAWAY) > 0, suspect=flags[:n_rows] > 0
+                )
+                codes = np.zeros(n_rows)
+                for code, action in enumerate(ACTIONS):
+                    codes[np.asarray(allocation['action']) == action] = code
+                columns = [forecast['cpu_forecast'], forecast['memory_forecast'], forecast['io_forecast'], codes,
+                           allocation['expected_cpu_savings'], allocation['expected_energy_savings'],
+                           allocation['confidence']]
+                for i, column in enumerate(columns):
+                    results[:n_rows, i] = column
+            except Exception as e:
+                connection.send({'error': f"{type(e).__name__}: {e}"})
+            else:
+                connection.send({'seconds': time.perf_counter() - start})
+    finally:
+        del ids, windows, results, flags
+        block.close()
+
+class ShardedControlLoop(ControlLoop):
+    """
+    Control loop that runs forecast + allocation in worker processes
+
+    Servers are partitioned into shards by a hash of their id. Each shard is a
+    process with its own copy of the models and one shared-memory block: every
+    cycle the coordinator gathers the shard's windows straight into the block,
+    the shard writes its results next to them, and the coordinator scatters the
+    results back into fleet order. Migration targets are then chosen fleet-wide
+    (the least loaded server kept running and not flagged by the anomaly
+    detector), and cooling runs in the coordinator on the whole fleet, as in
+    ControlLoop.
+
+    A shard whose servers are all overloaded cannot see targets elsewhere and
+    activates instead of migrating, as decide_batch does for a fleet without
+    a spare server. The policy network scores servers in groups, so confidence
+    (and the activate/hibernate preference of borderline servers) can differ
+    from ControlLoop, as it does for any reordering of the telemetry buffer.
+
+    Shards start on first use in the process that uses them, so each forked
+    gunicorn worker gets its own set. A shard that exits, breaks its pipe or
+    does not reply within reply_timeout seconds fails the cycle with
+    ShardError and is restarted at the next cycle; a shard that raises keeps
+    running and reports the error. Models replaced in the coordinator's
+    registry (e.g. by online updates) are sent to every shard with its next
+    request, so shards serve the same versions as the coordinator.
+    """
+
+    def __init__(self, registry, telemetry, n_shards, start_method='spawn', shard_threads=1, ledger=None,
+                 detector=None, reply_timeout=60.0):
+        super().__init__(registry, telemetry, ledger, detector)
+        self.n_shards = n_shards
+        self.start_method = start_method
+        self.shard_threads = shard_threads
+        self.reply_timeout = reply_timeout
+        self.capacity = telemetry.capacity
+        self.lookback = telemetry.lookback
+        self.n_features = telemetry.n_features
+        self._lock = threading.Lock()
+        self._owner = None
+        self._blocks = []
+        self._connections = []
+        self._processes = []
+        self._views = []
+        # Registry versions each shard serves; empty until its first cycle
+        self._versions = []
+        self.workers = []
+
+    def start(self):
+        """Start the shard processes and wait until every shard has loaded its models"""
+        with self._lock:
+            self._start()
+
+    def _start(self):
+        """Create the shared blocks on first use in this process, then spawn every missing or dead shard"""
+        if self._owner != os.getpid():
+            block_size = self.capacity * (8 + self.lookback * self.n_features * 4 + len(RESULT_COLUMNS) * 8 + 1)
+            self._blocks = [shared_memory.SharedMemory(create=True, size=block_size) for _ in range(self.n_shards)]
+            self._views = [_shard_arrays(block.buf, self.capacity, self.lookback, self.n_features)
+                           for block in self._blocks]
+            self._connections = [None] * self.n_shards
+            self._processes = [None] * self.n_shards
+            self._versions = [{} for _ in range(self.n_shards)]
+            self.workers = [None] * self.n_shards
+            self._owner = os.getpid()
+            atexit.register(self.close)
+        missing = [shard for shard, process in enumerate(self._processes) if process is None or not process.is_alive()]
+        if missing:
+            self._spawn(missing)
+
+    def _spawn(self, shards):
+        """Start shard processes on their existing blocks and wait until they have loaded their models"""
+        context = multiprocessing.get_context(self.start_method)
+        saved = {name: os.environ.get(name) for name in THREAD_VARIABLES}
+        os.environ.update({name: str(self.shard_threads) for name in THREAD_VARIABLES})
+        try:
+            for shard in shards:
+                self._stop(shard)
+                parent, child = context.Pipe()
+                process = context.Process(
+                    target=_shard_main,
+                    args=(child, self._blocks[shard].name, self.capacity, self.lookback, self.n_features),
+                    daemon=True
+                )
+                process.start()
+                # Only the shard holds the child end, so its exit reads as EOF here
+                child.close()
+                self._connections[shard], self._processes[shard] = parent, process
+                self._versions[shard] = {}
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+        for shard in shards:
+            try:
+                self.workers[shard] = self._receive(shard, timeout=None)
+            except (EOFError, OSError):
+                self._stop(shard)
+                raise ShardError(f"Control shard {shard} exited while loading its models")
+
+    def _receive(self, shard, timeout):
+        """
+        Next message from a shard, watching its process while waiting
+
+        Raises:
+            EOFError: The shard exited
+            TimeoutError: No reply within timeout seconds (None waits indefinitely)
+        """
+        connection, process = self._connections[shard], self._processes[shard]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not connection.poll(0.5):
+            if not process.is_alive():
+                # A reply sent just before exiting is still readable
+                if connection.poll():
+                    break
+                raise EOFError(f"exited with code {process.exitcode}")
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"no reply within {timeout:g} s")
+        return connection.recv()
+
+    def _stop(self, shard):
+        """Terminate one shard and drop its pipe; _start() spawns a replacement"""
+        connection, process = self._connections[shard], self._processes[shard]
+        if connection is not None:
+            connection.close()
+        if process is not None:
+            if process.is_alive():
+                process.terminate()
+                process.join(timeout=5)
+            if process.is_alive():
+                # A stopped or wedged process ignores SIGTERM
+                process.kill()
+            process.join()
+        self._connections[shard], self._processes[shard] = None, None
+
+    def _model_updates(self, shard, versions):
+        """
+        Coordinator models the shard does not serve yet, or None
+
+        A new shard gets every model the coordinator has loaded once, so both
+        serve the same instances even if the artifacts on disk have changed.
+        """
+        stale = [name for name in SHARD_MODELS
+                 if self.registry.is_loaded(name) and self._versions[shard].get(name) != versions[name]]
+        return {name: self.registry.get(name) for name in stale} or None
+
+    def _dispatch(self, members):
+        """
+        Send every shard its request and collect one reply per shard
+
+        Every shard that was sent a request is read back (or stopped), so no
+        reply is left in a pipe for a later cycle.
+
+        Returns:
+            List of per-shard compute seconds
+
+        Raises:
+            ShardError: Naming each shard that failed; dead and unresponsive
+                        shards are stopped and restarted by the next cycle
+        """
+        versions = {name: self.registry.version(name) for name in SHARD_MODELS}
+        failures = {}
+        sent = []
+        for shard, rows in enumerate(members):
+            try:
+                self._connections[shard].send((len(rows), self._model_updates(shard, versions)))
+                sent.append(shard)
+            except (OSError, ValueError) as e:
+                failures[shard] = f"send failed ({type(e).__name__}: {e})"
+                self._stop(shard)
+            except Exception as e:
+                # Nothing was written: a model that cannot be pickled fails before the send
+                failures[shard] = f"cannot send models ({type(e).__name__}: {e})"
+
+        seconds = [None] * self.n_shards
+        for shard in sent:
+            try:
+                reply = self._receive(shard, self.reply_timeout)
+            except (EOFError, OSError, TimeoutError) as e:
+                failures[shard] = f"{type(e).__name__}: {e}"
+                self._stop(shard)
+                continue
+            if 'error' in reply:
+                # The shard is healthy and its pipe is drained; only this cycle fails
+                failures[shard] = reply['error']
+            else:
+                seconds[shard] = reply['seconds']
+                self._versions[shard] = versions
+
+        if failures:
+            raise ShardError('; '.join(f"shard {shard}: {error}" for shard, error in sorted(failures.items())))
+        return seconds
+
+    def _plan(self, timings):
+        """Forecast and allocation on the shards, merged into fleet-order columns"""
+        if not self.telemetry.ready_count():
+            return super()._plan(timings)
+
+        with self._lock:
+            self._start()
+            start = time.perf_counter()
+            # Windows are copied straight from the ring buffer into the shared blocks
+            with self.telemetry.lock:
+                server_ids, windows = self.telemetry.windows(copy=False)
+                server_ids = server_ids.copy()
+                flags = self._anomaly_flags(server_ids)
+                shards = shard_of(server_ids, self.n_shards)
+                members = [np.flatnonzero(shards == shard) for shard in range(self.n_shards)]
+                for (ids, shard_windows, _, shard_flags), rows in zip(self._views, members):
+                    ids[:len(rows)] = server_ids[rows]
+                    np.take(windows, rows, axis=0, out=shard_windows[:len(rows)])
+                    shard_flags[:len(rows)] = flags[rows]
+            timings['scatter'] = round((time.perf_counter() - start) * 1000, 3)
+
+            shard_seconds = self._dispatch(members)
+            start = time.perf_counter()
+            results = np.empty((len(server_ids), len(RESULT_COLUMNS)))
+            for (_, _, shard_results, _), rows in zip(self._views, members):
+                results[rows] = shard_results[:len(rows)]
+        timings['shards'] = [round(seconds * 1000, 3) for seconds in shard_seconds]
+
+        columns = dict(zip(RESULT_COLUMNS, results.T))
+        codes = columns.pop('action').astype(np.intp)
+        forecast = {
+            'server_id': server_ids,
+            'cpu_forecast': columns.pop('cpu_forecast'),
+            'memory_forecast': columns.pop('memory_forecast'),
+            'io_forecast': columns.pop('io_forecast'),
+            'time_offset': np.ones(len(server_ids), dtype=np.int64)
+        }
+
+        # Migrations go to the least loaded trusted server kept running anywhere in the fleet
+        target = np.full(len(server_ids), None, dtype=object)
+        candidates = np.flatnonzero((codes == 0) & (flags == 0))
+        if len(candidates):
+            target[codes == 3] = f"Server {server_ids[candidates[np.argmin(forecast['cpu_forecast'][candidates])]]}"
+        allocation = dict(server_id=server_ids, action=ACTIONS[codes], target=target, **columns)
+        timings['merge'] = round((time.perf_counter() - start) * 1000, 3)
+        return forecast, allocation
+
+    def close(self):
+        """Stop the shard processes and release the shared memory"""
+        if self._owner != os.getpid():
+            return
+        for connection in self._connections:
+            try:
+                connection.send(None)
+            except (AttributeError, OSError, ValueError):
+                pass
+        for process in self._processes:
+            if process is None:
+                continue
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for connection in self._connections:
+            if connection is not None:
+                connection.close()
+        self._views = []
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks, self._connections, self._processes = [], [], []
+        self._owner = None
+
+def control_loop_from_env(registry, telemetry, ledger=None, detector=None):
+    """
+    ControlLoop, or a ShardedControlLoop when CONTROL_SHARDS is above 1
+
+    CONTROL_SHARDS: Number of shard processes (default 0, in-process)
+    SHARD_START_METHOD: multiprocessing start method (default 'spawn')
+    SHARD_THREADS: BLAS/OpenMP threads per shard process (default 1)
+    SHARD_TIMEOUT: Seconds to wait for a shard's reply before restarting it (default 60)
+    """
+    n_shards = int(os.environ.get('CONTROL_SHARDS', 0))
+    if n_shards <= 1:
+        return ControlLoop(registry, telemetry, ledger, detector)
+    return ShardedControlLoop(registry, telemetry, n_shards, os.environ.get('SHARD_START_METHOD', 'spawn'),
+                              int(os.environ.get('SHARD_THREADS', 1)), ledger, detector,
+                              float(os.environ.get('SHARD_TIMEOUT', 60)))
@@ -29,8 +29,11 @@ accessDeniedEl.innerHTML = `
 
 // Initialize dashboard on page load
 document.addEventListener('DOMContentLoaded', () => {
-    // Initial data fetch
-    fetchAllData();
+    // Receive pushed updates; without EventSource, fetch now and poll below
+    const streaming = startPushStream();
+    if (!streaming) {
+        fetchAllData();
+    }
     
     // Set up refresh button
     refreshBtn.addEventListener('click', fetchAllData);
@@ -41,8 +44,10 @@ document.addEventListener('DOMContentLoaded', () => {
     // Initialize all visualizations for the dashboard
     updateDashboardVisualizations();
     
-    // Auto-refresh every 60 seconds
-    setInterval(fetchAllData, 60000);
+    // Auto-refresh every 60 seconds when updates are not pushed
+    if (!streaming) {
+        setInterval(fetchAllData, 60000);
+    }
 });
 
 // Set up event listeners for model training buttons
@@ -243,37 +248,13 @@ async function fetchAllData() {
         refreshBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Refreshing...';
         refreshBtn.disabled = true;
         
-        // Try to fetch system status
-        try {
-            systemData = await fetchData('/api/system/status');
-        } catch (error) {
-            console.log('Using mock system data');
-            systemData = generateMockSystemData();
-        }
-        updateSystemStatus(systemData);
-        
-        // Try to fetch workload forecast
+        // Run the whole control cycle server-side in one round trip
         try {
-            forecastData = await fetchData('/api/workload/forecast');
+            unpackControlCycle(await fetchData('/api/control/cycle'));
+            updateSystemStatus(systemData);
         } catch (error) {
-            console.log('Using mock forecast data');
-            forecastData = generateMockForecastData();
-        }
-        
-        // Try to fetch resource allocation decisions
-        try {
-            resourceAllocationData = await fetchPostData('/api/resource/allocate', forecastData);
-        } catch (error) {
-            console.log('Using mock resource allocation data');
-            resourceAllocationData = generateMockResourceAllocationData();
-        }
-        
-        // Try to fetch cooling optimization
-        try {
-            coolingData = await fetchPostData('/api/cooling/optimize', systemData);
-        } catch (error) {
-            console.log('Using mock cooling data');
-            coolingData = generateMockCoolingData();
+            console.log('Control cycle unavailable, fetching endpoints individually');
+            await fetchEndpointsIndividually();
         }
         
         // Update charts and visualizations
@@ -317,6 +298,158 @@ async function fetchAllData() {
     }
 }
 
+// Latest pushed state: table rows keyed by their id columns, plus flat value groups
+const streamState = { tables: {}, values: {} };
+const streamTableKeys = {
+    servers: ['id'],
+    forecast: ['server_id', 'time_offset'],
+    allocation: ['server_id']
+};
+
+// Subscribe to /api/stream; returns false if the browser lacks EventSource
+function startPushStream() {
+    if (!window.EventSource) {
+        return false;
+    }
+    
+    const source = new EventSource('/api/stream');
+    source.addEventListener('snapshot', event => applyStreamMessage(JSON.parse(event.data), true));
+    source.addEventListener('delta', event => applyStreamMessage(JSON.parse(event.data), false));
+    source.onerror = () => {
+        // EventSource reconnects by itself and resumes from the last event id
+        console.log('Update stream interrupted, reconnecting');
+    };
+    return true;
+}
+
+function streamRowKey(table, row) {
+    return streamTableKeys[table].map(key => row[key]).join(':');
+}
+
+// Merge a snapshot or delta into streamState and redraw
+function applyStreamMessage(message, isSnapshot) {
+    if (isSnapshot) {
+        streamState.tables = {};
+        streamState.values = {};
+    }
+    
+    Object.entries(message.tables).forEach(([name, change]) => {
+        const rows = streamState.tables[name] || new Map();
+        if (isSnapshot) {
+            columnsToRows(change).forEach(row => rows.set(streamRowKey(name, row), row));
+        } else {
+            columnsToRows(change.removed).forEach(row => rows.delete(streamRowKey(name, row)));
+            columnsToRows(change.upsert).forEach(row => rows.set(streamRowKey(name, row), row));
+        }
+        streamState.tables[name] = rows;
+    });
+    
+    Object.entries(message.values).forEach(([name, changed]) => {
+        streamState.values[name] = Object.assign({}, streamState.values[name], changed);
+    });
+    
+    const tableRows = name => Array.from((streamState.tables[name] || new Map()).values());
+    systemData = {
+        servers: tableRows('servers'),
+        energy: streamState.values.energy,
+        cooling: streamState.values.room
+    };
+    forecastData = { forecasts: tableRows('forecast'), timestamp: message.timestamp };
+    resourceAllocationData = {
+        decisions: tableRows('allocation'),
+        timestamp: message.timestamp,
+        optimization_goal: 'energy_efficiency'
+    };
+    coolingData = streamState.values.cooling;
+    
+    updateSystemStatus(systemData);
+    updateWorkloadForecastChart(forecastData);
+    updateResourceAllocationChart(resourceAllocationData);
+    updateServerCards(systemData.servers);
+    updateAIInsights(forecastData, resourceAllocationData, coolingData);
+    updateDashboardVisualizations();
+    lastUpdatedEl.textContent = new Date().toLocaleString();
+}
+
+// Convert column arrays ({key: [values...]}) into a list of row objects
+function columnsToRows(columns) {
+    const keys = Object.keys(columns);
+    const length = keys.length > 0 ? columns[keys[0]].length : 0;
+    const rows = [];
+    for (let i = 0; i < length; i++) {
+        const row = {};
+        keys.forEach(key => { row[key] = columns[key][i]; });
+        rows.push(row);
+    }
+    return rows;
+}
+
+// Populate the dashboard data from a compact /api/control/cycle response
+function unpackControlCycle(cycle) {
+    systemData = {
+        servers: columnsToRows(cycle.status.servers),
+        energy: cycle.status.energy,
+        cooling: cycle.status.cooling
+    };
+    forecastData = {
+        forecasts: columnsToRows(cycle.forecast),
+        timestamp: cycle.timestamp
+    };
+    resourceAllocationData = {
+        decisions: columnsToRows(cycle.allocation),
+        timestamp: cycle.timestamp,
+        optimization_goal: 'energy_efficiency'
+    };
+    coolingData = cycle.cooling;
+}
+
+// Fetch status, forecast, allocation and cooling with separate requests
+async function fetchEndpointsIndividually() {
+    // Try to fetch system status
+    try {
+        systemData = await fetchData('/api/system/status');
+    } catch (error) {
+        console.log('Using mock system data');
+        systemData = generateMockSystemData();
+    }
+    updateSystemStatus(systemData);
+    
+    // Try to fetch workload forecast as columns (one array per field), which is
+    // posted back to the allocation endpoint unchanged
+    let forecastColumns = null;
+    try {
+        forecastColumns = await fetchData('/api/workload/forecast', COLUMNS_TYPE);
+        forecastData = {
+            forecasts: columnsToRows(pickColumns(forecastColumns, FORECAST_FIELDS)),
+            timestamp: forecastColumns.timestamp
+        };
+    } catch (error) {
+        console.log('Using mock forecast data');
+        forecastData = generateMockForecastData();
+    }
+    
+    // Try to fetch resource allocation decisions
+    try {
+        if (forecastColumns) {
+            const allocation = await fetchPostData('/api/resource/allocate', forecastColumns, COLUMNS_TYPE);
+            resourceAllocationData = { ...allocation, decisions: columnsToRows(allocation.decisions) };
+        } else {
+            resourceAllocationData = await fetchPostData('/api/resource/allocate', forecastData);
+        }
+    } catch (error) {
+        console.log('Using mock resource allocation data');
+        resourceAllocationData = generateMockResourceAllocationData();
+    }
+    
+    // Try to fetch cooling optimization
+    try {
+        coolingData = await fetchPostData('/api/cooling/optimize', systemData);
+    } catch (error) {
+        console.log('Using mock cooling data');
+        coolingData = generateMockCoolingData();
+    }
+}
+
 // Show error message
 function showErrorMessage(message) {
     const errorToast = document.createElement('div');
@@ -339,21 +472,33 @@ function showErrorMessage(message) {
     }, 100);
 }
 
-// Fetch data from API
-async function fetchData(url) {
-    const response = await fetch(url);
+// Columnar JSON media type offered by the forecast and allocation endpoints
+const COLUMNS_TYPE = 'application/vnd.idt.columns+json';
+const FORECAST_FIELDS = ['server_id', 'time_offset', 'cpu_forecast', 'memory_forecast', 'io_forecast'];
+
+// Subset of a columns object, e.g. the per-point fields of a forecast
+function pickColumns(columns, fields) {
+    const picked = {};
+    fields.forEach(field => { picked[field] = columns[field]; });
+    return picked;
+}
+
+// Fetch data from API, optionally asking for a specific media type
+async function fetchData(url, accept = 'application/json') {
+    const response = await fetch(url, { headers: { 'Accept': accept } });
     if (!response.ok) {
         throw new Error(`HTTP error! Status: ${response.status}`);
     }
     return response.json();
 }
 
-// Post data to API
-async function fetchPostData(url, data) {
+// Post data to API; columnar bodies get a columnar response
+async function fetchPostData(url, data, contentType = 'application/json') {
     const response = await fetch(url, {
         method: 'POST',
         headers: {
-            'Content-Type': 'application/json'
+            'Content-Type': contentType,
+            'Accept': contentType
         },
         body: JSON.stringify(data)
     });
@@ -0,0 +1,227 @@
+import json
+import threading
+import time
+from collections import deque
+import numpy as np
+from app.control import to_json
+
+# Column tables in a control cycle and the columns identifying each row
+TABLE_KEYS = {
+    'servers': ['id'],
+    'forecast': ['server_id', 'time_offset'],
+    'allocation': ['server_id']
+}
+
+def _row_keys(table, key_columns, scale):
+    """Single int64 key per row, combining up to two integer key columns"""
+    keys = np.asarray(table[key_columns[0]], dtype=np.int64)
+    if len(key_columns) > 1:
+        keys = keys * scale + np.asarray(table[key_columns[1]], dtype=np.int64)
+    return keys
+
+def table_delta(previous, current, key_columns):
+    """
+    Rows of a column table that were added or changed, and keys of removed rows
+
+    Args:
+        previous: Column dict from the previous tick (or None)
+        current: Column dict from this tick
+        key_columns: Columns identifying a row
+
+    Returns:
+        Dictionary with 'upsert' (column dict of changed rows) and 'removed'
+        (column dict of removed row keys), or None if nothing changed
+    """
+    if previous is None or set(previous) != set(current) or len(previous[key_columns[0]]) == 0:
+        return {'upsert': current, 'removed': {name: [] for name in key_columns}}
+
+    # Composite keys must use the same multiplier for both ticks
+    scale = 1
+    if len(key_columns) > 1:
+        scale = int(max(np.max(previous[key_columns[1]]), np.max(current[key_columns[1]], initial=0))) + 1
+    previous_keys = _row_keys(previous, key_columns, scale)
+    current_keys = _row_keys(current, key_columns, scale)
+
+    if np.array_equal(previous_keys, current_keys):
+        # Common case: same rows in the same order
+        index = np.arange(len(current_keys))
+        found = np.ones(len(current_keys), dtype=bool)
+    else:
+        order = np.argsort(previous_keys, kind='stable')
+        position = np.minimum(np.searchsorted(previous_keys[order], current_keys), len(order) - 1)
+        index = order[position]
+        found = previous_keys[index] == current_keys
+
+    changed = ~found
+    for name, values in current.items():
+        if name not in key_columns:
+            changed |= found & (np.asarray(values) != np.asarray(previous[name])[index])
+
+    removed = ~np.isin(previous_keys, current_keys)
+    if not changed.any() and not removed.any():
+        return None
+
+    return {
+        'upsert': {name: np.asarray(values)[changed] for name, values in current.items()},
+        'removed': {name: np.asarray(previous[name])[removed] for name in key_columns}
+    }
+
+def values_delta(previous, current):
+    """Keys of a flat dict whose values changed"""
+    if previous is None:
+        return dict(current)
+    changed = {key: value for key, value in current.items() if previous.get(key) != value}
+    return changed or None
+
+def _sse(seq, event, payload):
+    """Encode one Server-Sent Event"""
+    data = json.dumps(to_json(payload), separators=(',', ':'))
+    return f"id: {seq}\nevent: {event}\ndata: {data}\n\n".encode('utf-8')
+
+class StreamHub:
+    """Single producer, many subscribers push channel for dashboard updates
+
+    One background thread runs the control cycle every interval seconds,
+    computes what changed since the previous tick and encodes the delta (and a
+    full snapshot for new or lagging clients) exactly once. Subscribers only
+    wait on a condition and write the already-encoded bytes, so the cost per
+    tick does not grow with the number of connected dashboards. While no one
+    is subscribed the producer parks instead of running control cycles.
+    """
+
+    def __init__(self, control_loop, interval=5.0, history=32, keepalive=15.0):
+        self.control_loop = control_loop
+        self.interval = interval
+        self.keepalive = keepalive
+        self.subscribers = 0
+        self.tick_seconds = None
+
+        self._events = deque(maxlen=history)  # (seq, encoded delta)
+        self._snapshot = None                 # (seq, encoded snapshot)
+        self._state = None
+        self._seq = 0
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Start the producer thread if it is not running"""
+        with self._condition:
+            if self._thread is None:
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._run, name='stream-producer', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """Stop the producer thread"""
+        self._stopped.set()
+        with self._condition:
+            thread, self._thread = self._thread, None
+            self._condition.notify_all()
+        if thread is not None:
+            thread.join()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            with self._condition:
+                self._condition.wait_for(lambda: self.subscribers > 0 or self._stopped.is_set())
+            if self._stopped.is_set():
+                break
+            started = time.perf_counter()
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Stream producer error: {e}")
+            self._stopped.wait(max(0.0, self.interval - (time.perf_counter() - started)))
+
+    def tick(self):
+        """Run one control cycle and publish its delta to every subscriber"""
+        started = time.perf_counter()
+        cycle = self.control_loop.run_cycle()
+        state = {
+            'tables': {
+                'servers': cycle['status']['servers'],
+                'forecast': cycle['forecast'],
+                'allocation': cycle['allocation']
+            },
+            'values': {
+                'energy': cycle['status']['energy'],
+                'room': cycle['status']['cooling'],
+                'cooling': cycle['cooling']
+            }
+        }
+        previous = self._state or {'tables': {}, 'values': {}}
+
+        delta = {'timestamp': cycle['timestamp'], 'timings_ms': cycle['timings_ms'], 'tables': {}, 'values': {}}
+        for name, table in state['tables'].items():
+            changes = table_delta(previous['tables'].get(name), table, TABLE_KEYS[name])
+            if changes is not None:
+                delta['tables'][name] = changes
+        for name, values in state['values'].items():
+            changes = values_delta(previous['values'].get(name), values)
+            if changes is not None:
+                delta['values'][name] = changes
+
+        snapshot = dict(state, timestamp=cycle['timestamp'], timings_ms=cycle['timings_ms'])
+
+        # Encode once, outside the lock; only the producer thread advances seq
+        seq = self._seq + 1
+        encoded_delta = _sse(seq, 'delta', delta)
+        encoded_snapshot = _sse(seq, 'snapshot', snapshot)
+
+        with self._condition:
+            self._seq = seq
+            self._state = state
+            self._events.append((seq, encoded_delta))
+            self._snapshot = (seq, encoded_snapshot)
+            self._condition.notify_all()
+        self.tick_seconds = time.perf_counter() - started
+
+    def _messages_since(self, seq):
+        """Encoded messages a client that has seen seq needs next"""
+        if self._snapshot is None or seq == self._seq:
+            return seq, []
+        oldest = self._events[0][0] if self._events else self._seq + 1
+        if seq is None or seq < oldest - 1 or seq > self._seq:
+            # New or lagging client: one full snapshot
+            return self._snapshot[0], [self._snapshot[1]]
+        return self._seq, [message for event_seq, message in self._events if event_seq > seq]
+
+    def subscribe(self, last_seq=None):
+        """
+        Generator of encoded SSE messages for one client
+
+        Args:
+            last_seq: Last event id the client applied (e.g. from Last-Event-ID)
+        """
+        self.start()
+        with self._condition:
+            self.subscribers += 1
+            self._condition.notify_all()
+        try:
+            seq = last_seq
+            yield f"retry: {int(self.interval * 1000)}\n\n".encode('utf-8')
+            while not self._stopped.is_set():
+                with self._condition:
+                    self._condition.wait_for(
+                        lambda: self._snapshot is not None and self._seq != seq or self._stopped.is_set(),
+                        timeout=self.keepalive
+                    )
+                    seq, messages = self._messages_since(seq)
+                if not messages:
+                    yield b": keepalive\n\n"
+                for message in messages:
+                    yield message
+        finally:
+            with self._condition:
+                self.subscribers -= 1
+
+    def stats(self):
+        """Subscriber count, last sequence number and producer tick time"""
+        return {
+            'subscribers': self.subscribers,
+            'seq': self._seq,
+            'interval_s': self.interval,
+            'parked': self.subscribers == 0,
+            'tick_ms': round(self.tick_seconds * 1000, 3) if self.tick_seconds is not None else None
+        }
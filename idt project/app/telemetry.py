@@ -0,0 +1,369 @@
+import io
+import os
+import threading
+import uuid
+import numpy as np
+import pandas as pd
+
+# Model input features, in column order, derived from the sample_workload.csv schema
+FEATURE_COLUMNS = [
+    'cpu_percent',
+    'memory_percent',
+    'io_percent',
+    'temperature',
+    'is_active',   # 1.0 when status == 'active'
+    'hour_sin',    # Time of day encoded on the unit circle
+    'hour_cos'
+]
+
+# Raw telemetry columns accepted by the ingestion API
+TELEMETRY_COLUMNS = ['timestamp', 'server_id', 'cpu_percent', 'memory_percent',
+                     'io_percent', 'temperature', 'status']
+
+def build_features(columns):
+    """
+    Convert raw telemetry columns into a (n_samples, 7) float32 feature matrix
+
+    Args:
+        columns: Dictionary of equal-length sequences following TELEMETRY_COLUMNS
+
+    Returns:
+        NumPy array with one row per sample in FEATURE_COLUMNS order
+    """
+    n_samples = len(columns['server_id'])
+    features = np.empty((n_samples, len(FEATURE_COLUMNS)), dtype=np.float32)
+
+    for i, name in enumerate(['cpu_percent', 'memory_percent', 'io_percent', 'temperature']):
+        features[:, i] = np.asarray(columns[name], dtype=np.float32)
+
+    status = columns.get('status')
+    features[:, 4] = 1.0 if status is None else (np.asarray(status) == 'active')
+
+    timestamps = columns.get('timestamp')
+    if timestamps is None:
+        hours = np.zeros(n_samples)
+    else:
+        timestamps = np.asarray(timestamps)
+        if timestamps.dtype.kind in 'iuf':
+            # Numeric timestamps are seconds since the epoch
+            timestamps = timestamps.astype('int64').astype('datetime64[s]')
+        else:
+            timestamps = timestamps.astype('datetime64[s]')
+        seconds = (timestamps - timestamps.astype('datetime64[D]')).astype(np.int64)
+        hours = seconds / 3600.0
+
+    angle = hours * (2 * np.pi / 24)
+    features[:, 5] = np.sin(angle)
+    features[:, 6] = np.cos(angle)
+    return features
+
+def parse_server_ids(values):
+    """
+    Validate server ids and convert them to int64
+
+    Args:
+        values: Sequence of server ids as parsed from CSV or JSON
+
+    Returns:
+        NumPy int64 array of server ids
+
+    Raises:
+        ValueError: If an id is not an integer or lies outside the int64 range
+    """
+    values = np.asarray(values)
+    if values.dtype.kind in 'iu':
+        if values.dtype == np.uint64 and values.size and values.max() > np.iinfo(np.int64).max:
+            raise ValueError("server_id is outside the int64 range")
+        return values.astype(np.int64)
+
+    ids = []
+    for value in values.ravel().tolist():
+        if isinstance(value, str) and value.strip().lstrip('+-').isdigit():
+            # pandas reads ids beyond the int64 range from CSV as strings
+            value = int(value)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"server_id must be an integer, got {value!r}")
+        if isinstance(value, float) and not value.is_integer():
+            raise ValueError(f"server_id must be an integer, got {value!r}")
+        value = int(value)
+        if not np.iinfo(np.int64).min <= value <= np.iinfo(np.int64).max:
+            raise ValueError(f"server_id {value} is outside the int64 range")
+        ids.append(value)
+    return np.asarray(ids, dtype=np.int64).reshape(values.shape)
+
+def parse_payload(payload, content_type='application/json'):
+    """
+    Parse a batched telemetry request body into columns
+
+    Accepts a CSV body with the sample_workload.csv header, a JSON object of
+    column arrays, or a JSON list of per-sample records.
+
+    Returns:
+        Dictionary mapping column names to NumPy arrays, with server_id as int64
+
+    Raises:
+        ValueError: If the payload format is unknown or a server id is invalid
+    """
+    if content_type.startswith('text/csv'):
+        if isinstance(payload, bytes):
+            payload = payload.decode('utf-8')
+        frame = pd.read_csv(io.StringIO(payload))
+        columns = {name: frame[name].to_numpy() for name in frame.columns}
+    elif isinstance(payload, dict):
+        columns = {name: np.asarray(values) for name, values in payload.items()}
+    elif isinstance(payload, list):
+        frame = pd.DataFrame.from_records(payload)
+        columns = {name: frame[name].to_numpy() for name in frame.columns}
+    else:
+        raise ValueError("Telemetry payload must be CSV, a JSON object of columns or a JSON list of samples")
+
+    if 'server_id' in columns:
+        columns['server_id'] = parse_server_ids(columns['server_id'])
+    return columns
+
+class ServerIndex:
+    """Server id -> dense slot mapping, slots handed out in order of first appearance
+
+    The ids are also kept sorted together with their slots, so a whole batch of
+    ids is mapped with one searchsorted. Callers serialize access with their own
+    lock.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.ids = np.zeros(capacity, dtype=np.int64)  # Server id held by each slot
+        self.sorted_ids = np.zeros(0, dtype=np.int64)
+        self.sorted_slots = np.zeros(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.sorted_ids)
+
+    @property
+    def nbytes(self):
+        """Memory held by the index arrays"""
+        return self.ids.nbytes + self.sorted_ids.nbytes + self.sorted_slots.nbytes
+
+    def lookup(self, server_ids):
+        """Slots of server ids, -1 for unknown servers"""
+        server_ids = np.asarray(server_ids, dtype=np.int64)
+        if not len(self.sorted_ids):
+            return np.full(server_ids.shape, -1, dtype=np.int64)
+        position = np.minimum(np.searchsorted(self.sorted_ids, server_ids), len(self.sorted_ids) - 1)
+        return np.where(self.sorted_ids[position] == server_ids, self.sorted_slots[position], -1)
+
+    def register(self, server_ids, strict=False):
+        """
+        Slots of server ids, giving new servers the next free slots
+
+        Args:
+            server_ids: Array of server ids, repeats allowed
+            strict: Raise instead of leaving servers beyond capacity unregistered
+
+        Returns:
+            Array of slots, -1 for servers that did not fit
+
+        Raises:
+            ValueError: If strict and the new servers exceed the capacity
+        """
+        server_ids = np.asarray(server_ids, dtype=np.int64)
+        slots = self.lookup(server_ids)
+        new_ids = np.unique(server_ids[slots < 0])
+        if not len(new_ids):
+            return slots
+        room = self.capacity - len(self)
+        if strict and len(new_ids) > room:
+            raise ValueError(f"Capacity of {self.capacity} servers exceeded")
+
+        new_ids = new_ids[:room]
+        new_slots = np.arange(len(self), len(self) + len(new_ids))
+        self.ids[new_slots] = new_ids
+        ids = np.concatenate([self.sorted_ids, new_ids])
+        order = np.argsort(ids, kind='stable')
+        self.sorted_ids = ids[order]
+        self.sorted_slots = np.concatenate([self.sorted_slots, new_slots])[order]
+        return self.lookup(server_ids)
+
+class TelemetryBuffer:
+    """Per-server ring buffers holding the most recent lookback window of features
+
+    Storage is preallocated as one (capacity, 2 * lookback, features) array. Every
+    sample is written twice, at ring position p and p + lookback, so the latest
+    window of any server is always the contiguous slice [head, head + lookback)
+    and can be read without copying by a caller holding the lock.
+    """
+
+    def __init__(self, capacity=10000, lookback=24, n_features=len(FEATURE_COLUMNS)):
+        self.capacity = capacity
+        self.lookback = lookback
+        self.n_features = n_features
+        self.generation = 0  # Incremented on every ingest, see version()
+        self._token = None   # (pid, random token) of the process that owns the contents
+        self.lock = threading.RLock()  # Reentrant, so lock holders can call the readers below
+
+        self._data = np.zeros((capacity, 2 * lookback, n_features), dtype=np.float32)
+        self._head = np.zeros(capacity, dtype=np.int64)    # Next write position per server
+        self._count = np.zeros(capacity, dtype=np.int64)   # Samples received per server
+        self._index = ServerIndex(capacity)
+
+        # Reused output array for windows(copy=False) when servers are not aligned
+        self._gather = np.empty((0, lookback, n_features), dtype=np.float32)
+
+    @property
+    def n_servers(self):
+        """Number of servers seen so far"""
+        return len(self._index)
+
+    def ingest(self, server_ids, features):
+        """
+        Append a batch of samples to the per-server ring buffers
+
+        Args:
+            server_ids: Array of server ids, one per sample
+            features: Array of shape (n_samples, n_features), samples in time order
+
+        Returns:
+            Number of samples ingested
+        """
+        server_ids = np.asarray(server_ids, dtype=np.int64)
+        features = np.asarray(features, dtype=np.float32)
+        n_samples = len(server_ids)
+        if features.shape != (n_samples, self.n_features):
+            raise ValueError(f"Expected features of shape ({n_samples}, {self.n_features}), got {features.shape}")
+        if n_samples == 0:
+            return 0
+
+        with self.lock:
+            unique_ids, inverse = np.unique(server_ids, return_inverse=True)
+            unique_slots = self._index.register(unique_ids, strict=True)
+
+            # Rank of each sample among the batch samples of the same server
+            order = np.argsort(inverse, kind='stable')
+            counts = np.bincount(inverse, minlength=len(unique_ids))
+            group_start = np.concatenate([[0], np.cumsum(counts)[:-1]])
+            rank = np.empty(n_samples, dtype=np.int64)
+            rank[order] = np.arange(n_samples) - np.repeat(group_start, counts)
+
+            # Only the newest lookback samples per server survive the batch
+            keep = rank >= counts[inverse] - self.lookback
+            slots = unique_slots[inverse[keep]]
+            positions = (self._head[slots] + rank[keep]) % self.lookback
+
+            self._data[slots, positions] = features[keep]
+            self._data[slots, positions + self.lookback] = features[keep]
+
+            self._head[unique_slots] = (self._head[unique_slots] + counts) % self.lookback
+            self._count[unique_slots] += counts
+            self.generation += 1
+
+        return n_samples
+
+    def ingest_columns(self, columns):
+        """Ingest parsed telemetry columns (see parse_payload), returns samples ingested"""
+        return self.ingest(columns['server_id'], build_features(columns))
+
+    def window(self, server_id):
+        """Return a copy of one server's latest (lookback, n_features) window"""
+        with self.lock:
+            slot = int(self._index.lookup(server_id))
+            if slot < 0:
+                raise KeyError(server_id)
+            head = self._head[slot]
+            return self._data[slot, head:head + self.lookback].copy()
+
+    def windows_for(self, server_ids):
+        """
+        Copies of the latest windows of specific servers
+
+        Args:
+            server_ids: Server ids to look up; unknown servers and servers without a
+                        full lookback history are skipped
+
+        Returns:
+            Tuple of (server_ids found, windows shaped (n_found, lookback, n_features))
+        """
+        server_ids = np.asarray(server_ids, dtype=np.int64)
+        with self.lock:
+            slots = self._index.lookup(server_ids)
+            known = slots >= 0
+            slots = slots[known]
+            ready = self._count[slots] >= self.lookback
+            slots = slots[ready]
+            offsets = self._head[slots][:, None] + np.arange(self.lookback)
+            return server_ids[known][ready], self._data[slots[:, None], offsets]
+
+    def ready_count(self):
+        """Number of servers with at least a full lookback window of samples"""
+        with self.lock:
+            return int(np.count_nonzero(self._count[:self.n_servers] >= self.lookback))
+
+    def windows(self, copy=True):
+        """
+        Latest windows for every server with a full lookback history
+
+        By default the windows are a private copy, safe to hand to other threads.
+        With copy=False, when all servers have received the same number of samples
+        (e.g. telemetry arrives in per-tick fleet batches) this is a zero-copy view
+        into the ring buffer, and otherwise windows are gathered into a reused
+        output array. Either is overwritten by the next ingest or windows() call,
+        so the caller must hold self.lock for as long as it reads the result.
+
+        Args:
+            copy: Return arrays owned by the caller (default True)
+
+        Returns:
+            Tuple of (server_ids, windows) with windows shaped (n_ready, lookback, n_features)
+        """
+        with self.lock:
+            n_servers = self.n_servers
+            ready = np.flatnonzero(self._count[:n_servers] >= self.lookback)
+            heads = self._head[ready]
+
+            if len(ready) == n_servers and n_servers and np.all(heads == heads[0]):
+                head = heads[0]
+                server_ids, windows = self._index.ids[:n_servers], self._data[:n_servers, head:head + self.lookback]
+                return (server_ids.copy(), windows.copy()) if copy else (server_ids, windows)
+
+            offsets = heads[:, None] + np.arange(self.lookback)
+            if copy:
+                return self._index.ids[ready], self._data[ready[:, None], offsets]
+            if self._gather.shape[0] < len(ready):
+                self._gather = np.empty((len(ready), self.lookback, self.n_features), dtype=np.float32)
+            out = self._gather[:len(ready)]
+            out[...] = self._data[ready[:, None], offsets]
+            return self._index.ids[ready], out
+
+    def version(self):
+        """
+        Cache key component for the current contents
+
+        Generations only count ingests within one process, and gunicorn workers
+        (or a restarted server) each hold their own telemetry, so the generation
+        is combined with a token drawn once per process. Results cached under it
+        in a backend shared between processes are never served to another one.
+        """
+        with self.lock:
+            if self._token is None or self._token[0] != os.getpid():
+                self._token = (os.getpid(), uuid.uuid4().hex)
+            return f"{self._token[1]}:{self.generation}"
+
+    def snapshot(self):
+        """
+        Telemetry generation with a copy of the windows it produced, read atomically
+
+        Returns:
+            Tuple of (generation, server_ids, windows), see windows()
+        """
+        with self.lock:
+            return (self.generation,) + self.windows()
+
+    def latest(self):
+        """
+        Most recent sample per server
+
+        Returns:
+            Tuple of (server_ids, features) with features shaped (n_servers, n_features)
+        """
+        with self.lock:
+            n_servers = self.n_servers
+            newest = self._head[:n_servers] + self.lookback - 1
+            return self._index.ids[:n_servers].copy(), self._data[np.arange(n_servers), newest]
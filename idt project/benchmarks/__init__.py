@@ -0,0 +1,2 @@
+# Benchmarks for the AI Server Management System
+# Run from the project directory, e.g. python -m benchmarks.bench_forecast
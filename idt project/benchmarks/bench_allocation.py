@@ -0,0 +1,32 @@
+import argparse
+import time
+import numpy as np
+from app.models.resource_allocation import ResourceAllocationModel
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched resource allocation decisions")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[4, 500, 5000])
+    parser.add_argument('--repeats', type=int, default=10)
+    args = parser.parse_args()
+    
+    model = ResourceAllocationModel()
+    rng = np.random.default_rng(0)
+    
+    print(f"{'servers':>8} {'decide_batch_ms':>16} {'servers_per_s':>14}")
+    for n_servers in args.sizes:
+        server_ids = np.arange(1, n_servers + 1)
+        cpu, memory, io = rng.uniform(0, 100, (3, n_servers))
+        
+        # Warm up before timing
+        model.decide_batch(server_ids, cpu, memory, io)
+        
+        timings = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            model.decide_batch(server_ids, cpu, memory, io)
+            timings.append(time.perf_counter() - start)
+        latency = float(np.median(timings))
+        print(f"{n_servers:>8} {latency * 1000:>16.2f} {n_servers / latency:>14.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+import argparse
+import time
+import numpy as np
+from app.anomaly import AnomalyDetector, CHANNELS
+
+def batch(rng, n_servers, samples):
+    """Feature rows for samples per server, in time order, with status active"""
+    features = np.column_stack([rng.normal(50, 5, (n_servers * samples, len(CHANNELS))),
+                                np.ones(n_servers * samples)])
+    return np.tile(np.arange(1, n_servers + 1), samples), features
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming anomaly detection against windowed z-score rescans")
+    parser.add_argument('--servers', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--samples', type=int, default=1, help="Samples per server in each batch")
+    parser.add_argument('--window', type=int, default=24, help="Window length of the rescan baseline")
+    parser.add_argument('--batches', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'servers':>8} {'update_ms':>10} {'us/sample':>10} {'rescan_ms':>10} {'detector_mb':>12}")
+    for n_servers in args.servers:
+        rng = np.random.default_rng(0)
+        detector = AnomalyDetector(capacity=n_servers)
+        batches = [batch(rng, n_servers, args.samples) for _ in range(args.batches)]
+        for server_ids, features in batches[:2]:
+            detector.update(server_ids, features)
+        begin = time.perf_counter()
+        for server_ids, features in batches:
+            detector.update(server_ids, features)
+        update_time = (time.perf_counter() - begin) / args.batches
+
+        # The same check recomputed from each server's latest window, as without running statistics
+        window = rng.normal(50, 5, (n_servers, args.window, len(CHANNELS)))
+        begin = time.perf_counter()
+        for _ in range(args.batches):
+            mean, std = window.mean(axis=1), window.std(axis=1)
+            np.abs(window[:, -1] - mean) > 4 * np.maximum(std, 1.0)
+        rescan_time = (time.perf_counter() - begin) / args.batches
+
+        print(f"{n_servers:>8} {update_time * 1000:>10.2f} {update_time / (n_servers * args.samples) * 1e6:>10.2f} "
+              f"{rescan_time * 1000:>10.2f} {detector.stats()['memory_bytes'] / 1e6:>12.1f}")
+
+if __name__ == '__main__':
+    main()
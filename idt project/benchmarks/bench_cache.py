@@ -0,0 +1,92 @@
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+import numpy as np
+from app.cache import MemoryCache, ResultCache, SqliteCache
+from app.registry import ModelRegistry
+from app.telemetry import TelemetryBuffer
+
+def _worker(path, first_id, n_servers, barrier, results):
+    """
+    One simulated gunicorn worker: ingest its own servers and read the forecast
+    through the shared cache under the same keys as app.cached_forecast
+    """
+    registry = ModelRegistry()
+    registry.register('workload', object)
+    registry.warmup()
+    telemetry = TelemetryBuffer(capacity=n_servers, lookback=4)
+    server_ids = np.arange(first_id, first_id + n_servers)
+    telemetry.ingest(np.tile(server_ids, 4), np.ones((4 * n_servers, telemetry.n_features), dtype=np.float32))
+    cache = ResultCache(SqliteCache(path))
+
+    def forecast():
+        return cache.get_or_compute('forecast', {'telemetry': telemetry.version()}, registry.version('workload'),
+                                    lambda: telemetry.windows()[0].tolist())
+
+    # Both workers are at generation 1 with a freshly loaded model; the first one fills the cache
+    if first_id:
+        barrier.wait()
+    served = forecast()
+    if not first_id:
+        barrier.wait()
+    results[first_id] = (served, forecast(), cache.stats()['counters']['forecast'])
+
+def check_isolation(path, n_servers=3):
+    """Whether two processes sharing one SQLite cache each get only their own telemetry"""
+    context = multiprocessing.get_context('spawn')
+    with context.Manager() as manager:
+        barrier, results = manager.Barrier(2), manager.dict()
+        processes = [context.Process(target=_worker, args=(path, first_id, n_servers, barrier, results))
+                     for first_id in (0, 100)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        results = dict(results)
+
+    ok = len(results) == 2
+    for first_id, (served, repeated, counters) in sorted(results.items()):
+        own = list(range(first_id, first_id + n_servers))
+        print(f"worker {first_id:>3}: served {served}, repeated {repeated}, counters {counters}")
+        # Each worker must see its own servers, and its repeat must be a hit of its own entry
+        ok &= served == own and repeated == own and counters['hits'] == 1
+    return ok
+
+def time_backend(cache, payloads, repeats):
+    """Mean miss (compute and store) and hit latency in microseconds"""
+    value = {'cpu_forecast': np.zeros(1000)}
+    start = time.perf_counter()
+    for payload in payloads:
+        cache.get_or_compute('forecast', payload, 'workload:1', lambda: value)
+    miss = (time.perf_counter() - start) / len(payloads)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for payload in payloads:
+            cache.get_or_compute('forecast', payload, 'workload:1', lambda: value)
+    hit = (time.perf_counter() - start) / (len(payloads) * repeats)
+    return miss * 1e6, hit * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the result cache backends and check that the "
+                                                 "shared backend keeps workers' telemetry apart")
+    parser.add_argument('--entries', type=int, default=200)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        payloads = [{'telemetry': f'token:{i}'} for i in range(args.entries)]
+        print(f"{'backend':>8} {'miss_us':>9} {'hit_us':>9}")
+        for name, backend in (('memory', MemoryCache(args.entries)),
+                              ('sqlite', SqliteCache(os.path.join(directory, 'bench.sqlite'), args.entries))):
+            miss, hit = time_backend(ResultCache(backend), payloads, args.repeats)
+            print(f"{name:>8} {miss:>9.1f} {hit:>9.1f}")
+
+        ok = check_isolation(os.path.join(directory, 'shared.sqlite'))
+    print(f"shared cache isolation: {'ok' if ok else 'FAILED'}")
+    if not ok:
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
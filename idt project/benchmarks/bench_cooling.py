@@ -0,0 +1,72 @@
+import argparse
+import time
+import numpy as np
+from app.models.cooling_optimization import CoolingOptimizationModel
+from app.models.cooling_lut import CoolingLUT
+
+def make_inputs(n, seed=0):
+    """Generate random (temperature, humidity, heat) inputs covering the fuzzy ranges"""
+    rng = np.random.default_rng(seed)
+    temps = rng.uniform(10, 45, n)
+    humidities = rng.uniform(15, 85, n)
+    heats = rng.uniform(0, 100, n)
+    return temps, humidities, heats
+
+def time_call(function, repeats):
+    """Return the median wall time of function() in seconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scalar vs compiled vs lookup-table fuzzy cooling inference")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 100, 10000])
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--grid', type=int, nargs=3, default=[101, 61, 101], help="Lookup table points per axis")
+    args = parser.parse_args()
+    
+    model = CoolingOptimizationModel(mode='exact')
+    start = time.perf_counter()
+    table = CoolingLUT.build(model.engine, tuple(args.grid))
+    print(f"lookup table {tuple(args.grid)}: built in {time.perf_counter() - start:.2f} s, "
+          f"{table.values.nbytes / 1024:.0f} KB, sampled max error {table.sampled_max_error:.3f} levels")
+    
+    print(f"{'inputs':>8} {'scalar_ms':>10} {'compiled_ms':>12} {'speedup':>8} {'identical':>10} "
+          f"{'lut_scalar_ms':>14} {'lut_batch_ms':>13} {'lut_err':>8}")
+    for n in args.sizes:
+        temps, humidities, heats = make_inputs(n)
+        
+        def scalar():
+            return [model._apply_rules(t, h, q) for t, h, q in zip(temps.tolist(), humidities.tolist(), heats.tolist())]
+        
+        def compiled():
+            return model.apply_rules_batch(temps, humidities, heats)
+        
+        expected = scalar()
+        levels, numeric = compiled()
+        identical = (
+            np.array_equal(numeric, np.array([value for _, value in expected], dtype=np.float64))
+            and list(levels) == [level for level, _ in expected]
+        )
+        
+        def lut_scalar():
+            return [table.lookup(t, h, q) for t, h, q in zip(temps.tolist(), humidities.tolist(), heats.tolist())]
+        
+        def lut_batch():
+            return table.evaluate(temps, humidities, heats)
+        
+        lut_error = float(np.max(np.abs(lut_batch()[1] - numeric)))
+        
+        scalar_time = time_call(scalar, args.repeats)
+        compiled_time = time_call(compiled, args.repeats)
+        lut_scalar_time = time_call(lut_scalar, args.repeats)
+        lut_batch_time = time_call(lut_batch, args.repeats)
+        print(f"{n:>8} {scalar_time * 1000:>10.3f} {compiled_time * 1000:>12.3f} "
+              f"{scalar_time / compiled_time:>7.1f}x {str(identical):>10} "
+              f"{lut_scalar_time * 1000:>14.3f} {lut_batch_time * 1000:>13.3f} {lut_error:>8.3f}")
+
+if __name__ == '__main__':
+    main()
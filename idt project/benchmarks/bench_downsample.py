@@ -0,0 +1,79 @@
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from app.history import HistoryStore, STORE_COLUMNS
+from app.downsample import history_series
+
+START = np.datetime64('2023-01-01T00:00:00')
+
+def day_columns(rng, day, server_ids, interval_s=60):
+    """One day of per-minute samples for every server"""
+    times = START + np.timedelta64(day * 86400, 's') + np.arange(86400 // interval_s) * np.timedelta64(interval_s, 's')
+    n_rows = len(times) * len(server_ids)
+    columns = {name: rng.uniform(0, 100, n_rows).astype(np.float32) for name in STORE_COLUMNS[:4]}
+    columns.update(timestamp=np.repeat(times, len(server_ids)), server_id=np.tile(server_ids, len(times)))
+    return columns
+
+def timed(function, repeats):
+    function()
+    timings = []
+    for _ in range(repeats):
+        begin = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - begin)
+    return float(np.median(timings)) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark downsampled history queries over pyramids against raw reads")
+    parser.add_argument('--servers', type=int, default=4)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--points', type=int, default=500)
+    parser.add_argument('--ingest-servers', type=int, default=1000, help="Fleet size of the per-minute ingest comparison")
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    server_ids = np.arange(1, args.servers + 1)
+    with tempfile.TemporaryDirectory() as directory:
+        store = HistoryStore(os.path.join(directory, 'store'))
+        begin = time.perf_counter()
+        for day in range(args.days):
+            store.write(day_columns(rng, day, server_ids))
+        store.flush()
+        print(f"import: {args.servers} servers x {args.days} days in {time.perf_counter() - begin:.1f} s, "
+              f"pyramid levels {store.levels}")
+
+        end = store.end_time()
+        print(f"{'range_h':>8} {'minmax_ms':>10} {'lttb_ms':>8} {'raw_ms':>8} {'points':>7} {'source_s':>9}")
+        for hours in (1, 24, 24 * 30, 24 * args.days):
+            start = end - np.timedelta64(hours * 3600, 's')
+            minmax = timed(lambda: history_series(store, 1, start, end, args.points), args.repeats)
+            lttb = timed(lambda: history_series(store, 1, start, end, args.points, method='lttb'), args.repeats)
+            # The same buckets from raw samples, as without pyramids
+            def raw():
+                _, values = store.read(1, start, end)
+                n_buckets = min(args.points, values.shape[1])
+                buckets = values[0, :values.shape[1] // n_buckets * n_buckets].reshape(n_buckets, -1, len(STORE_COLUMNS))
+                np.nansum(buckets, axis=1) / (~np.isnan(buckets)).sum(axis=1)
+            raw_ms = timed(raw, args.repeats)
+            result = history_series(store, 1, start, end, args.points)
+            print(f"{hours:>8} {minmax:>10.2f} {lttb:>8.2f} {raw_ms:>8.2f} "
+                  f"{len(result['series']['cpu_percent']['timestamp']):>7} {result['source_s']:>9}")
+
+        fleet = np.arange(1, args.ingest_servers + 1)
+        print(f"{'levels':>14} {'write_ms':>9}  ({args.ingest_servers} servers, one sample each)")
+        for levels in ((), store.levels):
+            ingest = HistoryStore(os.path.join(directory, f'ingest{len(levels)}'), levels=levels,
+                                  max_open=4 * args.ingest_servers)
+            minute = iter(range(10 ** 6))
+            def write():
+                columns = {name: rng.uniform(0, 100, len(fleet)) for name in STORE_COLUMNS[:4]}
+                columns.update(server_id=fleet, timestamp=np.repeat(START + np.timedelta64(next(minute) * 60, 's'),
+                                                                   len(fleet)))
+                ingest.write(columns)
+            print(f"{str(list(levels)):>14} {timed(write, args.repeats):>9.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+import argparse
+import json
+import time
+import numpy as np
+from app.control import forecast_points
+from app.encoding import compress, encode_body, unpackb
+
+def time_call(function, repeats):
+    """Return the median wall time of function() in seconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+def forecast_columns(n_servers, hours, seed=0):
+    """Long-format forecast columns as cached by /api/workload/forecast"""
+    rng = np.random.default_rng(seed)
+    n_points = n_servers * hours
+    return {
+        'server_id': np.repeat(np.arange(1, n_servers + 1), hours),
+        'time_offset': np.tile(np.arange(1, hours + 1), n_servers),
+        'cpu_forecast': np.round(rng.uniform(0, 100, n_points), 1),
+        'memory_forecast': np.round(rng.uniform(0, 100, n_points), 1),
+        'io_forecast': np.round(rng.uniform(0, 100, n_points), 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark forecast payload size and serialization time per encoding")
+    parser.add_argument('--servers', type=int, nargs='+', default=[500, 5000])
+    parser.add_argument('--hours', type=int, default=24)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'servers':>8} {'form':>8} {'bytes':>10} {'encode_ms':>10} {'gzip_bytes':>11} {'gzip_ms':>8} {'decode_ms':>10}")
+    for n_servers in args.servers:
+        columns = forecast_columns(n_servers, args.hours)
+        encoders = {
+            # The per-point form as served before: build the row dicts, then serialize them
+            'json': lambda: encode_body(forecast_points(columns), 'json')[0],
+            'columns': lambda: encode_body(columns, 'columns')[0],
+            'msgpack': lambda: encode_body(columns, 'msgpack')[0]
+        }
+        for form, encode in encoders.items():
+            body = encode()
+            encode_time = time_call(encode, args.repeats)
+            compressed = compress(body, 'gzip')
+            gzip_time = time_call(lambda: compress(body, 'gzip'), args.repeats)
+            decode = unpackb if form == 'msgpack' else json.loads
+            decode_time = time_call(lambda: decode(body), args.repeats)
+            print(f"{n_servers:>8} {form:>8} {len(body):>10} {encode_time * 1000:>10.2f} "
+                  f"{len(compressed):>11} {gzip_time * 1000:>8.2f} {decode_time * 1000:>10.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+import argparse
+import time
+import numpy as np
+from app.models.workload_forecasting import WorkloadForecastingModel
+
+def make_windows(n_servers, lookback, n_features, seed=0):
+    """Generate random feature windows in the 0-100 range"""
+    rng = np.random.default_rng(seed)
+    return rng.uniform(0, 100, size=(n_servers, lookback, n_features)).astype(np.float32)
+
+def bench(model, n_servers, batch_size, repeats):
+    """Time predict_batch for a fleet of n_servers, returns (median seconds, servers/s)"""
+    windows = make_windows(n_servers, model.lookback, model.n_features)
+    
+    # Warm up kernels before timing
+    model.predict_batch(windows, batch_size=batch_size)
+    
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict_batch(windows, batch_size=batch_size)
+        timings.append(time.perf_counter() - start)
+    
+    latency = float(np.median(timings))
+    return latency, n_servers / latency
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched workload forecasting")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[4, 500, 5000])
+    parser.add_argument('--batch-size', type=int, default=1024)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+    
+    model = WorkloadForecastingModel(batch_size=args.batch_size)
+    
+    print(f"model horizon: {model.forecast_horizon} hours per forward pass, quantiles: {model.quantiles}")
+    print(f"{'servers':>8} {'latency_ms':>12} {'servers_per_s':>14}")
+    for n_servers in args.sizes:
+        latency, throughput = bench(model, n_servers, args.batch_size, args.repeats)
+        print(f"{n_servers:>8} {latency * 1000:>12.2f} {throughput:>14.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from app.history import HistoryStore, import_csv
+
+def write_fleet_csv(path, n_servers, days, interval_s=60, seed=0):
+    """Write per-minute telemetry for a synthetic fleet in the sample_workload.csv schema"""
+    rng = np.random.default_rng(seed)
+    steps_per_day = 86400 // interval_s
+    start = np.datetime64('2023-10-01T00:00:00')
+    for day in range(days):
+        times = start + np.timedelta64(day * 86400, 's') + np.arange(steps_per_day) * np.timedelta64(interval_s, 's')
+        n_rows = steps_per_day * n_servers
+        frame = pd.DataFrame({
+            'timestamp': np.repeat(times, n_servers),
+            'server_id': np.tile(np.arange(1, n_servers + 1), steps_per_day),
+            'cpu_percent': rng.uniform(0, 100, n_rows).round(1),
+            'memory_percent': rng.uniform(0, 100, n_rows).round(1),
+            'io_percent': rng.uniform(0, 100, n_rows).round(1),
+            'temperature': rng.uniform(20, 50, n_rows).round(1),
+            'status': np.where(rng.random(n_rows) < 0.9, 'active', 'hibernating')
+        })
+        frame.to_csv(path, mode='w' if day == 0 else 'a', header=day == 0, index=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark history store import and memory-mapped reads")
+    parser.add_argument('--servers', type=int, default=200)
+    parser.add_argument('--days', type=int, default=2)
+    parser.add_argument('--hours', type=float, nargs='+', default=[1, 24])
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, 'fleet.csv')
+        write_fleet_csv(csv_path, args.servers, args.days)
+        size_mb = os.path.getsize(csv_path) / (1024 * 1024)
+        
+        store = HistoryStore(os.path.join(directory, 'store'), resolution=60)
+        start = time.perf_counter()
+        samples = import_csv(csv_path, store, chunk_rows=500_000)
+        elapsed = time.perf_counter() - start
+        print(f"import: {samples} samples ({size_mb:.0f} MB CSV) in {elapsed:.2f} s ({samples / elapsed:,.0f} samples/s)")
+        
+        print(f"{'hours':>6} {'servers':>8} {'read_ms':>9}")
+        for hours in args.hours:
+            for n_servers in (1, min(100, args.servers)):
+                server_ids = np.arange(1, n_servers + 1)
+                store.last(server_ids, hours)
+                timings = []
+                for _ in range(args.repeats):
+                    begin = time.perf_counter()
+                    store.last(server_ids, hours)
+                    timings.append(time.perf_counter() - begin)
+                print(f"{hours:>6g} {n_servers:>8} {np.median(timings) * 1000:>9.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+import argparse
+import threading
+import time
+from app.metrics import Histogram, MetricsRegistry
+
+def observe_rate(histogram, n_threads, observations):
+    """Observations per second with n_threads threads updating the same label set"""
+    def worker():
+        child = histogram.labels('/api/workload/forecast', 'GET', '200')
+        for i in range(observations):
+            child.observe(0.0001 * (i % 100))
+
+    threads = [threading.Thread(target=worker) for _ in range(n_threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return n_threads * observations / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark metric update and scrape cost")
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--observations', type=int, default=200_000)
+    parser.add_argument('--label-sets', type=int, default=200,
+                        help="Distinct label sets rendered by the scrape")
+    args = parser.parse_args()
+
+    print(f"{'threads':>8} {'observations/s':>15} {'us/observation':>15} {'total_count':>12}")
+    for n_threads in args.threads:
+        histogram = Histogram('bench_seconds', 'Benchmark', ('route', 'method', 'status'))
+        rate = observe_rate(histogram, n_threads, args.observations)
+        counts, _ = histogram.labels('/api/workload/forecast', 'GET', '200').snapshot()
+        print(f"{n_threads:>8} {rate:>15.0f} {1e6 / rate:>15.3f} {sum(counts):>12}")
+
+    registry = MetricsRegistry()
+    histogram = registry.histogram('bench_seconds', 'Benchmark', ('route', 'method', 'status'))
+    for i in range(args.label_sets):
+        histogram.labels(f'/route/{i}', 'GET', '200').observe(0.01)
+    start = time.perf_counter()
+    text = registry.render()
+    print(f"\nscrape of {args.label_sets} label sets: {(time.perf_counter() - start) * 1000:.2f} ms, "
+          f"{len(text) / 1024:.0f} KB")
+
+if __name__ == '__main__':
+    main()
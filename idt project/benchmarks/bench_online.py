@@ -0,0 +1,60 @@
+import argparse
+import time
+import numpy as np
+from app.models.online import OnlineUpdater
+from app.models.workload_forecasting import WorkloadForecastingModel
+from app.registry import ModelRegistry
+from app.telemetry import TelemetryBuffer, FEATURE_COLUMNS
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark online forecaster updates on simulated telemetry")
+    parser.add_argument('--servers', type=int, default=1000)
+    parser.add_argument('--ticks', type=int, default=60, help="Telemetry batches (one sample per server) after warmup")
+    parser.add_argument('--steps', type=int, default=20)
+    parser.add_argument('--updates', type=int, default=3)
+    args = parser.parse_args()
+    
+    registry = ModelRegistry()
+    registry.register('workload', WorkloadForecastingModel)
+    forecaster = registry.get('workload')
+    telemetry = TelemetryBuffer(capacity=args.servers)
+    updater = OnlineUpdater(registry, steps=args.steps)
+    
+    rng = np.random.default_rng(0)
+    server_ids = np.arange(1, args.servers + 1)
+    level = rng.uniform(20, 80, (args.servers, len(FEATURE_COLUMNS))).astype(np.float32)
+    
+    def tick():
+        return np.clip(level + rng.normal(0, 5, level.shape), 0, 100).astype(np.float32)
+    
+    for _ in range(telemetry.lookback):
+        telemetry.ingest(server_ids, tick())
+    
+    collect_seconds = []
+    for _ in range(args.ticks):
+        features = tick()
+        start = time.perf_counter()
+        updater.collect(telemetry, server_ids, features)
+        collect_seconds.append(time.perf_counter() - start)
+        telemetry.ingest(server_ids, features)
+    print(f"collect: {np.median(collect_seconds) * 1000:.2f} ms per {args.servers}-server batch")
+    
+    for _ in range(args.updates):
+        before = registry.version('workload')
+        result = updater.update()
+        if result is None:
+            break
+        print(f"update: {result} ({before} -> {registry.version('workload')})")
+        for _ in range(args.ticks):
+            features = tick()
+            updater.collect(telemetry, server_ids, features)
+            telemetry.ingest(server_ids, features)
+    
+    swapped = registry.get('workload')
+    _, windows = telemetry.windows()
+    change = np.abs(swapped.predict_batch(windows)['cpu_forecast'] - forecaster.predict_batch(windows)['cpu_forecast'])
+    print(f"serving model swapped: {swapped is not forecaster}, mean forecast change {change.mean():.2f} points")
+    print(f"stats: {updater.stats()}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from app.models.numpy_runtime import NumpyModel, export_keras_model
+from app.models.workload_forecasting import build_network
+from app.models.resource_allocation import build_policy_network
+
+def median_time(function, repeats):
+    """Median wall time of function() in seconds after one warmup call"""
+    function()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+def compare(name, keras_model, input_shape, batch_sizes, repeats, export_path, tolerance):
+    """Check NumPy/Keras parity and print latency for each batch size"""
+    export_keras_model(keras_model, export_path)
+    numpy_model = NumpyModel.load(export_path)
+    rng = np.random.default_rng(0)
+    
+    print(f"\n{name}")
+    print(f"{'batch':>6} {'keras_ms':>10} {'numpy_ms':>10} {'max_abs_err':>12}")
+    for batch_size in batch_sizes:
+        x = rng.uniform(0, 1, (batch_size,) + input_shape).astype(np.float32)
+        expected = np.asarray(keras_model(x, training=False))
+        actual = numpy_model(x)
+        error = float(np.max(np.abs(expected - actual)))
+        if error > tolerance:
+            raise AssertionError(f"{name}: NumPy runtime differs from Keras by {error:.2e}")
+        
+        keras_time = median_time(lambda: keras_model(x, training=False), repeats)
+        numpy_time = median_time(lambda: numpy_model(x), repeats)
+        print(f"{batch_size:>6} {keras_time * 1000:>10.3f} {numpy_time * 1000:>10.3f} {error:>12.2e}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Parity and latency of the NumPy runtime vs Keras")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 64, 1024])
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--tolerance', type=float, default=1e-4)
+    parser.add_argument('--horizon', type=int, default=24, help="Hours of the multi-horizon heads")
+    parser.add_argument('--quantiles', type=float, nargs='+', default=[0.1, 0.5, 0.9])
+    args = parser.parse_args()
+    
+    export_dir = tempfile.mkdtemp()
+    
+    # Freshly built networks with the serving architectures, so the check needs no saved artifacts
+    lookback, n_features = 24, 7
+    networks = [
+        ('workload_forecast_model', build_network(lookback, n_features), (lookback, n_features)),
+        (f'workload_forecast_model horizon={args.horizon}',
+         build_network(lookback, n_features, args.horizon), (lookback, n_features)),
+        (f'workload_forecast_model horizon={args.horizon} quantiles={args.quantiles}',
+         build_network(lookback, n_features, args.horizon, args.quantiles), (lookback, n_features)),
+        ('resource_allocation_model', build_policy_network(), (12,))
+    ]
+    for i, (name, model, input_shape) in enumerate(networks):
+        compare(name, model, input_shape, args.batch_sizes, args.repeats,
+                os.path.join(export_dir, f'model_{i}.npz'), args.tolerance)
+
+if __name__ == '__main__':
+    main()
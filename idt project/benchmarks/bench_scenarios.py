@@ -0,0 +1,67 @@
+import argparse
+import time
+import numpy as np
+from app.control import fleet_status
+from app.registry import ModelRegistry
+from app.scenarios import ScenarioRunner, fleet_baseline, scenario_grid
+from app.telemetry import TelemetryBuffer, build_features
+from app.models.resource_allocation import ResourceAllocationModel
+from app.models.cooling_optimization import CoolingOptimizationModel
+from app.models.dummy_models import DummyResourceModel, DummyCoolingModel
+from benchmarks.fleet import make_fleet
+
+def sweep(n_servers, n_scenarios):
+    """A grid of about n_scenarios combinations: 10 load scales x 4 server ranges x temperature offsets"""
+    quarter = max(1, n_servers // 4)
+    return {
+        'load_scale': np.linspace(0.5, 1.5, 10).tolist(),
+        'servers': [None, [1, quarter], [quarter + 1, 2 * quarter], [n_servers - quarter + 1, n_servers]],
+        'temperature_offset': np.linspace(-2, 6, max(1, n_scenarios // 40)).tolist()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark what-if scenario sweeps against fleet and grid size")
+    parser.add_argument('--servers', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--scenarios', type=int, nargs='+', default=[100, 10000])
+    parser.add_argument('--workers', type=int, default=0, help="Worker processes (0 runs in-process)")
+    parser.add_argument('--chunk-rows', type=int, default=1000000)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    registry = ModelRegistry()
+    registry.register('resource', ResourceAllocationModel, DummyResourceModel)
+    registry.register('cooling', CoolingOptimizationModel, DummyCoolingModel)
+    registry.warmup()
+    runner = ScenarioRunner(registry, args.workers, args.chunk_rows)
+
+    print(f"{'servers':>8} {'scenarios':>10} {'sweep_ms':>10} {'scenarios_per_s':>16} {'evaluations_per_s':>18}")
+    for n_servers in args.servers:
+        frame = make_fleet(n_servers, 2)
+        latest = frame[frame['timestamp'] == frame['timestamp'].iloc[-1]]
+        forecast = {
+            'server_id': latest['server_id'].to_numpy(),
+            'cpu_forecast': latest['cpu_percent'].to_numpy(),
+            'memory_forecast': latest['memory_percent'].to_numpy(),
+            'io_forecast': latest['io_percent'].to_numpy()
+        }
+        telemetry = TelemetryBuffer(capacity=n_servers)
+        columns = {name: frame[name].to_numpy() for name in frame.columns}
+        telemetry.ingest(columns['server_id'], build_features(columns))
+        baseline = fleet_baseline(forecast, fleet_status(telemetry))
+
+        for n_scenarios in args.scenarios:
+            scenarios = scenario_grid(sweep(n_servers, n_scenarios), baseline['server_id'])
+            count = len(scenarios['load_scale'])
+            runner.run(baseline, scenarios)
+            timings = []
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                runner.run(baseline, scenarios)
+                timings.append(time.perf_counter() - start)
+            elapsed = float(np.median(timings))
+            print(f"{n_servers:>8} {count:>10} {elapsed * 1000:>10.1f} {count / elapsed:>16.0f} "
+                  f"{count * n_servers / elapsed:>18.0f}")
+    runner.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+import argparse
+import http.client
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+import numpy as np
+
+def _client(host, port, path, deadline, latencies, statuses):
+    """Issue requests on one keep-alive connection until the deadline"""
+    connection = http.client.HTTPConnection(host, port, timeout=60)
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        connection.request('GET', path)
+        response = connection.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        statuses.append(response.status)
+    connection.close()
+
+def _ingest(host, port, n_servers, lookback=24):
+    """Post a full lookback window of random telemetry for n_servers servers"""
+    rng = np.random.default_rng(0)
+    n_samples = n_servers * lookback
+    hours = np.repeat(np.arange(lookback), n_servers)
+    columns = {
+        'timestamp': [f"2023-01-01 {hour:02d}:00:00" for hour in hours],
+        'server_id': np.tile(np.arange(1, n_servers + 1), lookback).tolist(),
+        'cpu_percent': rng.uniform(0, 100, n_samples).round(1).tolist(),
+        'memory_percent': rng.uniform(0, 100, n_samples).round(1).tolist(),
+        'io_percent': rng.uniform(0, 100, n_samples).round(1).tolist(),
+        'temperature': rng.uniform(20, 50, n_samples).round(1).tolist(),
+        'is_active': [1] * n_samples
+    }
+    connection = http.client.HTTPConnection(host, port, timeout=60)
+    connection.request('POST', '/api/telemetry', json.dumps(columns), {'Content-Type': 'application/json'})
+    print(f"Ingested telemetry: {connection.getresponse().read().decode('utf-8')}")
+    connection.close()
+
+def _run_load(host, port, path, concurrency, duration):
+    """Run concurrency clients for duration seconds, returns latency percentiles and throughput"""
+    latencies, statuses = [], []
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=_client, args=(host, port, path, deadline, latencies, statuses))
+        for _ in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    # Latencies count successful responses only; anything else is a failure
+    statuses = np.array(statuses)
+    latencies = np.array(latencies)[statuses == 200] * 1000
+    return {
+        'requests_per_s': len(latencies) / elapsed,
+        'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else float('nan'),
+        'p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else float('nan'),
+        'rejected': int(np.sum(statuses == 503)),
+        'failed': int(np.sum((statuses != 200) & (statuses != 503)))
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test of /api/workload/forecast")
+    parser.add_argument('--url', help="Server to test, e.g. http://localhost:5000 (default: in-process threaded server)")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16, 64])
+    parser.add_argument('--servers', type=int, default=500)
+    parser.add_argument('--duration', type=float, default=5.0)
+    args = parser.parse_args()
+
+    modes = [('server', None)]
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        # Every request must reach the model, so the result cache is disabled
+        os.environ['RESULT_CACHE'] = 'off'
+        from werkzeug.serving import WSGIRequestHandler, make_server
+        import wsgi
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        server = make_server('127.0.0.1', 0, wsgi.app, threaded=True, request_handler=QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = '127.0.0.1', server.server_port
+        batcher = wsgi.server.forecast_batcher
+        # Baseline: every request runs its own forward pass on the request thread
+        direct = lambda windows, key=None: wsgi.server.registry.get('workload').predict_steps(windows)
+        modes = [('direct', direct), ('batched', batcher)]
+
+    _ingest(host, port, args.servers)
+
+    print(f"{'mode':>10} {'clients':>8} {'req_per_s':>10} {'p50_ms':>8} {'p99_ms':>8} {'rejected':>9} {'failed':>7}")
+    for mode, forecaster in modes:
+        if forecaster is not None:
+            wsgi.server.forecast_batcher = forecaster
+        for concurrency in args.concurrency:
+            result = _run_load(host, port, '/api/workload/forecast', concurrency, args.duration)
+            print(f"{mode:>10} {concurrency:>8} {result['requests_per_s']:>10.1f} "
+                  f"{result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} {result['rejected']:>9} {result['failed']:>7}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import os
+import time
+import numpy as np
+from app.control import ControlLoop
+from app.registry import ModelRegistry
+from app.sharding import ShardedControlLoop
+from app.telemetry import TelemetryBuffer, build_features
+from app.models.workload_forecasting import WorkloadForecastingModel
+from app.models.resource_allocation import ResourceAllocationModel
+from app.models.cooling_optimization import CoolingOptimizationModel
+from app.models.dummy_models import DummyWorkloadModel, DummyResourceModel, DummyCoolingModel
+from benchmarks.fleet import make_fleet
+
+def time_cycles(loop, repeats):
+    """Median run_cycle wall time in seconds and the timings of the last cycle, after one warm-up cycle"""
+    loop.run_cycle()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = loop.run_cycle()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)), result['timings_ms']
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark control cycle throughput against the number of shards")
+    parser.add_argument('--servers', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--shards', type=int, nargs='+', default=[2, 4],
+                        help="Shard counts to compare against the in-process loop")
+    parser.add_argument('--hours', type=int, default=30)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--start-method', default='spawn')
+    args = parser.parse_args()
+
+    registry = ModelRegistry()
+    registry.register('workload', WorkloadForecastingModel, DummyWorkloadModel)
+    registry.register('resource', ResourceAllocationModel, DummyResourceModel)
+    registry.register('cooling', CoolingOptimizationModel, DummyCoolingModel)
+    registry.warmup()
+
+    print(f"cpu_count={os.cpu_count()}")
+    print(f"{'servers':>8} {'shards':>7} {'cycle_ms':>10} {'servers_per_s':>14} {'speedup':>8} {'scatter_ms':>11} {'merge_ms':>9}")
+    for n_servers in args.servers:
+        frame = make_fleet(n_servers, args.hours)
+        telemetry = TelemetryBuffer(capacity=n_servers)
+        columns = {name: frame[name].to_numpy() for name in frame.columns}
+        telemetry.ingest(columns['server_id'], build_features(columns))
+
+        baseline, _ = time_cycles(ControlLoop(registry, telemetry), args.repeats)
+        print(f"{n_servers:>8} {'-':>7} {baseline * 1000:>10.1f} {n_servers / baseline:>14.0f} {1.0:>8.2f}")
+        for n_shards in args.shards:
+            loop = ShardedControlLoop(registry, telemetry, n_shards, args.start_method)
+            try:
+                loop.start()
+                elapsed, timings = time_cycles(loop, args.repeats)
+            finally:
+                loop.close()
+            print(f"{n_servers:>8} {n_shards:>7} {elapsed * 1000:>10.1f} {n_servers / elapsed:>14.0f} "
+                  f"{baseline / elapsed:>8.2f} {timings['scatter']:>11.2f} {timings['merge']:>9.2f}")
+
+if __name__ == '__main__':
+    main()
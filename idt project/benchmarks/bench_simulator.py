@@ -0,0 +1,31 @@
+import argparse
+import time
+import numpy as np
+from app.models.simulator import DatacenterEnv, synthetic_traces
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized datacenter simulator")
+    parser.add_argument('--fleets', type=int, nargs='+', default=[1, 256, 4096])
+    parser.add_argument('--steps', type=int, default=240)
+    args = parser.parse_args()
+    
+    traces = synthetic_traces(512, 24 * 28)
+    rng = np.random.default_rng(0)
+    
+    print(f"{'fleets':>7} {'step_ms':>8} {'simulated_hours_per_s':>22} {'mean_kwh':>9} {'mean_sla':>9}")
+    for n_envs in args.fleets:
+        env = DatacenterEnv(traces, n_envs=n_envs)
+        # Random action codes so every branch of the dynamics is exercised
+        codes = rng.integers(0, 4, (args.steps, n_envs, env.n_servers))
+        energy, sla = [], []
+        start = time.perf_counter()
+        for step_codes in codes:
+            _, _, _, info = env.step(step_codes)
+            energy.append(info['energy_kwh'].mean())
+            sla.append(info['sla_violation'].mean())
+        elapsed = time.perf_counter() - start
+        print(f"{n_envs:>7} {elapsed / args.steps * 1000:>8.3f} {n_envs * args.steps / elapsed:>22,.0f} "
+              f"{np.mean(energy):>9.3f} {np.mean(sla):>9.3f}")
+
+if __name__ == '__main__':
+    main()
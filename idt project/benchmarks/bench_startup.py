@@ -0,0 +1,48 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Runs inside a fresh interpreter: import app.py, optionally serve one request
+CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+import wsgi
+imported = time.perf_counter() - start
+from app.registry import current_rss_bytes
+result = {'import_s': imported, 'rss_mb': current_rss_bytes() / 2**20,
+          'tensorflow_imported': 'tensorflow' in sys.modules}
+if sys.argv[1] == '1':
+    client = wsgi.app.test_client()
+    start = time.perf_counter()
+    client.get('/api/workload/forecast')
+    result['first_request_s'] = time.perf_counter() - start
+    result['rss_after_request_mb'] = current_rss_bytes() / 2**20
+print(json.dumps(result))
+'''
+
+def run(preload, first_request):
+    """Start a fresh interpreter and return its startup measurements"""
+    env = dict(os.environ, PRELOAD_MODELS='1' if preload else '0', TF_CPP_MIN_LOG_LEVEL='3')
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD, '1' if first_request else '0'],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold start time and RSS of the Flask app")
+    parser.parse_args()
+    
+    for label, preload in (('eager (PRELOAD_MODELS=1)', True), ('lazy', False)):
+        result = run(preload, first_request=False)
+        print(f"{label:>26}: import {result['import_s']:.2f} s, RSS {result['rss_mb']:.0f} MB, "
+              f"tensorflow imported: {result['tensorflow_imported']}")
+    
+    result = run(False, first_request=True)
+    print(f"{'lazy + first forecast':>26}: first request {result['first_request_s']:.2f} s, "
+          f"RSS {result['rss_after_request_mb']:.0f} MB")
+
+if __name__ == '__main__':
+    main()
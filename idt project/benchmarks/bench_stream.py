@@ -0,0 +1,75 @@
+import argparse
+import threading
+import time
+import numpy as np
+from app.control import ControlLoop
+from app.models.cooling_optimization import CoolingOptimizationModel
+from app.models.resource_allocation import ResourceAllocationModel
+from app.models.workload_forecasting import WorkloadForecastingModel
+from app.registry import ModelRegistry
+from app.streaming import StreamHub
+from app.telemetry import TelemetryBuffer
+
+def _consume(hub, counts, index, stop):
+    """One simulated dashboard: read messages until stopped"""
+    for message in hub.subscribe():
+        counts[index] += len(message)
+        if stop.is_set():
+            break
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the /api/stream producer with many subscribers")
+    parser.add_argument('--subscribers', type=int, nargs='+', default=[1, 50, 500])
+    parser.add_argument('--servers', type=int, default=500)
+    parser.add_argument('--ticks', type=int, default=20)
+    args = parser.parse_args()
+
+    registry = ModelRegistry()
+    registry.register('workload', WorkloadForecastingModel)
+    registry.register('resource', ResourceAllocationModel)
+    registry.register('cooling', CoolingOptimizationModel)
+    registry.warmup()
+
+    rng = np.random.default_rng(0)
+    telemetry = TelemetryBuffer(capacity=args.servers)
+    features = rng.uniform(0, 100, (args.servers * telemetry.lookback, telemetry.n_features)).astype(np.float32)
+    telemetry.ingest(np.tile(np.arange(1, args.servers + 1), telemetry.lookback), features)
+
+    print(f"{'subscribers':>11} {'tick_ms':>8} {'cpu_ms_per_tick':>16} {'bytes_per_client':>17}")
+    for n_subscribers in args.subscribers:
+        # The producer ticks once when subscribers join and then idles; later ticks are driven below
+        hub = StreamHub(ControlLoop(registry, telemetry), interval=3600, keepalive=1.0)
+        hub.tick()
+
+        counts = [0] * n_subscribers
+        stop = threading.Event()
+        threads = [
+            threading.Thread(target=_consume, args=(hub, counts, i, stop), daemon=True)
+            for i in range(n_subscribers)
+        ]
+        for thread in threads:
+            thread.start()
+        while hub.subscribers < n_subscribers:
+            time.sleep(0.01)
+
+        tick_times = []
+        cpu_start = time.process_time()
+        for _ in range(args.ticks):
+            # New readings each tick so every delta carries changed rows
+            telemetry.ingest(np.arange(1, args.servers + 1), rng.uniform(0, 100, (args.servers, telemetry.n_features)))
+            start = time.perf_counter()
+            hub.tick()
+            tick_times.append(time.perf_counter() - start)
+            time.sleep(0.05)
+        cpu_per_tick = (time.process_time() - cpu_start) / args.ticks
+
+        stop.set()
+        hub.stop()
+        for thread in threads:
+            thread.join(timeout=2.0)
+
+        print(f"{n_subscribers:>11} {np.median(tick_times) * 1000:>8.2f} "
+              f"{cpu_per_tick * 1000:>16.2f} {np.mean(counts):>17.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+import argparse
+import time
+import numpy as np
+from app.telemetry import TelemetryBuffer, FEATURE_COLUMNS
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark telemetry ring-buffer ingestion")
+    parser.add_argument('--servers', type=int, default=5000)
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--batches', type=int, default=100)
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(0)
+    buffer = TelemetryBuffer(capacity=args.servers)
+    
+    # Pre-generate batches so only ingestion is timed
+    batches = [
+        (rng.integers(1, args.servers + 1, args.batch_size),
+         rng.uniform(0, 100, (args.batch_size, len(FEATURE_COLUMNS))).astype(np.float32))
+        for _ in range(args.batches)
+    ]
+    
+    start = time.perf_counter()
+    for server_ids, features in batches:
+        buffer.ingest(server_ids, features)
+    elapsed = time.perf_counter() - start
+    samples = args.batch_size * args.batches
+    print(f"ingest: {samples} samples in {elapsed:.3f} s ({samples / elapsed:,.0f} samples/s)")
+    
+    start = time.perf_counter()
+    server_ids, windows = buffer.windows()
+    elapsed = time.perf_counter() - start
+    print(f"windows: {windows.shape} in {elapsed * 1000:.2f} ms (gathered)")
+    
+    # Aligned fleet-wide ticks give a zero-copy view
+    aligned = TelemetryBuffer(capacity=args.servers)
+    tick_ids = np.arange(1, args.servers + 1)
+    for _ in range(aligned.lookback):
+        aligned.ingest(tick_ids, rng.uniform(0, 100, (args.servers, len(FEATURE_COLUMNS))))
+    start = time.perf_counter()
+    server_ids, windows = aligned.windows()
+    elapsed = time.perf_counter() - start
+    print(f"windows: {windows.shape} in {elapsed * 1000:.3f} ms (copy)")
+    with aligned.lock:
+        start = time.perf_counter()
+        server_ids, windows = aligned.windows(copy=False)
+        elapsed = time.perf_counter() - start
+        print(f"windows: {windows.shape} in {elapsed * 1000:.3f} ms "
+              f"(zero-copy view under the lock: {np.shares_memory(windows, aligned._data)})")
+
+if __name__ == '__main__':
+    main()
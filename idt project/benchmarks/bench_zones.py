@@ -0,0 +1,45 @@
+import argparse
+import time
+import numpy as np
+from app.models.cooling_optimization import CoolingOptimizationModel
+from app.models.cooling_zones import CoolingTopology
+
+def time_call(function, repeats):
+    """Return the median wall time of function() in seconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hierarchical per-zone cooling optimization")
+    parser.add_argument('--racks', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--servers-per-rack', type=int, default=20)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+    
+    model = CoolingOptimizationModel()
+    rng = np.random.default_rng(0)
+    
+    print(f"{'racks':>7} {'aisles':>7} {'rooms':>6} {'servers':>8} {'rack_inputs_ms':>15} {'zones_ms':>9} {'total_ms':>9}")
+    for n_racks in args.racks:
+        topology = CoolingTopology.grid(n_racks, servers_per_rack=args.servers_per_rack)
+        n_servers = n_racks * args.servers_per_rack
+        server_ids = np.arange(1, n_servers + 1)
+        temperature = rng.uniform(20, 45, n_servers)
+        cpu = rng.uniform(0, 100, n_servers)
+        memory = rng.uniform(0, 100, n_servers)
+        humidity = rng.uniform(30, 60, topology.n_rooms)
+        
+        rack_temperature, rack_heat = topology.rack_inputs(server_ids, temperature, cpu, memory)
+        inputs_time = time_call(lambda: topology.rack_inputs(server_ids, temperature, cpu, memory), args.repeats)
+        zones_time = time_call(
+            lambda: model.optimize_zones(topology, rack_temperature, rack_heat, humidity), args.repeats
+        )
+        print(f"{n_racks:>7} {topology.n_aisles:>7} {topology.n_rooms:>6} {n_servers:>8} "
+              f"{inputs_time * 1000:>15.2f} {zones_time * 1000:>9.2f} {(inputs_time + zones_time) * 1000:>9.2f}")
+
+if __name__ == '__main__':
+    main()
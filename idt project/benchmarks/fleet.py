@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+from app.telemetry import TELEMETRY_COLUMNS, TelemetryBuffer, build_features
+
+def make_fleet(n_servers, hours=24, seed=0, start='2023-10-01T00:00:00'):
+    """
+    Hourly telemetry for a synthetic fleet in the sample_workload.csv schema
+
+    Every server has its own base load and a daily cycle with noise; lightly
+    loaded servers hibernate, as in the sample data.
+
+    Returns:
+        DataFrame with the TELEMETRY_COLUMNS, ordered by timestamp then server_id
+    """
+    rng = np.random.default_rng(seed)
+    hour = np.arange(hours)[:, None]
+    shape = (hours, n_servers)
+
+    daily = 20 * np.sin(2 * np.pi * (hour - rng.uniform(0, 24, n_servers)) / 24)
+    cpu = np.clip(rng.uniform(10, 70, n_servers) + daily + rng.normal(0, 5, shape), 0, 100)
+    memory = np.clip(0.6 * cpu + rng.uniform(10, 30, n_servers) + rng.normal(0, 3, shape), 0, 100)
+    io = np.clip(rng.gamma(2.0, 12.0, shape), 0, 100)
+    temperature = 24 + 0.2 * cpu + rng.normal(0, 1.5, shape)
+
+    times = pd.date_range(start, periods=hours, freq='h').strftime('%Y-%m-%d %H:%M:%S').to_numpy()
+    frame = pd.DataFrame({
+        'timestamp': np.repeat(times, n_servers),
+        'server_id': np.tile(np.arange(1, n_servers + 1), hours),
+        'cpu_percent': cpu.ravel().round(1),
+        'memory_percent': memory.ravel().round(1),
+        'io_percent': io.ravel().round(1),
+        'temperature': temperature.ravel().round(1),
+        'status': np.where(cpu.ravel() < 15, 'hibernating', 'active')
+    })
+    return frame[TELEMETRY_COLUMNS]
+
+def fleet_windows(frame, lookback=24):
+    """Latest (server_ids, windows) of a fleet frame, as the forecaster receives them"""
+    buffer = TelemetryBuffer(capacity=int(frame['server_id'].nunique()), lookback=lookback)
+    columns = {name: frame[name].to_numpy() for name in frame.columns}
+    buffer.ingest(columns['server_id'], build_features(columns))
+    server_ids, windows = buffer.windows()
+    return server_ids, np.array(windows)
+
+def fleet_servers(frame, humidity=45):
+    """Latest reading of every server as an /api/cooling/optimize request body"""
+    latest = frame[frame['timestamp'] == frame['timestamp'].iloc[-1]]
+    return {
+        'servers': [
+            {'id': int(server_id), 'temperature': float(temperature), 'cpu': float(cpu), 'memory': float(memory)}
+            for server_id, temperature, cpu, memory in zip(
+                latest['server_id'], latest['temperature'], latest['cpu_percent'], latest['memory_percent']
+            )
+        ],
+        'cooling': {'humidity': humidity}
+    }
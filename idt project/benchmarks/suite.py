@@ -0,0 +1,165 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+from benchmarks.fleet import fleet_servers, fleet_windows, make_fleet
+
+# 40 what-if scenarios for POST /api/scenarios
+SCENARIO_GRID = {'load_scale': [0.8, 1.0, 1.2, 1.4, 1.6], 'humidity': [40, 55, 70, 85], 'temperature_offset': [0, 3]}
+
+def time_call(function, repeats):
+    """Wall times of repeats calls of function() in seconds, after one warm-up call"""
+    function()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def summarize(name, kind, n_servers, timings, **extra):
+    timings_ms = np.asarray(timings) * 1000
+    return dict(
+        name=name, kind=kind, servers=n_servers, repeats=len(timings),
+        median_ms=round(float(np.median(timings_ms)), 3),
+        p95_ms=round(float(np.percentile(timings_ms, 95)), 3),
+        min_ms=round(float(timings_ms.min()), 3),
+        **extra
+    )
+
+def environment():
+    """Versions and settings that affect timings, recorded with every run"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                timeout=10).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'commit': commit,
+        'settings': {name: os.environ.get(name) for name in
+                     ('MODEL_RUNTIME', 'COOLING_MODE', 'RESULT_CACHE', 'PROFILE_SLOW_MS')}
+    }
+
+def bench_models(registry, frame, n_servers, repeats):
+    """Time predict, decide and optimize on one fleet"""
+    workload = registry.get('workload')
+    resource = registry.get('resource')
+    cooling = registry.get('cooling')
+    _, windows = fleet_windows(frame, getattr(workload, 'lookback', 24))
+    workload_data = workload.predict(windows)
+    server_data = fleet_servers(frame)
+
+    cases = [
+        ('workload.predict', workload, lambda: workload.predict(windows)),
+        ('resource.decide', resource, lambda: resource.decide(workload_data)),
+        ('cooling.optimize', cooling, lambda: cooling.optimize(server_data))
+    ]
+    return [
+        summarize(name, 'model', n_servers, time_call(call, repeats), implementation=type(model).__name__)
+        for name, model, call in cases
+    ]
+
+def bench_endpoints(client, frame, n_servers, repeats):
+    """Time every API route through the Flask test client on one fleet"""
+    csv_body = frame.to_csv(index=False)
+    client.post('/api/telemetry', data=csv_body, content_type='text/csv')
+    workload_data = client.get('/api/workload/forecast').get_json()
+    server_data = fleet_servers(frame)
+
+    cases = [
+        ('POST /api/telemetry', lambda: client.post('/api/telemetry', data=csv_body, content_type='text/csv')),
+        ('GET /api/workload/forecast', lambda: client.get('/api/workload/forecast')),
+        ('POST /api/resource/allocate', lambda: client.post('/api/resource/allocate', json=workload_data)),
+        ('POST /api/cooling/optimize', lambda: client.post('/api/cooling/optimize', json=server_data)),
+        ('GET /api/cooling/zones', lambda: client.get('/api/cooling/zones')),
+        ('GET /api/control/cycle', lambda: client.get('/api/control/cycle')),
+        ('POST /api/scenarios', lambda: client.post('/api/scenarios', json=SCENARIO_GRID)),
+        ('GET /api/system/status', lambda: client.get('/api/system/status')),
+        ('GET /metrics', lambda: client.get('/metrics'))
+    ]
+    results = []
+    for name, call in cases:
+        statuses = []
+        timings = time_call(lambda: statuses.append(call().status_code), repeats)
+        results.append(summarize(name, 'endpoint', n_servers, timings, status=statuses[-1]))
+    return results
+
+def compare(results, baseline_path, threshold):
+    """Print median ratios against a previous run; returns the regressed entries"""
+    with open(baseline_path) as f:
+        baseline = {(r['name'], r['servers']): r for r in json.load(f)['results']}
+    regressions = []
+    print(f"\n{'name':<30} {'servers':>8} {'baseline_ms':>12} {'median_ms':>10} {'ratio':>7}")
+    for result in results:
+        previous = baseline.get((result['name'], result['servers']))
+        if previous is None or not previous['median_ms']:
+            continue
+        ratio = result['median_ms'] / previous['median_ms']
+        flag = '  REGRESSION' if ratio > threshold else ''
+        print(f"{result['name']:<30} {result['servers']:>8} {previous['median_ms']:>12.3f} "
+              f"{result['median_ms']:>10.3f} {ratio:>7.2f}{flag}")
+        if ratio > threshold:
+            regressions.append(result)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Time every model and API route on synthetic fleets")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--hours', type=int, default=24, help="Hours of telemetry per server")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--only', choices=['models', 'endpoints'], help="Run one half of the suite")
+    parser.add_argument('--out', help="Write JSON results to this file")
+    parser.add_argument('--compare', help="JSON results of an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="Median ratio above which --compare reports a regression (exit status 1)")
+    parser.add_argument('--cache', action='store_true', help="Keep the result cache on (off by default)")
+    parser.add_argument('--profile-slow-ms', type=float,
+                        help="Dump a profile of every request slower than this (see app/profiling.py)")
+    parser.add_argument('--profile-dir', default='profiles')
+    args = parser.parse_args()
+    sizes = sorted(args.sizes)
+
+    # The app reads its settings at import time
+    if not args.cache:
+        os.environ['RESULT_CACHE'] = 'off'
+    os.environ['TELEMETRY_CAPACITY'] = str(max(sizes))
+    if args.profile_slow_ms is not None:
+        os.environ['PROFILE_SLOW_MS'] = str(args.profile_slow_ms)
+        os.environ['PROFILE_DIR'] = args.profile_dir
+    import wsgi
+
+    results = []
+    print(f"{'name':<30} {'servers':>8} {'median_ms':>10} {'p95_ms':>9} {'min_ms':>9}")
+    for n_servers in sizes:
+        frame = make_fleet(n_servers, args.hours)
+        # Smaller fleets run first: their server ids stay a subset of the buffered telemetry
+        for half in ('models', 'endpoints'):
+            if args.only not in (None, half):
+                continue
+            if half == 'models':
+                batch = bench_models(wsgi.server.registry, frame, n_servers, args.repeats)
+            else:
+                batch = bench_endpoints(wsgi.app.test_client(), frame, n_servers, args.repeats)
+            for result in batch:
+                print(f"{result['name']:<30} {n_servers:>8} {result['median_ms']:>10.3f} "
+                      f"{result['p95_ms']:>9.3f} {result['min_ms']:>9.3f}")
+            results.extend(batch)
+
+    report = {'environment': environment(), 'config': vars(args), 'results': results}
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.out}")
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
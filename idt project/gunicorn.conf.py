@@ -0,0 +1,30 @@
+# Gunicorn configuration: gunicorn -c gunicorn.conf.py wsgi:app
+import gc
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+
+# One worker by default: ingested telemetry and everything derived from it (the
+# anomaly detector, energy ledger, history, forecasts, /api/stream) lives in the
+# worker process that received it, so with several workers each POST
+# /api/telemetry reaches only one of them and answers depend on which worker
+# responds. Raise WEB_CONCURRENCY only for deployments that do not ingest
+# telemetry, or behind a proxy that routes every client to one worker
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+# Threaded workers: request threads mostly wait on the inference micro-batcher
+# (app/inference.py) or on /api/stream, so many can share one process. Every
+# open /api/stream client holds one thread until it disconnects, so size
+# WORKER_THREADS for the expected dashboards plus request concurrency
+worker_class = os.environ.get('WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('WORKER_THREADS', 16))
+timeout = int(os.environ.get('WORKER_TIMEOUT', 60))
+
+# Import the app (and warm up models) once in the master before forking, so
+# model weights are shared copy-on-write between workers
+preload_app = True
+os.environ.setdefault('PRELOAD_MODELS', '1')
+
+def when_ready(server):
+    """Move preloaded objects out of the collector so workers don't touch their pages"""
+    gc.freeze()
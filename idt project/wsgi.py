@@ -0,0 +1,12 @@
+# WSGI entry point for gunicorn: gunicorn -c gunicorn.conf.py wsgi:app
+# app.py shares its name with the app/ package, so it is loaded by path here
+import importlib.util
+import os
+
+_spec = importlib.util.spec_from_file_location(
+    'server', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+)
+server = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(server)
+
+app = server.app